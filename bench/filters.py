@@ -0,0 +1,86 @@
+"""
+Time and memory allocated per loop of the smoothing filters against the hand written
+equivalents they replace: FunctionInput closures that keep their history in lists, and
+stacked operators. Allocations matter most on the board, where they lead to garbage
+collection pauses, so they are measured there only. Runs under
+MicroPython on the board (mpremote run bench/filters.py) or CPython, from the repository
+root: python -m bench.filters
+"""
+
+import gc
+
+from kabuki import timing
+from kabuki.controller import FunctionInput
+from kabuki.operators import Operand
+from kabuki.smoothing import lowpass
+
+LOOPS = 2000
+SIZE = 8
+
+
+def list_average(node):
+    history = []
+
+    def average():
+        history.append(node.value)
+        if len(history) > SIZE:
+            history.pop(0)
+        return sum(history) / len(history)
+
+    return FunctionInput(average)
+
+
+def list_median(node):
+    history = []
+
+    def median():
+        history.append(node.value)
+        if len(history) > SIZE - 1:
+            history.pop(0)
+        ordered = sorted(history)
+        return ordered[len(ordered) // 2]
+
+    return FunctionInput(median)
+
+
+def run(source, node):
+    for i in range(LOOPS):
+        source._value = (i * 37) % 101
+        source.reset()
+        node.reset()
+        node.value
+
+
+def per_loop(source, node):
+    start = timing.micros()
+    run(source, node)
+    elapsed = timing.elapsed_micros(start)
+    if not hasattr(gc, "mem_alloc"):
+        return "%8.2f us" % (elapsed / LOOPS)
+    # MicroPython: with collection off, everything allocated stays counted
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    run(source, node)
+    memory = gc.mem_alloc() - before
+    gc.enable()
+    return "%8.2f us %8.1f bytes" % (elapsed / LOOPS, memory / LOOPS)
+
+
+def main():
+    source = Operand(0)
+    cases = [
+        ("moving_average(%d)" % SIZE, source.moving_average(SIZE)),
+        ("list average", list_average(source)),
+        ("ema(0.2)", source.ema(0.2)),
+        ("median(%d)" % (SIZE - 1), source.median(SIZE - 1)),
+        ("list median", list_median(source)),
+        ("biquad(lowpass)", source.biquad(lowpass(5, 100))),
+        ("slew_limit(100)", source.slew_limit(100)),
+        ("reduce_noise x3", source.reduce_noise(2).reduce_noise(2).reduce_noise(2)),
+    ]
+    for name, node in cases:
+        print("%-20s %s per loop" % (name, per_loop(source, node)))
+
+
+main()
@@ -0,0 +1,44 @@
+"""
+Measures the RAM taken by importing the Kabuki core and each operator pack. Runs under
+MicroPython on the board (mpremote run bench/footprint.py) or CPython, from the repository
+root: python -m bench.footprint
+"""
+
+import gc
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+MODULES = ["kabuki", "kabuki.filters", "kabuki.animation", "kabuki.selection", "kabuki.sources",
+           "kabuki.smoothing", "kabuki.keyframes", "kabuki.optimize", "kabuki.capturing", "kabuki.graphfile",
+           "kabuki.supervisor", "kabuki.remote", "kabuki.background",
+           "kabuki.tasks"]
+
+
+def allocated():
+    gc.collect()
+    if tracemalloc is not None:
+        return tracemalloc.get_traced_memory()[0]
+    return gc.mem_alloc()
+
+
+def measure(name):
+    before = allocated()
+    __import__(name)
+    return allocated() - before
+
+
+def main():
+    if tracemalloc is not None:
+        tracemalloc.start()
+    for name in MODULES:
+        if name in sys.modules:
+            print("%-20s already imported" % name)
+        else:
+            print("%-20s %6d bytes" % (name, measure(name)))
+
+
+main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+
+from kabuki import keycompiler
+from kabuki.keyframes import write_table
+
+
+def _column(value):
+    return int(value) if value.isdigit() else value
+
+
+cmd_parser = argparse.ArgumentParser(
+    description="Reduce dense samples to few Channel keys within a tolerance.")
+cmd_parser.add_argument("samples", help="a CSV file of x and y columns, or a recording (see kabuki.recording)")
+cmd_parser.add_argument("-t", "--tolerance", type=float, required=True,
+                        help="the largest difference allowed between a sample and the keys' interpolation")
+cmd_parser.add_argument("-x", default="0", help="the index or heading of the CSV x column")
+cmd_parser.add_argument("-y", default="1", help="the index or heading of the CSV y column")
+cmd_parser.add_argument("-c", "--channel", default="0", help="the index or label of the recorded channel")
+cmd_parser.add_argument("--x-per-ms", type=float, default=1, help="x units per recorded millisecond")
+cmd_parser.add_argument("--table", metavar="FILE", help="write a key table (see kabuki.keyframes) instead of "
+                                                        "printing the keys")
+cmd_parser.add_argument("--x-scale", type=float, default=1000, help="fixed point scale of table x values")
+cmd_parser.add_argument("--y-scale", type=float, default=1000, help="fixed point scale of table y values")
+args = cmd_parser.parse_args()
+
+with open(args.samples, "rb") as f:
+    is_recording = f.read(4) in (b"KBR1", b"KBR2")
+if is_recording:
+    with open(args.samples, "rb") as f:
+        samples = keycompiler.read_recording(f, _column(args.channel), args.x_per_ms)
+else:
+    samples = keycompiler.read_csv(args.samples, _column(args.x), _column(args.y))
+
+keys = keycompiler.simplify(samples, args.tolerance)
+if args.table:
+    write_table(args.table, keys, args.x_scale, args.y_scale)
+else:
+    print("keys = [%s]" % ", ".join(["(%r, %r)" % key for key in keys]))
+print("%d samples to %d keys, largest error %g" % (len(samples), len(keys), keycompiler.max_error(samples, keys)),
+      file=sys.stderr)
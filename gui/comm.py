@@ -13,18 +13,43 @@ class Comm:
         self._controls = []
         self._values = {}
         self._serial = None #  todo: need a close hook
+        self._capture_labels = None
+        self._capture_rows = None  # rows of a capture being received
+        self._plot = None
 
     def service(self, mouse_down, applet):
         if self._init:
             for control in self._controls:
                 control.service(mouse_down)
+            if self._plot is not None:
+                self._plot.service()
             while self._serial.available() > 0:
                 line = self._serial.readStringUntil(10)
                 if line is not None:
-                    print("> %s" %line.strip())
+                    self._receive_line(line.strip(), applet)
         else:
             self._try_to_build(applet)
 
+    def _receive_line(self, line, applet):
+        # captures arrive as "!capture <rows> <labels>", one line of values per row, then "!end"
+        if self._capture_rows is not None:
+            if line == "!end":
+                y = 10 + len(self._controls) * controls.height
+                self._plot = controls.Plot(self._capture_labels, self._capture_rows, 10, y, applet)
+                print("received capture of %d rows" % len(self._capture_rows))
+                self._capture_rows = None
+            else:
+                try:
+                    self._capture_rows.append([float(v) for v in line.split(",")])
+                except ValueError:
+                    print("ignoring bad capture row: %s" % line)
+        elif line.startswith("!capture"):
+            parts = line.split(" ", 2)
+            self._capture_labels = parts[2].split(",") if len(parts) > 2 else []
+            self._capture_rows = []
+        else:
+            print("> %s" % line)
+
     def _try_to_build(self, applet):
         if self._serial is not None:
             if self._sent_request:
@@ -78,4 +78,53 @@ def slider_from_dict(definition, x, y, applet, self):
     min = definition["m"]
     max = definition["M"]
     value = definition["v"]
-    return Slider(key, label, min, max, value, x, y, applet, self)
\ No newline at end of file
+    return Slider(key, label, min, max, value, x, y, applet, self)
+
+
+plot_width = 270
+plot_height = 150
+plot_colors = [(204, 102, 0), (0, 153, 204), (102, 204, 0), (204, 0, 153), (255, 255, 255)]
+
+
+class Plot:
+    """ Draws the rows of a capture, one line per recorded node, scaled to fit together. """
+
+    def __init__(self, labels, rows, x, y, applet):
+        self._applet = applet
+        self._labels = labels
+        self._rows = rows
+        self._x = x
+        self._y = y
+        values = [v for row in rows for v in row]
+        self._min = min(values) if values else 0
+        self._max = max(values) if values else 1
+        if self._max == self._min:
+            self._max = self._min + 1
+
+    def service(self):
+        self._draw()
+
+    def _draw(self):
+        a = self._applet
+        a.fill(0)
+        a.stroke(204, 102, 0)
+        a.rect(self._x, self._y, plot_width, plot_height)
+        a.noFill()
+        count = len(self._rows)
+        for column, label in enumerate(self._labels):
+            r, g, b = plot_colors[column % len(plot_colors)]
+            a.stroke(r, g, b)
+            a.beginShape()
+            for i, row in enumerate(self._rows):
+                px = a.map(i, 0, max(count - 1, 1), self._x, self._x + plot_width)
+                py = a.map(row[column], self._min, self._max, self._y + plot_height, self._y)
+                a.vertex(px, py)
+            a.endShape()
+            a.fill(r, g, b)
+            a.textAlign(a.LEFT, a.TOP)
+            a.text(label, self._x + 5 + column * 60, self._y + plot_height + 5)
+            a.noFill()
+        a.fill(255)
+        a.text("{:.3f}".format(self._max), self._x + plot_width + 5, self._y)
+        a.text("{:.3f}".format(self._min), self._x + plot_width + 5, self._y + plot_height - 12)
+
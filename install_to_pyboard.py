@@ -1,31 +1,213 @@
 #!/Library/Frameworks/Python.framework/Versions/3.4/bin/python3.4
 
+"""
+Installs Kabuki to a mounted pyboard. Modules are compiled to .mpy bytecode when mpy-cross
+is available so the board does not compile them at every boot. A manifest on the board
+records the hash of each installed file so unchanged files are not copied again. Can also
+write a manifest for freezing Kabuki into custom firmware instead.
+"""
+
 import argparse
+import hashlib
+import json
 import os
-import sys
+import shutil
 import subprocess
+import sys
+import tempfile
+
+MANIFEST_NAME = ".kabuki_manifest.json"
+MANIFEST_VERSION = 1
+
+# modules for the workstation only, they need NumPy, multiprocessing or csv
+HOST_ONLY = ["kabuki/offline.py", "kabuki/sweep.py", "kabuki/keycompiler.py"]
+
+MAIN_PY = "from kabuki.pyboard import runner\n\nrunner.run()\n"
+
+
+def source_files(root, directories=("lib", "kabuki")):
+    """
+    The modules to install, as paths relative to root, e.g. kabuki/operators.py. Modules
+    in lib are installed at the top of the board's lib, e.g. lib/ppm_decoder.py as
+    ppm_decoder.py. pyb.py (the stand in used on the workstation) and host only modules are
+    left out.
+    """
+    sources = []
+    for directory in directories:
+        for dir_path, dir_names, file_names in os.walk(os.path.join(root, directory)):
+            dir_names[:] = sorted([d for d in dir_names if d != "__pycache__"])
+            for file_name in sorted(file_names):
+                path = os.path.relpath(os.path.join(dir_path, file_name), root).replace(os.sep, "/")
+                if file_name.endswith(".py") and path not in HOST_ONLY and file_name != "pyb.py":
+                    sources.append(path)
+    return sources
+
+
+def find_mpy_cross(path=None):
+    """ The mpy-cross command to use, None if it is not available. """
+    if path is not None:
+        return path
+    return shutil.which("mpy-cross")
+
+
+def build(root, sources, mpy_cross=None):
+    """
+    The files to install, a dictionary of target path to contents. Modules are compiled to
+    .mpy with mpy_cross, or installed as source if it is None.
+    """
+    files = {}
+    if mpy_cross is None:
+        for source in sources:
+            files[source] = _read(os.path.join(root, source))
+        return files
+    build_dir = tempfile.mkdtemp()
+    try:
+        for source in sources:
+            target = source[:-3] + ".mpy"
+            out = os.path.join(build_dir, target.replace("/", "_"))
+            # -s keeps the module path in tracebacks
+            subprocess.check_call([mpy_cross, "-s", _module_path(source), "-o", out, os.path.join(root, source)])
+            contents = _read(out)
+            if not is_mpy(contents):
+                raise RuntimeError("mpy-cross did not produce bytecode for {}".format(source))
+            files[target] = contents
+    finally:
+        shutil.rmtree(build_dir)
+    return files
+
+
+def is_mpy(contents):
+    """ True if the contents look like MicroPython bytecode: "M" then the format version. """
+    return len(contents) >= 4 and contents[0:1] == b"M"
+
+
+def file_hash(contents):
+    return hashlib.sha256(contents).hexdigest()
+
+
+def read_manifest(mount_point):
+    """ The hashes of the installed files, empty if there is no manifest or it is unreadable. """
+    try:
+        with open(os.path.join(mount_point, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("v") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def install(mount_point, files, force=False, log=print):
+    """
+    Copy the built files to the lib directory of the board, skipping those unchanged since
+    the last install, verify each copy and remove files of the last install that are not
+    part of this one, e.g. sources replaced by .mpy.
+    :return: The number of files copied.
+    """
+    installed = {} if force else read_manifest(mount_point)
+    lib = os.path.join(mount_point, "lib")
+    copied = 0
+    hashes = {}
+    for path in sorted(files):
+        contents = files[path]
+        hashes[path] = file_hash(contents)
+        target = _target_path(lib, path)
+        if installed.get(path) == hashes[path] and os.path.isfile(target):
+            continue
+        _write(target, contents)
+        if file_hash(_read(target)) != hashes[path]:
+            raise RuntimeError("verify failed for {}".format(path))
+        log("installed {}".format(path))
+        copied += 1
+    for path in sorted(files):
+        # the board imports a source ahead of bytecode, e.g. one left by an older install
+        source = _target_path(lib, path[:-4] + ".py")
+        if path.endswith(".mpy") and os.path.isfile(source):
+            os.remove(source)
+            log("removed {}".format(path[:-4] + ".py"))
+    for path in sorted(installed):
+        if path not in files and path[:-3] + ".mpy" not in files:
+            target = _target_path(lib, path)
+            if os.path.isfile(target):
+                os.remove(target)
+                log("removed {}".format(path))
+    _write(os.path.join(mount_point, "main.py"), MAIN_PY.encode())
+    with open(os.path.join(mount_point, MANIFEST_NAME), "w") as f:
+        json.dump({"v": MANIFEST_VERSION, "files": hashes}, f, indent=1, sort_keys=True)
+    return copied
+
+
+def frozen_manifest(root, sources):
+    """
+    A manifest.py for building MicroPython firmware with Kabuki frozen in, so its modules
+    run from flash without being loaded into RAM. Build with FROZEN_MANIFEST set to it.
+    """
+    base_path = os.path.abspath(root)
+    lines = ['include("$(PORT_DIR)/boards/manifest.py")']
+    for source in sources:
+        module = _module_path(source)
+        module_base = base_path if module == source else os.path.join(base_path, "lib")
+        lines.append('module("{}", base_path="{}")'.format(module, module_base))
+    return "\n".join(lines) + "\n"
+
+
+def _module_path(path):
+    # where a module goes under the board's lib: the repository's lib is the top level
+    if path.startswith("lib/"):
+        return path[4:]
+    return path
+
+
+def _target_path(lib, path):
+    return os.path.join(lib, *_module_path(path).split("/"))
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write(path, contents):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, "wb") as f:
+        f.write(contents)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def main(argv=None):
+    cmd_parser = argparse.ArgumentParser(description="Install Kabuki to pyboard.")
+    cmd_parser.add_argument("-p", "--path", default="/Volumes/PYBOARD", help="the mount point of the pyboard")
+    cmd_parser.add_argument("--mpy-cross", help="the mpy-cross command, found on the PATH by default")
+    cmd_parser.add_argument("--source", action="store_true", help="install sources instead of bytecode")
+    cmd_parser.add_argument("-f", "--force", action="store_true", help="copy every file, even if unchanged")
+    cmd_parser.add_argument("--frozen-manifest", metavar="FILE",
+                            help="write a manifest for freezing Kabuki into firmware instead of installing")
+    args = cmd_parser.parse_args(argv)
 
-cmd_parser = argparse.ArgumentParser(description="Install Kabuki to pyboard.")
-cmd_parser.add_argument("-p", "--path", default="/Volumes/PYBOARD", help="the mount point of the pyboard")
-args = cmd_parser.parse_args()
+    root = os.path.dirname(os.path.abspath(__file__))
+    sources = source_files(root)
 
-mount_point = args.path
+    if args.frozen_manifest:
+        with open(args.frozen_manifest, "w") as f:
+            f.write(frozen_manifest(root, sources))
+        print("wrote {}".format(args.frozen_manifest))
+        return
 
-if not os.path.isdir(mount_point):
-    print("Pyboard is not mounted")
-    sys.exit()
+    mount_point = args.path
+    if not os.path.isdir(mount_point):
+        print("Pyboard is not mounted")
+        sys.exit()
 
-rsync = "rsync -ravzLq --delete --exclude=*.pyc --exclude=*py.class"
-# lib directory
-subprocess.check_call("{} --exclude=pyb.py --include=*.py lib {}".format(rsync, mount_point), shell=True)
-# kabuki to lib
-subprocess.check_call("{} kabuki {}/lib".format(rsync, mount_point), shell=True)
-# main.py
-main_py_path = mount_point + "/main.py"
-target = open(main_py_path, 'w')
-target.truncate()
-target.write("from kabuki.pyboard import runner\n\n")
-target.write("runner.run()\n")
-target.close()
+    mpy_cross = None if args.source else find_mpy_cross(args.mpy_cross)
+    if mpy_cross is None and not args.source:
+        print("mpy-cross not found, installing sources")
+    files = build(root, sources, mpy_cross)
+    copied = install(mount_point, files, args.force)
+    print("{} of {} files copied".format(copied, len(files)))
 
 
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-from kabuki.controller import Controller, FunctionInput, ValueInput
+from kabuki.controller import Controller, FunctionInput, ValueInput, EventInput, Hold, CRITICAL, NORMAL, LOW
 from kabuki.operators import Operand
+from kabuki import trace
 
 """ Provide a default controller and façade methods. """
 
@@ -31,17 +32,98 @@ def node_from_value(value):
     return Operand(value=value)
 
 
-def poll_input(pollable):
-    _default_controller.poll_input(pollable)
+def poll_input(pollable, priority=CRITICAL):
+    _default_controller.poll_input(pollable, priority)
 
 
-def wire_output(node, consumer):
-    _default_controller.wire_output(node, consumer)
+def wire_output(node, consumer, priority=NORMAL):
+    _default_controller.wire_output(node, consumer, priority)
+
+
+def set_budget(milliseconds):
+    _default_controller.set_budget(milliseconds)
+
+
+def wire_event(event_input):
+    _default_controller.wire_event(event_input)
+
+
+def node_from_events(value=None):
+    """ create a node whose value is set from outside the loop, e.g. by an interrupt handler
+    :param value: the initial value
+    :return: an EventInput, call set() or signal() on it when it changes
+    """
+    event_input = EventInput(value)
+    _default_controller.wire_event(event_input)
+    return event_input
 
 
 def run():
     _default_controller.run()
 
 
+def run_events(period=None):
+    _default_controller.run_events(period)
+
+
+def poll_when_ready(pollable):
+    _default_controller.poll_when_ready(pollable)
+
+
+async def run_async(period=10):
+    """ run the default controller as an asyncio (or uasyncio) task, see Controller.run_async() """
+    await _default_controller.run_async(period)
+
+
+def capture(trigger, nodes, ticks, pre_ticks=0, labels=None):
+    """
+    Record nodes at full loop rate around a trigger and print the capture once complete.
+    :param trigger: a node, the capture starts when its value becomes true
+    :param nodes: the nodes to record
+    :param ticks: the number of loops to record from the trigger on
+    :param pre_ticks: the number of loops before the trigger to keep
+    :param labels: a name for each node
+    :return: the Capture, call rearm() on it to capture again
+    """
+    from kabuki.capturing import Capture
+    c = Capture(trigger, nodes, ticks, pre_ticks, labels)
+    _default_controller.wire_output(c, c, CRITICAL)  # deferring would lose samples
+    return c
+
+
+def enable_trace(size=32, every=1, stream=None):
+    """
+    Have debug nodes write one line per sampled loop instead of printing on every evaluation.
+    :param size: the number of label/value pairs buffered per line
+    :param every: write one loop in this many
+    :param stream: where to write lines, print() is used if None
+    :return: the TraceSink
+    """
+    trace.default_sink = trace.TraceSink(size, every, stream)
+    _default_controller.trace_to(trace.default_sink)
+    return trace.default_sink
+
+
+def save_graph(path, exclude=()):
+    """
+    Save the default controller's graph, see kabuki.graphfile.
+    :param path: the file to write, e.g. nodes.json
+    :param exclude: polled objects to leave out
+    """
+    from kabuki import graphfile
+    with open(path, "w") as f:
+        f.write(graphfile.dumps(_default_controller, exclude))
+
+
+def load_graph(path, modules=()):
+    """
+    Build a saved graph and wire it into the default controller.
+    :param path: the file to read
+    :param modules: modules with further classes the graph uses, e.g. kabuki.pyboard.inputs
+    """
+    from kabuki import graphfile
+    graphfile.load(path, _default_controller, modules)
+
+
 def enable_profiling():
     _default_controller.enable_profiling()
\ No newline at end of file
@@ -0,0 +1,112 @@
+from kabuki.operators import DoubleArgumentOperator, _map
+
+""" Operators that move through key frames over time. """
+
+
+class Cycler(DoubleArgumentOperator):
+
+    _state_attributes = ("_position",)
+
+    def __init__(self, length_node, delta_node, initial_position = 0):
+        super().__init__(length_node, delta_node)
+        self._initial_position = initial_position
+        self._position = initial_position
+
+    def _calculate_value(self):
+        length = self._first_operand.value
+        delta = self._second_operand.value
+        self._position += delta
+        # todo: consider wrap around vs stop
+        # todo: how could we do a ping/pong? delta is external
+        if self._position > length:
+            self._position = 0
+        elif self._position < 0:
+            self._position = length
+        return self._position
+
+    def channel(self, keys):
+        return Channel(self, self._first_operand, keys)
+
+    def table_channel(self, table):
+        """
+        Like channel() but with the keys in a key table, for animations with many keys.
+        :param table: A kabuki.keyframes.KeyTable.
+        """
+        from kabuki.keyframes import TableChannel
+        return TableChannel(self, self._first_operand, table)
+
+    def _settings(self):
+        return (self._initial_position,)
+
+    def _spec(self):
+        return "Cycler", list(self.operands()) + [self._initial_position]
+
+
+class Channel(DoubleArgumentOperator):
+
+    def __init__(self, position_node, length_node, keys):
+        super().__init__(position_node, length_node)
+        try:
+            self._xlist = []
+            self._ylist = []
+            for x, y in keys:
+                x = self._wrap_if_needed(x)
+                y = self._wrap_if_needed(y)
+                self._xlist.append(x)
+                self._ylist.append(y)
+            self._key_count = len(keys)
+        except:
+            raise RuntimeError("error parsing keys, must be list of 2 Tuples")
+        if self._key_count == 0:
+            raise RuntimeError("keys must have at least one key!")
+
+    def _calculate_value(self):
+        # find keys where position between two x's, interpolate
+        position = self._first_operand.value
+        cycler_length = self._second_operand.value
+        left_x_count = 0 # number of keys to the left of current position
+        # assumes x values are sorted low to high
+        for v in self._xlist:
+            if v.value <= position:
+                left_x_count += 1
+
+        # a little repetition here, but looking for performance
+        if 0 < left_x_count < self._key_count:
+            left_x_index = left_x_count - 1
+            right_x_index = left_x_count
+            left_x = self._xlist[left_x_index].value
+            right_x = self._xlist[right_x_index].value
+            left_y = self._ylist[left_x_index].value
+            right_y = self._ylist[right_x_index].value
+        elif left_x_count == self._key_count:
+            # pos is to right of all keys, flip first after last
+            left_x_index = -1
+            right_x_index = 0
+            left_x = self._xlist[left_x_index].value
+            right_x = self._xlist[right_x_index].value + cycler_length
+            left_y = self._ylist[left_x_index].value
+            right_y = self._ylist[right_x_index].value
+        else:  # left_x_count == 0:
+            # pos is to left of all keys, flip last before first
+            left_x_index = -1
+            right_x_index = 0
+            left_x = self._xlist[left_x_index].value - cycler_length
+            right_x = self._xlist[right_x_index].value
+            left_y = self._ylist[left_x_index].value
+            right_y = self._ylist[right_x_index].value
+
+        return _map(position, left_x, right_x, left_y, right_y)
+
+    def reset(self):
+            for v in self._xlist:
+                v.reset()
+            for v in self._ylist:
+                v.reset()
+            super().reset()
+
+    def operands(self):
+        return super().operands() + tuple(self._xlist) + tuple(self._ylist)
+
+    def _spec(self):
+        keys = [[x, y] for x, y in zip(self._xlist, self._ylist)]
+        return "Channel", [self._first_operand, self._second_operand, keys]
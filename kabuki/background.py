@@ -0,0 +1,146 @@
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+from kabuki import timing
+from kabuki.operators import Operator
+
+"""
+Reads slow inputs, such as files, sockets or sensors that take milliseconds to answer, on a
+worker thread so the loop never waits for them. The worker writes each reading to a back
+buffer and the input's poll swaps it to the front at the start of the tick, so a tick sees
+one reading throughout. On a port without _thread the readings are taken in the poll.
+
+    acquirer = Acquirer()
+    temperature = acquirer.input(read_temperature, period=500)  # reads once here, then on the worker
+    kabuki.poll_input(temperature)
+    acquirer.start()
+"""
+
+
+class Acquirer:
+    """ One worker thread taking readings for its inputs in turn. Use several for a pool. """
+
+    def __init__(self):
+        self._inputs = []
+        self._running = False
+        self.threaded = _thread is not None
+
+    def input(self, source, period=10, initial=None):
+        """
+        An input read by this acquirer, a node to poll.
+        :param source: A function returning the reading, or an object with a value property.
+        :param period: The least milliseconds between readings.
+        :param initial: The value until the first reading arrives. If None, one reading is
+        taken here, waiting for the source, so the node never has None for a value.
+        """
+        background_input = BackgroundInput(source, period, initial, self)
+        self._inputs.append(background_input)
+        return background_input
+
+    def start(self):
+        if self._running or not self.threaded:
+            return
+        self._running = True
+        _thread.start_new_thread(self._work, ())
+
+    def stop(self):
+        """ Stop the worker after the reading in progress. """
+        self._running = False
+
+    def _work(self):
+        while self._running:
+            now = timing.millis()
+            wait = None
+            for background_input in self._inputs:
+                if now - background_input._due >= 0:
+                    background_input._acquire()
+                    now = timing.millis()
+                left = background_input._due - now
+                if wait is None or left < wait:
+                    wait = left
+            timing.sleep(wait if wait is not None and wait > 0 else 1)
+
+
+class BackgroundInput(Operator):
+    """ The latest reading from a source read by an Acquirer. Poll it. """
+
+    def __init__(self, source, period, initial, acquirer):
+        super().__init__()
+        self._source = source if callable(source) else (lambda: source.value)
+        self._period = period
+        self._acquirer = acquirer
+        self._lock = _thread.allocate_lock() if _thread is not None else None
+        self._due = timing.millis()  # when the worker reads next
+        # the front reading is used by the tick, the worker writes the back one
+        self._front = initial
+        self._front_time = None
+        self._back = None
+        self._back_time = None
+        self._fresh = False  # the back reading is newer than the front
+        self.age = None  # milliseconds since the front reading was taken, None before one
+        self.readings = 0
+        self.errors = 0
+        self.error = None  # the last exception raised by the source
+        self._age_node = None
+        if initial is None:
+            # without a value for the first ticks arithmetic downstream would fail on None
+            self._front = self._source()
+            self._front_time = timing.millis()
+            self._due = self._front_time + period
+            self.age = 0
+            self.readings = 1
+
+    def _acquire(self):
+        self._due = timing.millis() + self._period
+        try:
+            value = self._source()
+        except Exception as error:
+            self.errors += 1
+            self.error = error
+            return
+        taken = timing.millis()
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        self._back = value
+        self._back_time = taken
+        self._fresh = True
+        if lock is not None:
+            lock.release()
+
+    def poll(self):
+        if not self._acquirer.threaded and timing.millis() - self._due >= 0:
+            self._acquire()  # no worker, take the reading here
+        if self._fresh:
+            lock = self._lock
+            if lock is not None:
+                lock.acquire()
+            self._front, self._back = self._back, self._front
+            self._front_time, self._back_time = self._back_time, self._front_time
+            self._fresh = False
+            if lock is not None:
+                lock.release()
+            self.readings += 1
+        if self._front_time is not None:
+            self.age = timing.millis() - self._front_time
+
+    def _calculate_value(self):
+        return self._front
+
+    def reading_age(self):
+        """ A node with the milliseconds since the current reading was taken. """
+        if self._age_node is None:
+            self._age_node = BackgroundAge(self)
+        return self._age_node
+
+
+class BackgroundAge(Operator):
+
+    def __init__(self, background_input):
+        super().__init__()
+        self._background_input = background_input
+
+    def _calculate_value(self):
+        return self._background_input.age
@@ -0,0 +1,117 @@
+from array import array
+
+from kabuki.operators import SingleArgumentOperator
+
+"""
+Full loop rate recording of node values, like a logic analyzer. Not named capture, as
+importing a kabuki.capture module would hide the kabuki.capture() function.
+"""
+
+
+class Capture(SingleArgumentOperator):
+    """
+    Records the values of several nodes every loop into a preallocated ring and keeps the loops
+    around the moment the trigger node becomes true. The value of this node is True once the
+    capture is complete. Wire the capture to itself to have it written out in one burst when
+    complete, at CRITICAL priority so a tick budget never skips a loop:
+    controller.wire_output(capture, capture, CRITICAL)
+    """
+
+    def __init__(self, trigger, nodes, ticks, pre_ticks=0, labels=None, stream=None):
+        """
+        :param trigger: A node, the capture starts on the loop its value becomes true.
+        :param nodes: The nodes to record.
+        :param ticks: The number of loops to record from the trigger on.
+        :param pre_ticks: The number of loops before the trigger to keep.
+        :param labels: A name for each node.
+        :param stream: An object with a write function, print() is used if None.
+        """
+        if ticks < 1 or pre_ticks < 0:
+            raise RuntimeError("a capture needs at least one tick and no negative pre_ticks")
+        super().__init__(trigger)
+        self._nodes = [self._wrap_if_needed(node) for node in nodes]
+        self._width = len(self._nodes)
+        self._post_rows = ticks
+        self._rows = pre_ticks + ticks
+        self._samples = array("f", (0 for _ in range(self._width * self._rows)))
+        self._labels = labels if labels is not None else ["n%d" % i for i in range(self._width)]
+        self._stream = stream
+        self.rearm()
+
+    def rearm(self):
+        """ Discard the capture and wait for the trigger again. """
+        self._row = 0  # next row to write
+        self._filled = 0  # rows holding samples
+        self._remaining = None  # rows still to record after the trigger, None until triggered
+        self._last_trigger = True  # so a trigger that is already true must fall and rise again
+        self._dumped = False
+
+    @property
+    def complete(self):
+        return self._remaining == 0
+
+    def _calculate_value(self):
+        if self._remaining is None:
+            trigger = bool(self._first_operand.value)
+            if trigger and not self._last_trigger:
+                self._remaining = self._post_rows
+            self._last_trigger = trigger
+        if self._remaining is None:
+            if self._rows > self._post_rows:
+                self._record()
+        elif self._remaining > 0:
+            self._record()
+            self._remaining -= 1
+        return self._remaining == 0
+
+    def _record(self):
+        offset = self._row * self._width
+        samples = self._samples
+        for i in range(self._width):
+            samples[offset + i] = self._nodes[i].value
+        self._row = (self._row + 1) % self._rows
+        if self._filled < self._rows:
+            self._filled += 1
+
+    def rows(self):
+        """ The recorded rows, oldest first, as lists of values. """
+        first = (self._row - self._filled) % self._rows
+        rows = []
+        for r in range(self._filled):
+            offset = ((first + r) % self._rows) * self._width
+            rows.append(list(self._samples[offset:offset + self._width]))
+        return rows
+
+    def consume(self, complete):
+        if complete and not self._dumped:
+            self._dumped = True
+            self.dump()
+
+    def dump(self):
+        """
+        Write the capture: a "!capture" header with the row count and labels, one line of
+        comma separated values per row, then "!end".
+        """
+        self._write("!capture %d %s" % (self._filled, ",".join(self._labels)))
+        for row in self.rows():
+            self._write(",".join(["%g" % v for v in row]))
+        self._write("!end")
+
+    def _write(self, line):
+        if self._stream is None:
+            print(line)
+        else:
+            self._stream.write(line)
+            self._stream.write("\n")
+
+    def reset(self):
+        super().reset()
+        for node in self._nodes:
+            node.reset()
+
+    def operands(self):
+        return super().operands() + tuple(self._nodes)
+
+    def _spec(self):
+        return "Capture", [self._first_operand, self._nodes, self._post_rows,
+                           self._rows - self._post_rows, self._labels]
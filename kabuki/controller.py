@@ -1,55 +1,232 @@
+from kabuki import graph, timing
 from kabuki.operators import Operator
 from kabuki.timing import Profiler
 
+# priority classes for inputs and outputs, critical work is never deferred
+CRITICAL = 0
+NORMAL = 1
+LOW = 2
+
+
 class Controller:
     """ This class is used to create and manage inputs and outputs"""
 
     def __init__(self):
         self._inputs = []
         self._outputs = []
+        self._input_classes = (_PriorityClass(), _PriorityClass(), _PriorityClass())
+        self._output_classes = (_PriorityClass(), _PriorityClass(), _PriorityClass())
+        self._budget = None
+        self._overruns = 0
         self._profiler = None
+        self._event_inputs = []
+        self._event_outputs = None  # per event input, the outputs downstream of it
+        self._events_pending = False
+        self._replacement = None  # a controller to take over from at the next update
+        self._async_inputs = []  # polled when ready by run_async()
+        self._async_changes = 0  # counts changes to _async_inputs, so run_async() notices
+        self._promoted = None  # inputs below CRITICAL that CRITICAL outputs read, by id
+        self._poll_unpromoted = self._poll_unless_promoted
+        self._trace = None  # a TraceSink ended with each tick, kept when the graph is cleared
 
-    def poll_input(self, pollable):
+    def poll_input(self, pollable, priority=CRITICAL):
         """
         Registers an object to be polled with each loop.
         :param pollable: An object with a poll function.
+        :param priority: CRITICAL, NORMAL or LOW. Inputs below CRITICAL are not polled once
+        the tick budget is spent, except those a CRITICAL output reads, which are polled
+        with the CRITICAL inputs. An input is seen as read when it is one of the output's
+        nodes or an attribute of one, as AccelIn is of its axis nodes.
         """
+        self._input_classes[_check_priority(priority)].items.append(pollable)
         self._inputs.append(pollable)
+        self._promoted = None
+
+    def poll_when_ready(self, pollable):
+        """
+        Registers an object to be polled when it says it is ready rather than every loop.
+        Only run_async() polls these.
+        :param pollable: An object with a poll function and a coroutine function wait() that
+        returns when there is something to poll, e.g. a stream becoming readable.
+        """
+        self._async_inputs.append(pollable)
+        self._async_changes += 1
 
-    def wire_output(self, node, consumer):
+    def wire_output(self, node, consumer, priority=NORMAL):
         """
         Connect a node to an output (consumer)
-        :param node: The last operand to connect to the output.
+        :param node: The last operand to connect to the output, or a list of them to gather
+        into one array value, e.g. for a ServoBank.
         :param consumer: A function that can receive a value or an object with a value
         property.
+        :param priority: CRITICAL, NORMAL or LOW. Outputs below CRITICAL are deferred to a
+        later tick once the tick budget is spent.
         """
+        _check_priority(priority)
+        if isinstance(node, (list, tuple)):
+            from kabuki.selection import Gather
+            node = Gather(node)
         if callable(consumer):
-            self._outputs.append(FunctionOutput(node, consumer))
+            output = FunctionOutput(node, consumer)
         elif hasattr(consumer, "consume"):
             f = getattr(consumer, "consume")
             if not callable(f):
                 raise RuntimeError("consumer attribute \"consume\" is not callable")
-            self._outputs.append(ValueOutput(node, consumer))
+            output = ValueOutput(node, consumer)
         else:
             raise RuntimeError("output consumer must be callable or have a consume function")
+        self._outputs.append(output)
+        self._output_classes[priority].items.append(output)
+        self._event_outputs = None
+        self._promoted = None
+
+    def set_budget(self, milliseconds):
+        """
+        Limit the time spent per tick on work below CRITICAL priority.
+        :param milliseconds: The tick budget (fractions allowed), or None for no limit.
+        """
+        self._budget = None if milliseconds is None else int(milliseconds * 1000)
+
+    def deferred_outputs(self, priority):
+        """ The number of output updates of the given priority deferred so far. """
+        return self._output_classes[priority].deferred
+
+    def deferred_polls(self, priority):
+        """ The number of polls of inputs of the given priority deferred so far. """
+        return self._input_classes[priority].deferred
+
+    @property
+    def overruns(self):
+        """ The number of ticks that ran out of budget. """
+        return self._overruns
+
+    def wire_event(self, event_input):
+        """
+        Registers an input that signals when it changes instead of being polled.
+        :param event_input: An EventInput or other node with a set_handler function.
+        """
+        event_input.set_handler(self._on_event)
+        self._event_inputs.append(event_input)
+        self._event_outputs = None
+
+    def _on_event(self):
+        # may be called from an interrupt, so only set a flag
+        self._events_pending = True
 
     def update(self):
-        """ Reset all cached values, recalculate and send to outputs. """
+        """
+        Reset all cached values, recalculate and send to outputs. Work is done in priority
+        order, and work below CRITICAL is deferred once the budget is spent, though each
+        class gets at least one item done per tick so it always makes progress.
+        """
+        if self._replacement is not None:
+            self._adopt()
+        if self._promoted is None:
+            self._map_promoted()
+        start = timing.micros()
         for output in self._outputs:
             output.reset()
 
-        # poll non-auto-calculating inputs
-        for input in self._inputs:
-            try:
-                input.poll()
-            except TypeError as error:
-                if str(error).find("object is not callable") != -1:
-                    raise RuntimeError("object passed to poll_input() must have a poll() function.")
-                else:
-                    raise error
+        # finish each class, polling non-auto-calculating inputs then updating outputs,
+        # before starting on the next
+        overrun = False
+        for priority in (CRITICAL, NORMAL, LOW):
+            if priority == CRITICAL:
+                self._service(self._input_classes[priority], priority, start, _poll)
+                # inputs of lower classes that critical outputs read, so they read this tick's values
+                for pollable in self._promoted.values():
+                    _poll(pollable)
+            elif self._service(self._input_classes[priority], priority, start, self._poll_unpromoted):
+                overrun = True
+            if self._service(self._output_classes[priority], priority, start, _update):
+                overrun = True
 
-        for output in self._outputs:
+        if overrun:
+            self._overruns += 1
+        if self._trace is not None:
+            self._trace.end_tick()
+
+    def _service(self, priority_class, priority, start, action):
+        # returns True if any work was deferred
+        items = priority_class.items
+        count = len(items)
+        if priority == CRITICAL or self._budget is None:
+            for item in items:
+                action(item)
+            return False
+        # resume where the last deferral left off so no item starves
+        first = priority_class.next if priority_class.next < count else 0
+        done = False
+        for i in range(count):
+            index = (first + i) % count
+            if done and timing.elapsed_micros(start) >= self._budget:
+                priority_class.next = index
+                priority_class.deferred += count - i
+                return True
+            if action(items[index]) is not _SKIPPED:
+                done = True
+        priority_class.next = 0
+        return False
+
+    def _poll_unless_promoted(self, pollable):
+        if id(pollable) in self._promoted:
+            return _SKIPPED  # already polled with the critical inputs
+        _poll(pollable)
+
+    def _map_promoted(self):
+        lower = {}
+        for priority in (NORMAL, LOW):
+            for pollable in self._input_classes[priority].items:
+                lower[id(pollable)] = pollable
+        promoted = {}
+        if lower:
+            for output in self._output_classes[CRITICAL].items:
+                for node in graph.nodes(output._operand):
+                    if id(node) in lower:
+                        promoted[id(node)] = node
+                    for value in getattr(node, "__dict__", {}).values():
+                        if id(value) in lower:
+                            promoted[id(value)] = value
+        self._promoted = promoted
+
+    def update_events(self):
+        """
+        Recalculate and send only the outputs downstream of event inputs that signaled
+        since the last call. Polled inputs are not polled.
+        :return: True if any event input had signaled.
+        """
+        if self._replacement is not None:
+            self._adopt()
+        if not self._events_pending:
+            return False
+        self._events_pending = False
+        if self._event_outputs is None:
+            self._map_event_outputs()
+
+        dirty = []
+        for event_input, outputs in zip(self._event_inputs, self._event_outputs):
+            if event_input._signaled:
+                # clear before recalculating so a signal during the update is not lost
+                event_input._signaled = False
+                for output in outputs:
+                    if output not in dirty:
+                        dirty.append(output)
+
+        for output in dirty:
+            output.reset()
+        for output in dirty:
             output.update()
+        if self._trace is not None:
+            self._trace.end_tick()
+        return True
+
+    def _map_event_outputs(self):
+        self._event_outputs = [[] for _ in self._event_inputs]
+        for output in self._outputs:
+            upstream = graph.nodes(output._operand)
+            for index, event_input in enumerate(self._event_inputs):
+                if any(node is event_input for node in upstream):
+                    self._event_outputs[index].append(output)
 
     def run(self):
         while True:
@@ -57,12 +234,85 @@ class Controller:
             if self._profiler:
                 self._profiler.update()
 
+    def run_events(self, period=None):
+        """
+        Loop forever, updating outputs when event inputs signal and sleeping otherwise.
+        :param period: Milliseconds between full updates (polling inputs and updating all
+        outputs), or None to only update on events.
+        """
+        last_update = timing.millis()
+        while True:
+            if period is not None and timing.millis() - last_update >= period:
+                last_update = timing.millis()
+                self.update()
+            elif not self.update_events():
+                timing.idle()
+            if self._profiler:
+                self._profiler.update()
+
+    async def run_async(self, period=10):
+        """
+        Loop forever as an asyncio (or uasyncio) task, updating every period and letting
+        other tasks run in between. See kabuki.tasks.
+        :param period: Milliseconds between the starts of updates.
+        """
+        from kabuki import tasks
+        await tasks.run(self, period)
+
+    def swap(self, other):
+        """
+        Take over the inputs and outputs of another controller at the start of the next
+        update, so a new graph replaces the running one between ticks. Stateful nodes that
+        are unchanged carry on where they were, see graph.transfer_state().
+        :param other: A controller with the new graph wired, not itself run.
+        """
+        self._replacement = other
+
+    def _adopt(self):
+        other = self._replacement
+        self._replacement = None
+        graph.transfer_state(self.output_nodes(), other.output_nodes())
+        self.clear()
+        for priority in (CRITICAL, NORMAL, LOW):
+            for pollable in other._input_classes[priority].items:
+                self.poll_input(pollable, priority)
+            for output in other._output_classes[priority].items:
+                self._outputs.append(output)
+                self._output_classes[priority].items.append(output)
+        for event_input in other._event_inputs:
+            self.wire_event(event_input)
+        for pollable in other._async_inputs:
+            self.poll_when_ready(pollable)
+
+    def output_nodes(self):
+        """ The nodes wired to outputs. """
+        return [output._operand for output in self._outputs]
+
+    def trace_to(self, sink):
+        """
+        Have a TraceSink write out each tick's Debug values once the tick is done. The sink
+        stays through clear() and swap(), so tracing carries on after a reload.
+        :param sink: The TraceSink, or None to stop.
+        """
+        self._trace = sink
+
     def enable_profiling(self):
         self._profiler = Profiler()
 
     def clear(self):
+        for event_input in self._event_inputs:
+            event_input.set_handler(None)
         self._inputs.clear()
         self._outputs.clear()
+        for priority_class in self._input_classes + self._output_classes:
+            priority_class.items.clear()
+            priority_class.next = 0
+        self._event_inputs.clear()
+        self._event_outputs = None
+        self._events_pending = False
+        self._async_inputs.clear()
+        self._async_changes += 1
+        self._promoted = None
 
 
 class ValueInput(Operator):
@@ -75,6 +325,9 @@ class ValueInput(Operator):
     def _calculate_value(self):
         return self._value_supplier.value
 
+    def _settings(self):
+        return (type(self._value_supplier).__name__,)
+
 
 class FunctionInput(Operator):
     """ Adapts an arbitrary input (function returning a value) to an operand."""
@@ -89,6 +342,115 @@ class FunctionInput(Operator):
             raise RuntimeError("input function must return a value")
         return val
 
+    def _settings(self):
+        # A name alone can't tell lambdas apart, they are all "<lambda>": add where and what
+        # the code is, which survives re-importing nodes.py. Where the code isn't available
+        # (MicroPython) an anonymous function is keyed by identity so it never matches.
+        function = self._value_getter_function
+        name = getattr(function, "__name__", None)
+        code = getattr(getattr(function, "__func__", function), "__code__", None)
+        if code is not None:
+            return (name, code.co_firstlineno, code.co_code, code.co_consts, code.co_names,
+                    _constants(getattr(function, "__defaults__", None)))
+        if name is None or name == "<lambda>":
+            return (name, id(function))
+        return (name,)
+
+
+class _PriorityClass:
+
+    def __init__(self):
+        self.items = []
+        self.next = 0  # where to resume after work was deferred
+        self.deferred = 0
+
+
+def _constants(values):
+    """ The numbers and strings among values, e.g. the defaults of lambda i=i: read(i). """
+    if not values:
+        return ()
+    return tuple([value if isinstance(value, (int, float, str)) else type(value).__name__
+                  for value in values])
+
+
+def _check_priority(priority):
+    if priority not in (CRITICAL, NORMAL, LOW):
+        raise RuntimeError("priority must be CRITICAL, NORMAL or LOW")
+    return priority
+
+
+def _poll(pollable):
+    try:
+        pollable.poll()
+    except TypeError as error:
+        if str(error).find("object is not callable") != -1:
+            raise RuntimeError("object passed to poll_input() must have a poll() function.")
+        else:
+            raise error
+
+
+_SKIPPED = object()
+
+
+def _update(output):
+    output.update()
+
+
+class EventInput(Operator):
+    """ An input that notifies its controller when it changes instead of being polled. """
+
+    def __init__(self, value=None):
+        super().__init__()
+        self._value = value
+        self._signaled = False
+        self._handler = None
+
+    def set_handler(self, handler):
+        self._handler = handler
+
+    def signal(self):
+        """ Mark this input as changed. Does not allocate, so is safe to call from an interrupt. """
+        self._signaled = True
+        handler = self._handler
+        if handler is not None:
+            handler()
+
+    def set(self, value):
+        """ Change the value and signal. """
+        self._value = value
+        self.signal()
+
+    def _calculate_value(self):
+        return self._value
+
+    def _spec(self):
+        return "EventInput", [self._value]
+
+
+class Hold(Operator):
+    """
+    Samples a value in one controller and holds it for others running at other rates (see
+    kabuki.supervisor). Wire it as an output of the controller that calculates the value and
+    use it as a node in the others, which then read the last sample without recalculating
+    or resetting anything upstream.
+    """
+
+    _state_attributes = ("_held",)
+
+    def __init__(self, value=None):
+        """ :param value: The value until the first sample. """
+        super().__init__()
+        self._held = value
+
+    def consume(self, value):
+        self._held = value
+
+    def _calculate_value(self):
+        return self._held
+
+    def _spec(self):
+        return "Hold", [self._held]
+
 
 class Output:
 
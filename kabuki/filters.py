@@ -0,0 +1,193 @@
+from array import array
+
+from kabuki import timing
+from kabuki.operators import SingleArgumentOperator, DoubleArgumentOperator, TripleArgumentOperator, \
+    QuintupleArgumentOperator, _map
+
+""" Operators that limit, rescale and smooth values. """
+
+
+class FilterAbove(DoubleArgumentOperator):
+
+    def _calculate_value(self):
+        value = self._first_operand.value
+        limit = self._second_operand.value
+        if value < limit:
+            return value
+        else:
+            return 0
+
+
+class FilterBelow(DoubleArgumentOperator):
+
+    def _calculate_value(self):
+        value = self._first_operand.value
+        limit = self._second_operand.value
+        if value > limit:
+            return value
+        else:
+            return 0
+
+
+class FilterBetween(TripleArgumentOperator):
+
+    def _calculate_value(self):
+        val = self._first_operand.value
+        lower = self._second_operand.value
+        upper = self._third_operand.value
+        if lower <= val <= upper:
+            return 0
+        else:
+            return val
+
+
+class RetainBetween(TripleArgumentOperator):
+
+    def _calculate_value(self):
+        val = self._first_operand.value
+        lower = self._second_operand.value
+        upper = self._third_operand.value
+        if lower <= val <= upper:
+            return val
+        else:
+            return 0
+
+
+class Constrain(TripleArgumentOperator):
+
+    def _calculate_value(self):
+        val = self._first_operand.value
+        bound_1 = self._second_operand.value
+        bound_2 = self._third_operand.value
+        upper = bound_1 if bound_1 > bound_2 else bound_2
+        lower = bound_2 if bound_2 < bound_1 else bound_1
+        return min(upper, max(lower, val))
+
+
+class Map(QuintupleArgumentOperator):
+
+    def _calculate_value(self):
+        val = self._first_operand.value
+        in_start = self._second_operand.value
+        in_stop = self._third_operand.value
+        out_start = self._fourth_operand.value
+        out_stop = self._fifth_operand.value
+
+        return _map(val, in_start, in_stop, out_start, out_stop)
+
+
+class Lut(SingleArgumentOperator):
+    """
+    A transfer curve from a table of values evenly spaced over an input range, interpolated
+    linearly and held at the ends outside the range. See make_table().
+    """
+
+    def __init__(self, node, table, in_start, in_stop):
+        """
+        :param node: The input.
+        :param table: The output values, at least two, e.g. an array.
+        :param in_start: The input of the first value.
+        :param in_stop: The input of the last value.
+        """
+        super().__init__(node)
+        if len(table) < 2:
+            raise RuntimeError("a table needs at least two values")
+        if in_start == in_stop:
+            raise RuntimeError("the input range is empty")
+        self._table = table
+        self._last = len(table) - 1
+        self._in_start = in_start
+        self._in_span = in_stop - in_start
+
+    def _calculate_value(self):
+        table = self._table
+        last = self._last
+        position = (self._first_operand.value - self._in_start) * last / self._in_span
+        if position <= 0:
+            return table[0]
+        if position >= last:
+            return table[last]
+        i = int(position)
+        left = table[i]
+        right = table[i + 1]
+        value = left + (right - left) * (position - i)
+        # keep rounding from overshooting the segment, as Constrain would
+        upper = left if left > right else right
+        lower = right if right < left else left
+        return min(upper, max(lower, value))
+
+    def _settings(self):
+        return (tuple(self._table), self._in_start, self._in_span)
+
+    def _spec(self):
+        return "Lut", [self._first_operand, list(self._table), self._in_start, self._in_start + self._in_span]
+
+
+def make_table(function, in_start, in_stop, size=64, typecode="f"):
+    """
+    A table for Lut of a function's values evenly spaced over an input range, e.g. for gamma:
+    make_table(lambda x: 255 * (x / 255) ** 2.2, 0, 255)
+    :param function: A function of one number.
+    :param size: The number of values.
+    :param typecode: The array typecode, "f" for floats or e.g. "H" for unsigned 16 bit.
+    """
+    step = (in_stop - in_start) / (size - 1)
+    values = [function(in_start + step * i) for i in range(size)]
+    if typecode != "f" and typecode != "d":
+        values = [int(round(v)) for v in values]
+    return array(typecode, values)
+
+
+class ReduceNoise(DoubleArgumentOperator):
+
+    _state_attributes = ("_last_trend_direction", "_last_trend_value")
+
+    def __init__(self, value_node, band):
+        super().__init__(value_node, band)
+        self._last_trend_direction = True  # True for "up"
+        self._last_trend_value = 0 # the last value that was in the trend direction
+
+    def _calculate_value(self):
+        band = self._second_operand.value
+        current_value = self._first_operand.value
+        diff = current_value - self._last_trend_value
+        current_direction = True if diff >= 0 else False
+
+        if current_direction != self._last_trend_direction:
+            if abs(diff) >= band:
+                self._last_trend_direction = current_direction
+                self._last_trend_value = current_value
+                value = current_value
+            else:
+                value = self._last_trend_value
+        else:
+            self._last_trend_value = current_value
+            value = current_value
+
+        return value
+
+
+class Throttle(SingleArgumentOperator):
+
+    _state_attributes = ("_last_sample_time", "_cached_value")
+
+    def __init__(self, value_node, milliseconds):
+        super().__init__(value_node)
+        self._last_sample_time = 0
+        self._threshold = milliseconds
+
+    def _calculate_value(self):
+        self._last_sample_time = timing.millis()
+        return self._first_operand.value
+
+    def reset(self):
+        current = timing.millis()
+        elapsed = current - self._last_sample_time
+        if elapsed >= self._threshold:
+            super().reset()
+
+    def _settings(self):
+        return (self._threshold,)
+
+    def _spec(self):
+        return "Throttle", [self._first_operand, self._threshold]
@@ -0,0 +1,122 @@
+""" Helpers for inspecting a web of nodes. """
+
+
+def nodes(*roots):
+    """
+    Collect every node reachable from the given nodes, each node once.
+    :param roots: The nodes to start from, typically the nodes wired to outputs.
+    :return: A list of nodes.
+    """
+    seen = set()
+    found = []
+    pending = list(roots)
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        found.append(node)
+        operands = getattr(node, "operands", None)
+        if operands is not None:
+            pending.extend(operands())
+    return found
+
+
+def key(node, keys=None):
+    """
+    A structural key that identifies a node across rebuilds of the graph: the node's name
+    if it has one (see Operable.named), otherwise its class, settings and operand keys.
+    Operand keys are numbered in keys to keep keys flat however deep the graph, so keys
+    only compare equal when they were made with the same dictionary.
+    :param keys: A dictionary to remember keys in, shared by every graph being compared
+        while all of them are alive (nodes are remembered by id).
+    """
+    if keys is None:
+        keys = {}
+    # Walk with a list rather than recursing so long chains of nodes can't overflow the stack.
+    pending = [node]
+    expanded = set()
+    while pending:
+        current = pending[-1]
+        if id(current) in keys:
+            pending.pop()
+            continue
+        name = getattr(current, "_name", None)
+        operands = current.operands() if name is None and hasattr(current, "operands") else ()
+        missing = [operand for operand in operands if id(operand) not in keys]
+        if missing:
+            if id(current) in expanded:
+                raise RuntimeError("graph has a cycle")
+            expanded.add(id(current))
+            pending.extend(missing)
+            continue
+        if name is not None:
+            k = ("name", name)
+        else:
+            settings = current._settings() if hasattr(current, "_settings") else ()
+            k = (type(current).__name__,
+                 tuple([_hashable(setting) for setting in settings]),
+                 tuple([keys[keys[id(operand)]] for operand in operands]))
+        keys[id(current)] = k
+        if k not in keys:
+            keys[k] = len(keys)
+        pending.pop()
+    return keys[id(node)]
+
+
+def _hashable(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return id(value)
+
+
+def replace(roots, replacements):
+    """
+    Point the references to nodes at their replacements, in every node reachable from the
+    given roots, including in lists such as Channel keys.
+    :param roots: Where to start, nodes or outputs.
+    :param replacements: A dictionary of node id to the node replacing it.
+    """
+    for node in nodes(*roots):
+        attributes = node.__dict__
+        for name in list(attributes):
+            value = attributes[name]
+            if isinstance(value, list):
+                for i in range(len(value)):
+                    new = replacements.get(id(value[i]))
+                    if new is not None:
+                        value[i] = new
+            else:
+                new = replacements.get(id(value))
+                if new is not None:
+                    setattr(node, name, new)
+
+
+def transfer_state(old_roots, new_roots):
+    """
+    Carry the state of stateful nodes (Cycler positions, ReduceNoise trends and so on) from an
+    old graph to the matching nodes of its replacement. Nodes match by key().
+    :param old_roots: The nodes wired to outputs in the old graph.
+    :param new_roots: The nodes wired to outputs in the new graph.
+    :return: The number of nodes whose state was carried over.
+    """
+    keys = {}
+    candidates = {}
+    for node in nodes(*old_roots):
+        if getattr(node, "_state_attributes", ()):
+            candidates.setdefault(key(node, keys), []).append(node)
+
+    count = 0
+    for node in nodes(*new_roots):
+        attributes = getattr(node, "_state_attributes", ())
+        if attributes:
+            matches = candidates.get(key(node, keys))
+            if matches:
+                old = matches.pop(0)
+                if type(old) is type(node):
+                    for attribute in attributes:
+                        setattr(node, attribute, getattr(old, attribute))
+                    count += 1
+    return count
@@ -0,0 +1,315 @@
+import json
+
+import kabuki.controller
+from kabuki import operators
+
+"""
+Saves a controller's graph as compact JSON and builds it again without compiling Python,
+so a board can load large graphs quickly. The file looks like:
+
+{"v": 1,
+ "o": [["Operand", [2]], ["AccelIn", []], [[1, "y"], []], ["Mul", [{"@": 2}, {"@": 0}]], ["LedOut", [1]]],
+ "p": [[1, 0]],
+ "e": [],
+ "w": [[3, 4, 1]]}
+
+"o" lists the objects in the order they are built. Each is a class name, or [object index,
+method name], with the arguments to call it with and optionally the node's name.
+{"@": i} refers to object i. "p" lists polled objects and their priority, "e" the
+event inputs and "w" the outputs as node, consumer and priority.
+
+Objects describe themselves for saving with a _spec() function returning the class name, or
+(object, method name), and the list of arguments.
+"""
+
+_VERSION = 1
+
+
+def dumps(controller, exclude=()):
+    """
+    Describe a controller's inputs, outputs and the nodes between them.
+    :param controller: The controller to save.
+    :param exclude: Polled objects to leave out, such as the runner's Loader.
+    :return: JSON text.
+    """
+    writer = _Writer()
+    polled = []
+    for priority in range(len(controller._input_classes)):
+        for pollable in controller._input_classes[priority].items:
+            if not any([pollable is e for e in exclude]):
+                polled.append([writer.index(pollable), priority])
+    events = [writer.index(event_input) for event_input in controller._event_inputs]
+    wired = []
+    for priority in range(len(controller._output_classes)):
+        for output in controller._output_classes[priority].items:
+            if isinstance(output, kabuki.controller.ValueOutput):
+                consumer = output._value_consumer
+            else:
+                consumer = output._value_setter_function
+            wired.append([writer.index(output._operand), writer.index(consumer), priority])
+    return json.dumps({"v": _VERSION, "o": writer.objects, "p": polled, "e": events, "w": wired},
+                      separators=(",", ":"))
+
+
+def loads(text, controller, modules=()):
+    """
+    Build a saved graph and wire it into a controller.
+    :param text: JSON text from dumps().
+    :param controller: The controller to poll and wire the objects with.
+    :param modules: Modules with further classes the graph uses, e.g. kabuki.pyboard.inputs.
+    :return: The built objects.
+    """
+    builder = GraphBuilder(json.loads(text), modules)
+    builder.build()
+    builder.install(controller)
+    return builder.objects
+
+
+def load(path, controller, modules=()):
+    """ Like loads() but reads the graph from a file. """
+    with open(path) as f:
+        return loads(f.read(), controller, modules)
+
+
+class GraphBuilder:
+    """ Builds the objects of a parsed graph file, all at once or a few at a time. """
+
+    def __init__(self, data, modules=()):
+        if data.get("v") != _VERSION:
+            raise RuntimeError("unsupported graph file version")
+        self._data = data
+        self._registry = _registry((operators, kabuki.controller) + tuple(modules))
+        self.objects = []
+
+    def build(self, count=None):
+        """
+        Build the next objects.
+        :param count: The most objects to build, all that remain if None.
+        :return: True once every object is built.
+        """
+        entries = self._data["o"]
+        stop = len(entries) if count is None else min(len(entries), len(self.objects) + count)
+        for i in range(len(self.objects), stop):
+            self.objects.append(self._build_one(entries[i]))
+        return len(self.objects) == len(entries)
+
+    def _build_one(self, entry):
+        target = entry[0]
+        args = self._decode(entry[1])
+        if isinstance(target, str):
+            factory = self._registry.get(target)
+            if factory is None:
+                factory = _imported_on_demand(target)
+            if factory is None:
+                raise RuntimeError("unknown class in graph file: %s" % target)
+        else:
+            factory = getattr(self._ref(target[0]), target[1])
+        obj = factory(*args)
+        if len(entry) > 2:
+            obj.named(entry[2])
+        return obj
+
+    def _decode(self, value):
+        if isinstance(value, list):
+            return [self._decode(v) for v in value]
+        if isinstance(value, dict):
+            return self._ref(value["@"])
+        return value
+
+    def _ref(self, index):
+        if index >= len(self.objects):
+            raise RuntimeError("graph file refers to an object before it is built")
+        return self.objects[index]
+
+    def install(self, controller):
+        """ Poll and wire the built objects with a controller. """
+        objects = self.objects
+        for index, priority in self._data["p"]:
+            controller.poll_input(objects[index], priority)
+        for index in self._data["e"]:
+            controller.wire_event(objects[index])
+        for node, consumer, priority in self._data["w"]:
+            controller.wire_output(objects[node], objects[consumer], priority)
+
+
+class _Writer:
+
+    def __init__(self):
+        self.objects = []
+        self._indexes = {}
+
+    def index(self, obj):
+        key = id(obj)
+        if key not in self._indexes:
+            spec = getattr(obj, "_spec", None)
+            if spec is None:
+                raise RuntimeError("%s can't be saved in a graph file" % type(obj).__name__)
+            target, args = spec()
+            if not isinstance(target, str):
+                target = [self.index(target[0]), target[1]]
+            entry = [target, self._encode(args)]
+            name = getattr(obj, "_name", None)
+            if name is not None:
+                entry.append(name)
+            self._indexes[key] = len(self.objects)
+            self.objects.append(entry)
+        return self._indexes[key]
+
+    def _encode(self, value):
+        if isinstance(value, (list, tuple)):
+            return [self._encode(v) for v in value]
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return {"@": self.index(value)}
+
+
+def push_lines(text, size=128):
+    """
+    The lines that send a graph to a GraphReceiver: "#begin", the text in chunks of "#+"
+    followed by at most size characters, then "#end" and the length of the text.
+    """
+    lines = ["#begin"]
+    for start in range(0, len(text), size):
+        lines.append("#+" + text[start:start + size])
+    lines.append("#end %d" % len(text))
+    return lines
+
+
+class GraphReceiver:
+    """
+    Receives a graph as lines (see push_lines()) while the current graph keeps running,
+    builds it a few objects per poll and then swaps it into the controller between ticks.
+    Replies "#ok" and the object count once the graph is built, to run from the next tick,
+    or "#error" and the reason, in which case the running graph is left as it is.
+    """
+
+    def __init__(self, controller, modules=(), keep=(), per_poll=8, reply=None, on_swap=None):
+        """
+        :param controller: The controller running the graph to replace.
+        :param modules: Modules with further classes the graph uses.
+        :param keep: Objects to keep polling at CRITICAL priority in the new graph, such as
+        whatever feeds lines to this receiver.
+        :param per_poll: The most objects built per poll.
+        :param reply: A function taking a reply line, print() if None.
+        :param on_swap: A function called with the staged controller when a graph is built.
+        """
+        self._controller = controller
+        self._modules = modules
+        self._keep = keep
+        self._per_poll = per_poll
+        self._reply = reply if reply is not None else print
+        self._on_swap = on_swap
+        self._chunks = None  # text received so far, None when not receiving
+        self._builder = None
+
+    def feed(self, line):
+        """ Take one received line, "#begin", "#+..." or "#end <length>". """
+        if line.startswith("#+"):
+            if self._chunks is not None:
+                self._chunks.append(line[2:])
+        elif line.startswith("#begin"):
+            self._chunks = []
+            self._builder = None  # a new graph replaces one still being built
+        elif line.startswith("#end"):
+            self._finish_receiving(line)
+
+    def _finish_receiving(self, line):
+        chunks = self._chunks
+        self._chunks = None
+        if chunks is None:
+            return
+        text = "".join(chunks)
+        try:
+            length = int(line[4:])
+        except ValueError:
+            length = -1
+        if length != len(text):
+            self._reply("#error graph incomplete, received %d characters" % len(text))
+            return
+        try:
+            self._builder = GraphBuilder(json.loads(text), self._modules)
+        except Exception as exc:
+            self._reply("#error %s" % exc)
+
+    def poll(self):
+        builder = self._builder
+        if builder is None:
+            return
+        try:
+            if not builder.build(self._per_poll):
+                return
+            self._builder = None
+            staged = kabuki.controller.Controller()
+            for pollable in self._keep:
+                staged.poll_input(pollable)
+            builder.install(staged)
+        except Exception as exc:
+            self._builder = None
+            self._reply("#error %s" % exc)
+            return
+        self._controller.swap(staged)
+        if self._on_swap is not None:
+            self._on_swap(staged)
+        self._reply("#ok %d" % len(builder.objects))
+
+
+_ON_DEMAND = {
+    "Capture": "kabuki.capturing",
+    "KeyTable": "kabuki.keyframes",
+    "TableChannel": "kabuki.keyframes",
+    "RemoteIn": "kabuki.remote",
+    "RemoteOut": "kabuki.remote",
+}
+
+
+def _imported_on_demand(name):
+    # classes in modules that are only imported once a graph uses them
+    if name in operators._PACKS:
+        return getattr(operators, name)
+    module = _ON_DEMAND.get(name)
+    if module is None:
+        return None
+    return getattr(__import__(module, None, None, [name]), name)
+
+
+def _registry(modules):
+    registry = {}
+    for module in modules:
+        for name in dir(module):
+            value = getattr(module, name)
+            if isinstance(value, type):
+                registry[name] = value
+    return registry
+
+
+class Stub(operators.Operator):
+    """
+    Stands in for hardware that is not available where the graph is built, e.g. building on a
+    workstation for a Pyboard. Stub("AccelIn") saves as AccelIn(), and calling a method on a
+    stub, stub.y(), gives a stub node saved as that method call.
+    Works as a node, a polled input or an output consumer for saving purposes only.
+    """
+
+    def __init__(self, target, *args):
+        super().__init__()
+        self._target = target
+        self._args = list(args)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def method(*args):
+            return Stub((self, name), *args)
+
+        return method
+
+    def _calculate_value(self):
+        # building nodes on a stub evaluates it (see Operator._wrap_if_needed), give it a number
+        return 0
+
+    def __call__(self, value):
+        raise RuntimeError("a Stub can only be saved, not run")
+
+    def _spec(self):
+        return self._target, self._args
@@ -0,0 +1,106 @@
+import csv
+
+from kabuki.operators import _map
+
+"""
+Reduces dense samples of a curve, e.g. motion capture or a recording, to the few keys a
+Channel needs to follow it within a tolerance. For the workstation, see compile_keys.py.
+"""
+
+
+def simplify(samples, tolerance):
+    """
+    Few keys, picked from the samples, whose interpolation by a Channel is within tolerance
+    of every sample (Ramer-Douglas-Peucker, measuring the error in y). Not always the fewest
+    possible, the split points are chosen greedily.
+    :param samples: (x, y) pairs with x increasing.
+    :param tolerance: The largest difference allowed between a sample and the interpolation.
+    :return: A list of (x, y) keys for Cycler.channel() or keyframes.pack_table().
+    """
+    samples = [(x, y) for x, y in samples]
+    for i in range(1, len(samples)):
+        if samples[i][0] <= samples[i - 1][0]:
+            raise RuntimeError("sample x values must increase, see sample %d" % i)
+    if len(samples) < 3:
+        return samples
+    keep = [False] * len(samples)
+    keep[0] = keep[-1] = True
+    # segments still to check, as index pairs, iteratively as curves can be long
+    pending = [(0, len(samples) - 1)]
+    while pending:
+        first, last = pending.pop()
+        worst = None
+        worst_error = tolerance
+        x1, y1 = samples[first]
+        x2, y2 = samples[last]
+        for i in range(first + 1, last):
+            x, y = samples[i]
+            error = abs(_map(x, x1, x2, y1, y2) - y)
+            if error > worst_error:
+                worst = i
+                worst_error = error
+        if worst is not None:
+            keep[worst] = True
+            pending.append((first, worst))
+            pending.append((worst, last))
+    return [sample for sample, kept in zip(samples, keep) if kept]
+
+
+def max_error(samples, keys):
+    """ The largest difference between the samples and the interpolation of the keys. """
+    worst = 0
+    if len(keys) == 1:
+        for x, y in samples:
+            worst = max(worst, abs(keys[0][1] - y))
+        return worst
+    k = 0  # the segment from key k to k + 1
+    for x, y in samples:
+        while k < len(keys) - 2 and keys[k + 1][0] <= x:
+            k += 1
+        x1, y1 = keys[k]
+        x2, y2 = keys[k + 1]
+        worst = max(worst, abs(_map(x, x1, x2, y1, y2) - y))
+    return worst
+
+
+def read_csv(path, x_column=0, y_column=1):
+    """
+    Samples from a CSV file. Lines that aren't numbers, such as a heading, are skipped.
+    :param x_column: The index or heading of the x column.
+    :param y_column: The index or heading of the y column.
+    """
+    samples = []
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    columns = [x_column, y_column]
+    if not isinstance(x_column, int) or not isinstance(y_column, int):
+        columns = [c if isinstance(c, int) else rows[0].index(c) for c in columns]
+    for row in rows:
+        try:
+            samples.append((float(row[columns[0]]), float(row[columns[1]])))
+        except (ValueError, IndexError):
+            pass
+    return samples
+
+
+def read_recording(stream, channel, x_per_ms=1):
+    """
+    Samples of a recorded channel (see kabuki.recording), x being the recorded time.
+    :param stream: A binary stream of the recording.
+    :param channel: The channel index or label.
+    :param x_per_ms: x units per recorded millisecond.
+    """
+    from kabuki.recording import Player
+    player = Player(stream)
+    node = player.channel(channel)
+    samples = []
+    while True:
+        player.poll()
+        if player.finished:
+            return samples
+        node.reset()
+        sample = (player.millis() * x_per_ms, node.value)
+        if samples and samples[-1][0] == sample[0]:
+            samples[-1] = sample  # frames in the same millisecond, keep the last
+        else:
+            samples.append(sample)
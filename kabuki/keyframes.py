@@ -0,0 +1,176 @@
+import struct
+
+from kabuki.operators import DoubleArgumentOperator, _map
+
+"""
+Key frame tables for animations too long to hold as Operands. The keys are packed as fixed
+point numbers in a file on flash, read a window at a time, or in a bytes constant, which
+stays in flash when frozen into the firmware.
+
+A table starts with b"KBK1", the key count (little endian unsigned 32 bit) and the x and y
+scales (little endian floats). Each key follows as x and y (little endian signed 32 bit)
+multiplied by the scales and rounded. Keys are sorted by x.
+"""
+
+_MAGIC = b"KBK1"
+_HEADER = "<4sIff"
+_HEADER_SIZE = 16
+_KEY = "<ii"
+_KEY_SIZE = 8
+
+
+def pack_table(keys, x_scale=1000, y_scale=1000):
+    """
+    The bytes of a table.
+    :param keys: (x, y) pairs sorted by x.
+    :param x_scale: x values are stored as round(x * x_scale).
+    :param y_scale: y values are stored as round(y * y_scale).
+    """
+    keys = list(keys)
+    data = bytearray(_HEADER_SIZE + _KEY_SIZE * len(keys))
+    struct.pack_into(_HEADER, data, 0, _MAGIC, len(keys), x_scale, y_scale)
+    last_x = None
+    for i, (x, y) in enumerate(keys):
+        if last_x is not None and x < last_x:
+            raise RuntimeError("keys must be sorted by x")
+        last_x = x
+        struct.pack_into(_KEY, data, _HEADER_SIZE + _KEY_SIZE * i, int(round(x * x_scale)), int(round(y * y_scale)))
+    return bytes(data)
+
+
+def write_table(path, keys, x_scale=1000, y_scale=1000):
+    """ Write a table to a file, see pack_table(). """
+    with open(path, "wb") as f:
+        f.write(pack_table(keys, x_scale, y_scale))
+
+
+class KeyTable:
+    """
+    The keys of a table, read a window of keys at a time from a file, or straight from bytes.
+    """
+
+    def __init__(self, source, window=16):
+        """
+        :param source: The path of a table file, a binary stream with seek and readinto, or
+        the bytes of a table (bytes, bytearray or memoryview).
+        :param window: The number of keys read from a file at a time.
+        """
+        self._path = None
+        if isinstance(source, str):
+            self._path = source
+            source = open(source, "rb")
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._stream = None
+            self._buffer = memoryview(source)
+            self._base = _HEADER_SIZE  # byte offset of the first key in the buffer
+            header = bytes(self._buffer[0:_HEADER_SIZE])
+        else:
+            self._stream = source
+            self._buffer = bytearray(_KEY_SIZE * window)
+            self._base = 0
+            source.seek(0)
+            header = source.read(_HEADER_SIZE)
+        if len(header) < _HEADER_SIZE:
+            raise RuntimeError("not a kabuki key table")
+        magic, self.count, x_scale, y_scale = struct.unpack(_HEADER, header)
+        if magic != _MAGIC:
+            raise RuntimeError("not a kabuki key table")
+        if self.count == 0:
+            raise RuntimeError("keys must have at least one key!")
+        self._x_scale = x_scale
+        self._y_scale = y_scale
+        self._window = window
+        self._start = 0  # first key in the buffer
+        self._end = self.count if self._stream is None else 0  # key after the last in the buffer
+        self.first = self.key(0)
+        self.last = self.key(self.count - 1)
+
+    def key(self, index):
+        """ Key index as (x, y). """
+        if not self._start <= index < self._end:
+            self._load(index)
+        x, y = struct.unpack_from(_KEY, self._buffer, self._base + (index - self._start) * _KEY_SIZE)
+        return x / self._x_scale, y / self._y_scale
+
+    def x(self, index):
+        return self.key(index)[0]
+
+    def _load(self, index):
+        # read a window starting one key back, as keys are read in pairs
+        start = index - 1 if index > 0 else 0
+        self._stream.seek(_HEADER_SIZE + start * _KEY_SIZE)
+        read = self._stream.readinto(self._buffer) or 0
+        self._start = start
+        self._end = start + read // _KEY_SIZE
+        if index >= self._end:
+            raise RuntimeError("key table ends unexpectedly")
+
+    def find(self, position, hint=0):
+        """
+        The number of keys with x at or below position.
+        :param hint: A previous result, the search starts there.
+        """
+        count = self.count
+        # usually the position is in the same segment as last time, or the next
+        if hint == 0 or self.x(hint - 1) <= position:
+            if hint == count or position < self.x(hint):
+                return hint
+            if hint + 1 == count or position < self.x(hint + 1):
+                return hint + 1
+        # otherwise search the whole table
+        low = 0
+        high = count
+        while low < high:
+            middle = (low + high) // 2
+            if self.x(middle) <= position:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def close(self):
+        if self._path is not None:
+            self._stream.close()
+
+    def _settings(self):
+        return (self._path if self._path is not None else id(self),)
+
+    def _spec(self):
+        if self._path is None:
+            raise RuntimeError("only key tables opened from a file path can be saved")
+        return "KeyTable", [self._path, self._window]
+
+
+class TableChannel(DoubleArgumentOperator):
+    """ A Channel with its keys in a KeyTable, see Cycler.table_channel(). """
+
+    def __init__(self, position_node, length_node, table):
+        super().__init__(position_node, length_node)
+        self._table = table
+        self._left_count = 0  # keys left of the last position, where the next search starts
+
+    def _calculate_value(self):
+        # the same choice of keys and interpolation as Channel
+        position = self._first_operand.value
+        cycler_length = self._second_operand.value
+        table = self._table
+        left_x_count = table.find(position, self._left_count)
+        self._left_count = left_x_count
+        if 0 < left_x_count < table.count:
+            left_x, left_y = table.key(left_x_count - 1)
+            right_x, right_y = table.key(left_x_count)
+        elif left_x_count == table.count:
+            left_x, left_y = table.last
+            right_x, right_y = table.first
+            right_x += cycler_length
+        else:
+            left_x, left_y = table.last
+            right_x, right_y = table.first
+            left_x -= cycler_length
+        return _map(position, left_x, right_x, left_y, right_y)
+
+    def _settings(self):
+        return self._table._settings()
+
+    def _spec(self):
+        return "TableChannel", [self._first_operand, self._second_operand, self._table]
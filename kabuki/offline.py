@@ -0,0 +1,279 @@
+import numpy as np
+
+from kabuki import timing
+from kabuki.animation import Channel
+from kabuki.filters import FilterAbove, FilterBelow, FilterBetween, RetainBetween, Constrain, Map, Lut, Throttle
+from kabuki.operators import Operand, Add, Sub, Mul, Div, Neg, Abs, Debug
+from kabuki.selection import Swap
+
+"""
+Evaluates a web of nodes over whole series of input samples at once, for analysis on a
+workstation. Requires NumPy, so is not for use on the board.
+
+Nodes the controller calculates on every tick are calculated for all ticks at once: with
+NumPy for operators without state, and one tick at a time with their own _calculate_value()
+for operators with state. Throttle and Swap only calculate some of their operands on some
+ticks, so they and the nodes that depend on them are run tick by tick as the controller
+would, with the values of the other nodes fed in. Results match the controller exactly.
+
+The nodes are the same objects the controller would run, so stateful nodes are left as if
+the ticks had run. Build a fresh graph to evaluate again from the start.
+"""
+
+
+def _number(value):
+    # Python arithmetic counts bools as 0 and 1, where NumPy does logic on them
+    if value.dtype == np.bool_:
+        return value.astype(int)
+    return value
+
+
+def _neg(value):
+    if value.dtype == np.bool_:
+        return np.logical_not(value)
+    return np.negative(value)
+
+
+def _div(numerator, denominator):
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    return np.divide(numerator, denominator, out=result, where=denominator != 0)
+
+
+def _constrain(value, bound_1, bound_2):
+    upper = np.where(bound_1 > bound_2, bound_1, bound_2)
+    lower = np.where(bound_2 < bound_1, bound_2, bound_1)
+    return np.minimum(upper, np.maximum(lower, value))
+
+
+def _map(value, in_start, in_stop, out_start, out_stop):
+    # same expression as operators._map so results match to the bit
+    return out_start + (out_stop - out_start) * ((value - in_start) / (in_stop - in_start))
+
+
+_VECTORIZED = {
+    Add: lambda a, b: _number(a) + _number(b),
+    Sub: lambda a, b: _number(a) - _number(b),
+    Mul: lambda a, b: _number(a) * _number(b),
+    Div: _div,
+    Neg: _neg,
+    Abs: lambda value: np.abs(_number(value)),
+    FilterAbove: lambda value, limit: np.where(value < limit, value, 0),
+    FilterBelow: lambda value, limit: np.where(value > limit, value, 0),
+    FilterBetween: lambda value, lower, upper: np.where((lower <= value) & (value <= upper), 0, value),
+    RetainBetween: lambda value, lower, upper: np.where((lower <= value) & (value <= upper), value, 0),
+    Constrain: _constrain,
+    Map: _map,
+    Debug: lambda value: value,
+}
+
+_LAZY = (Throttle, Swap)
+
+
+def _vectorized(kind):
+    # by the operator a class specializes, such as kabuki.optimize.BoolNeg for Neg
+    for base in kind.__mro__:
+        function = _VECTORIZED.get(base)
+        if function is not None:
+            return function
+    return None
+
+
+def _has_constant_sorted_keys(channel):
+    keys = channel._xlist + channel._ylist
+    if any([type(key) is not Operand for key in keys]):
+        return False
+    xs = [x._value for x in channel._xlist]
+    return xs == sorted(xs)
+
+
+def _channel(channel, position, length):
+    # the same choice of keys and interpolation as Channel._calculate_value()
+    xs = np.array([x._value for x in channel._xlist])
+    ys = np.array([y._value for y in channel._ylist])
+    count = len(xs)
+    left_count = np.searchsorted(xs, position, side="right")
+    inside = (left_count > 0) & (left_count < count)
+    left_index = np.where(inside, left_count - 1, count - 1)
+    right_index = np.where(inside, left_count, 0)
+    left_x = xs[left_index]
+    right_x = xs[right_index]
+    right_x = np.where(left_count == count, right_x + length, right_x)
+    left_x = np.where(left_count == 0, left_x - length, left_x)
+    return _map(position, left_x, right_x, ys[left_index], ys[right_index])
+
+
+def _lut(lut, value):
+    # the same arithmetic as Lut._calculate_value()
+    table = np.asarray(lut._table, dtype=float)
+    last = lut._last
+    position = (value - lut._in_start) * last / lut._in_span
+    i = np.clip(np.floor(position), 0, last - 1).astype(int)
+    left = table[i]
+    right = table[i + 1]
+    interpolated = np.minimum(np.maximum(left, right), np.maximum(np.minimum(left, right),
+                                                                   left + (right - left) * (position - i)))
+    return np.where(position <= 0, table[0], np.where(position >= last, table[last], interpolated))
+
+
+def evaluate(nodes, inputs, ticks=None, period=1, times=None):
+    """
+    Evaluate nodes over a series of ticks.
+    :param nodes: A node or a list of nodes, typically the nodes wired to outputs.
+    :param inputs: A dictionary of input node to a sequence of its values, one per tick.
+    :param ticks: The number of ticks, only needed when there are no inputs.
+    :param period: Milliseconds per tick, for time based nodes such as Throttle.
+    :param times: The milliseconds of each tick, instead of a fixed period.
+    :return: A NumPy array of values per node, or a list of arrays for a list of nodes.
+    """
+    single = not isinstance(nodes, (list, tuple))
+    roots = [nodes] if single else list(nodes)
+    series = {}
+    for node, samples in inputs.items():
+        series[id(node)] = np.asarray(samples)
+        if ticks is None:
+            ticks = len(series[id(node)])
+        elif len(series[id(node)]) != ticks:
+            raise RuntimeError("every input needs the same number of samples")
+    if ticks is None:
+        raise RuntimeError("ticks is needed when there are no inputs")
+    if times is None:
+        times = np.arange(ticks) * period
+    evaluator = _Evaluator(roots, inputs, series, ticks, np.asarray(times).tolist())
+    results = [evaluator.evaluate(root) for root in roots]
+    return results[0] if single else results
+
+
+class _Evaluator:
+
+    def __init__(self, roots, inputs, series, ticks, times):
+        self._inputs = inputs
+        self._results = series
+        self._ticks = ticks
+        self._times = times
+        # nodes calculated on every tick: reachable from the roots other than through the
+        # operands of a lazy node
+        self._eager = {}
+        for root in roots:
+            self._find_eager(root)
+        # eager nodes that depend on a lazy node, these are run tick by tick
+        self._tainted = {}
+        for node in self._eager.values():
+            self._is_tainted(node)
+
+    def _find_eager(self, node):
+        if id(node) in self._eager:
+            return
+        self._eager[id(node)] = node
+        if not isinstance(node, _LAZY):
+            for operand in node.operands():
+                self._find_eager(operand)
+
+    def _is_tainted(self, node):
+        key = id(node)
+        if key not in self._tainted:
+            self._tainted[key] = (isinstance(node, _LAZY)
+                                  or any([self._is_tainted(operand) for operand in node.operands()]))
+        return self._tainted[key]
+
+    def evaluate(self, node):
+        key = id(node)
+        if key not in self._results:
+            if self._tainted[key]:
+                self._simulate()
+            else:
+                self._results[key] = self._calculate(node)
+        return self._results[key]
+
+    def _calculate(self, node):
+        kind = type(node)
+        if kind is Operand:
+            return np.full(self._ticks, node._value)
+        operands = node.operands()
+        if not operands:
+            raise RuntimeError("no samples given for input %s" % node)
+        columns = [self.evaluate(operand) for operand in operands]
+        function = _vectorized(kind)
+        if function is not None:
+            return np.broadcast_to(function(*columns), (self._ticks,))
+        if kind is Channel and _has_constant_sorted_keys(node):
+            return _channel(node, columns[0], columns[1])
+        if kind is Lut:
+            return _lut(node, columns[0])
+        return self._scan(node, operands, columns)
+
+    def _scan(self, node, operands, columns):
+        # feed operand values in through their caches and let the node calculate
+        columns = [column.tolist() for column in columns]
+        values = []
+        clock = _Clock(self._times)
+        timing.set_clock(clock.millis)
+        try:
+            for tick in range(self._ticks):
+                clock.tick = tick
+                for operand, column in zip(operands, columns):
+                    operand._cached_value = column[tick]
+                values.append(node._calculate_value())
+        finally:
+            timing.set_clock(None)
+        return np.array(values)
+
+    def _simulate(self):
+        # run every tainted node tick by tick as the controller would, feeding in the values
+        # of the eager nodes they read that do not depend on a lazy node
+        tainted = [node for node in self._eager.values() if self._tainted[id(node)]]
+        fed = []  # (node, values, always) where always is False for inputs beneath lazy nodes
+        seen = set()
+        pending = list(tainted)
+        while pending:
+            node = pending.pop()
+            key = id(node)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in self._eager and not self._tainted[key]:
+                fed.append((node, self.evaluate(node).tolist(), True))
+            elif node.operands():
+                pending.extend(node.operands())
+            elif type(node) is not Operand:
+                if node not in self._inputs:
+                    raise RuntimeError("no samples given for input %s" % node)
+                fed.append((node, self._results[key].tolist(), False))
+        values = [[] for _ in tainted]
+        clock = _Clock(self._times)
+        timing.set_clock(clock.millis)
+        # fed values are replaced every tick, so save resetting everything beneath them
+        for node, column, always in fed:
+            if always:
+                node.reset = _keep
+        try:
+            for tick in range(self._ticks):
+                clock.tick = tick
+                for node in tainted:
+                    node.reset()
+                for node, column, always in fed:
+                    # inputs beneath a lazy node keep their value unless they were reset
+                    if always or node._cached_value is None:
+                        node._cached_value = column[tick]
+                for node, node_values in zip(tainted, values):
+                    node_values.append(node.value)
+        finally:
+            timing.set_clock(None)
+            for node, column, always in fed:
+                if always:
+                    del node.reset
+        for node, node_values in zip(tainted, values):
+            self._results[id(node)] = np.array(node_values)
+
+
+def _keep():
+    pass
+
+
+class _Clock:
+
+    def __init__(self, times):
+        self._times = times
+        self.tick = 0
+
+    def millis(self):
+        return self._times[self.tick]
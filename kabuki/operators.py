@@ -1,4 +1,46 @@
-from kabuki import timing
+from kabuki import trace
+
+"""
+The core operators. Operators for filtering, smoothing, animation, selection and dictionary
+sources are in packs (kabuki.filters, kabuki.smoothing, kabuki.animation, kabuki.selection
+and kabuki.sources) that are only imported once a graph uses them, so a small graph leaves
+them out of RAM. They can still be imported from here, e.g. from kabuki.operators import Cycler.
+"""
+
+# pack of each operator that is not in the core
+_PACKS = {
+    "FilterAbove": "filters",
+    "FilterBelow": "filters",
+    "FilterBetween": "filters",
+    "RetainBetween": "filters",
+    "Constrain": "filters",
+    "Map": "filters",
+    "ReduceNoise": "filters",
+    "Lut": "filters",
+    "MovingAverage": "smoothing",
+    "Ema": "smoothing",
+    "Median": "smoothing",
+    "Biquad": "smoothing",
+    "SlewLimit": "smoothing",
+    "Throttle": "filters",
+    "Cycler": "animation",
+    "Channel": "animation",
+    "Swap": "selection",
+    "Gather": "selection",
+    "DictSourceOperator": "sources",
+}
+
+__all__ = ["Operable", "Operator", "Operand", "SingleArgumentOperator", "DoubleArgumentOperator",
+           "TripleArgumentOperator", "QuadrupleArgumentOperator", "QuintupleArgumentOperator",
+           "Add", "Sub", "Neg", "Abs", "Div", "Mul", "Debug"] + sorted(_PACKS)
+
+
+def __getattr__(name):
+    # import a pack on first use of one of its operators
+    pack = _PACKS.get(name)
+    if pack is None:
+        raise AttributeError(name)
+    return getattr(__import__("kabuki." + pack, None, None, [name]), name)
 
 
 class Operable:
@@ -23,44 +65,91 @@ class Operable:
         return Abs(self)
 
     def filter_above(self, node):
+        from kabuki.filters import FilterAbove
         return FilterAbove(self, node)
 
     def filter_below(self, node):
+        from kabuki.filters import FilterBelow
         return FilterBelow(self, node)
 
     def filter_between(self, lower_node, upper_node):
+        from kabuki.filters import FilterBetween
         return FilterBetween(self, lower_node, upper_node)
 
     def constrain(self, lower_node, upper_node):
+        from kabuki.filters import Constrain
         return Constrain(self, lower_node, upper_node)
 
     def map(self, in_start_node, in_stop_node, out_start_node, out_stop_node, constrain=True):
+        from kabuki.filters import Map
         op = Map(self, in_start_node, in_stop_node, out_start_node, out_stop_node)
         if constrain:
             return op.constrain(out_start_node, out_stop_node)
         else:
             return op
 
+    def lut(self, table, in_start, in_stop):
+        """ See Lut and make_table() in kabuki.filters. """
+        from kabuki.filters import Lut
+        return Lut(self, table, in_start, in_stop)
+
     def retain_between(self, lower_node, upper_node):
+        from kabuki.filters import RetainBetween
         return RetainBetween(self, lower_node, upper_node)
 
     def reduce_noise(self, band_node):
+        from kabuki.filters import ReduceNoise
         return ReduceNoise(self, band_node)
 
+    def moving_average(self, size):
+        """ The average of the last size values. """
+        from kabuki.smoothing import MovingAverage
+        return MovingAverage(self, size)
+
+    def ema(self, alpha_node):
+        """ Exponential moving average, alpha between 0 (frozen) and 1 (no smoothing). """
+        from kabuki.smoothing import Ema
+        return Ema(self, alpha_node)
+
+    def median(self, size):
+        """ The median of the last size values, for small odd sizes. """
+        from kabuki.smoothing import Median
+        return Median(self, size)
+
+    def biquad(self, coefficients):
+        """ A second order IIR filter, see kabuki.smoothing.lowpass(). """
+        from kabuki.smoothing import Biquad
+        return Biquad(self, coefficients)
+
+    def slew_limit(self, rate_node):
+        """ Follow the value changing at most rate per second. """
+        from kabuki.smoothing import SlewLimit
+        return SlewLimit(self, rate_node)
+
     def throttle(self, milliseconds):
+        from kabuki.filters import Throttle
         return Throttle(self, milliseconds)
 
-    def debug(self, label):
-        return Debug(self, label)
+    def debug(self, label, sink=None):
+        return Debug(self, label, sink=sink)
 
     def swap(self, a, b, sustain_time = None):
+        from kabuki.selection import Swap
         return Swap(self, a, b, sustain_time=sustain_time)
 
+    def named(self, name):
+        """ Give this node a name that identifies it across reloads. """
+        self._name = name
+        return self
+
 
 class Operator(Operable):
     """ Performs "lazy" or deferred calculations on objects.
         Calculations are cached between calls to reset(). """
 
+    # attributes carried over to the matching node when the graph is reloaded
+    _state_attributes = ()
+
     def __init__(self):
         super().__init__()
         self._cached_value = None
@@ -74,6 +163,14 @@ class Operator(Operable):
     def reset(self):
         self._cached_value = None
 
+    def operands(self):
+        """ The nodes this node reads from. """
+        return ()
+
+    def _settings(self):
+        # values other than operands that make this node what it is
+        return ()
+
     def _calculate_value(self):
         pass
 
@@ -88,6 +185,12 @@ class Operand(Operator):
     def _calculate_value(self):
         return self._value
 
+    def _settings(self):
+        return (self._value,)
+
+    def _spec(self):
+        return "Operand", [self._value]
+
 
 class SingleArgumentOperator(Operator):
 
@@ -104,6 +207,13 @@ class SingleArgumentOperator(Operator):
         super().reset()
         self._first_operand.reset()
 
+    def operands(self):
+        return (self._first_operand,)
+
+    def _spec(self):
+        # how to build this node again from a graph file: class name and arguments
+        return type(self).__name__, list(self.operands())
+
 
 class DoubleArgumentOperator(SingleArgumentOperator):
 
@@ -115,6 +225,9 @@ class DoubleArgumentOperator(SingleArgumentOperator):
         super().reset()
         self._second_operand.reset()
 
+    def operands(self):
+        return super().operands() + (self._second_operand,)
+
 
 class TripleArgumentOperator(DoubleArgumentOperator):
 
@@ -126,6 +239,9 @@ class TripleArgumentOperator(DoubleArgumentOperator):
         super().reset()
         self._third_operand.reset()
 
+    def operands(self):
+        return super().operands() + (self._third_operand,)
+
 
 class QuadrupleArgumentOperator(TripleArgumentOperator):
 
@@ -137,6 +253,9 @@ class QuadrupleArgumentOperator(TripleArgumentOperator):
         super().reset()
         self._fourth_operand.reset()
 
+    def operands(self):
+        return super().operands() + (self._fourth_operand,)
+
 
 class QuintupleArgumentOperator(QuadrupleArgumentOperator):
 
@@ -148,6 +267,9 @@ class QuintupleArgumentOperator(QuadrupleArgumentOperator):
         super().reset()
         self._fifth_operand.reset()
 
+    def operands(self):
+        return super().operands() + (self._fifth_operand,)
+
 
 class Add(DoubleArgumentOperator):
 
@@ -193,271 +315,30 @@ class Mul(DoubleArgumentOperator):
     def _calculate_value(self):
         return self._first_operand.value * self._second_operand.value
 
-class FilterAbove(DoubleArgumentOperator):
-
-    def _calculate_value(self):
-        value = self._first_operand.value
-        limit = self._second_operand.value
-        if value < limit:
-            return value
-        else:
-            return 0
-
-
-class FilterBelow(DoubleArgumentOperator):
-
-    def _calculate_value(self):
-        value = self._first_operand.value
-        limit = self._second_operand.value
-        if value > limit:
-            return value
-        else:
-            return 0
-
-
-class FilterBetween(TripleArgumentOperator):
-
-    def _calculate_value(self):
-        val = self._first_operand.value
-        lower = self._second_operand.value
-        upper = self._third_operand.value
-        if lower <= val <= upper:
-            return 0
-        else:
-            return val
-
-
-class RetainBetween(TripleArgumentOperator):
-
-    def _calculate_value(self):
-        val = self._first_operand.value
-        lower = self._second_operand.value
-        upper = self._third_operand.value
-        if lower <= val <= upper:
-            return val
-        else:
-            return 0
-
-
-class Constrain(TripleArgumentOperator):
-
-    def _calculate_value(self):
-        val = self._first_operand.value
-        bound_1 = self._second_operand.value
-        bound_2 = self._third_operand.value
-        upper = bound_1 if bound_1 > bound_2 else bound_2
-        lower = bound_2 if bound_2 < bound_1 else bound_1
-        return min(upper, max(lower, val))
-
-
-class Map(QuintupleArgumentOperator):
-
-    def _calculate_value(self):
-        val = self._first_operand.value
-        in_start = self._second_operand.value
-        in_stop = self._third_operand.value
-        out_start = self._fourth_operand.value
-        out_stop = self._fifth_operand.value
-
-        return _map(val, in_start, in_stop, out_start, out_stop)
-
-
-def _map(value, in_start, in_stop, out_start, out_stop):
-    return out_start + (out_stop - out_start) * ((value - in_start) / (in_stop - in_start))
-
-
-class ReduceNoise(DoubleArgumentOperator):
-
-    def __init__(self, value_node, band):
-        super().__init__(value_node, band)
-        self._last_trend_direction = True  # True for "up"
-        self._last_trend_value = 0 # the last value that was in the trend direction
-
-    def _calculate_value(self):
-        band = self._second_operand.value
-        current_value = self._first_operand.value
-        diff = current_value - self._last_trend_value
-        current_direction = True if diff >= 0 else False
-
-        if current_direction != self._last_trend_direction:
-            if abs(diff) >= band:
-                self._last_trend_direction = current_direction
-                self._last_trend_value = current_value
-                value = current_value
-            else:
-                value = self._last_trend_value
-        else:
-            self._last_trend_value = current_value
-            value = current_value
-
-        return value
-
-
-class Throttle(SingleArgumentOperator):
-
-    def __init__(self, value_node, milliseconds):
-        super().__init__(value_node)
-        self._last_sample_time = 0
-        self._threshold = milliseconds
-
-    def _calculate_value(self):
-        self._last_sample_time = timing.millis()
-        return self._first_operand.value
-
-    def reset(self):
-        current = timing.millis()
-        elapsed = current - self._last_sample_time
-        if elapsed >= self._threshold:
-            super().reset()
-
 
 class Debug(SingleArgumentOperator):
+    """ Passes a value through, writing it to a trace sink or printing it if there is no sink. """
 
-    def __init__(self, node, label):
+    def __init__(self, node, label, sink=None):
         super().__init__(node)
         self._label = label
+        self._sink = sink
 
     def _calculate_value(self):
-        # todo: be nice to print all values on one line and add new line per loop
         value = self._first_operand.value
-        print("%s : %s" %(self._label, value))
+        sink = self._sink if self._sink is not None else trace.default_sink
+        if sink is None:
+            print("%s : %s" %(self._label, value))
+        else:
+            sink.write(self._label, value)
         return value
 
+    def _settings(self):
+        return (self._label,)
 
-# todo: needs a reset concept, after sustain_time reached, resets to "a" for some time (same as sustain?)
-class Swap(TripleArgumentOperator):
-
-    def __init__(self, control, a, b, sustain_time = None):
-        super().__init__(control, a, b)
-        self._sustain_time = None if sustain_time is None else int(sustain_time * 1000)
-        self._release_time = None
-        self._last_main = True  # taking the main path, "a"
-
-    def _calculate_value(self):
-        control = self._first_operand
-        a = self._second_operand
-        b = self._third_operand
-        v = a.value
-
-        main = (control.value is None
-            or control.value == 0
-            or not control)
-
-        if self._sustain_time is not None:
-            # we've just switched to the alternate path, start timing
-            if self._last_main and not main:
-                self._release_time = timing.millis() + self._sustain_time
-            # check if time has expired
-            if (self._release_time is not None
-                    and timing.millis() >= self._release_time):
-                self._release_time = None
+    def _spec(self):
+        return "Debug", [self._first_operand, self._label]
 
-        if self._release_time is not None or not main:
-            v = b.value
-
-        self._last_main = main
-        return v
-
-
-class Cycler(DoubleArgumentOperator):
-
-    def __init__(self, length_node, delta_node, initial_position = 0):
-        super().__init__(length_node, delta_node)
-        self._position = initial_position
-
-    def _calculate_value(self):
-        length = self._first_operand.value
-        delta = self._second_operand.value
-        self._position += delta
-        # todo: consider wrap around vs stop
-        # todo: how could we do a ping/pong? delta is external
-        if self._position > length:
-            self._position = 0
-        elif self._position < 0:
-            self._position = length
-        return self._position
-
-    def channel(self, keys):
-        return Channel(self, self._first_operand, keys)
-
-
-class Channel(DoubleArgumentOperator):
-
-    def __init__(self, position_node, length_node, keys):
-        super().__init__(position_node, length_node)
-        try:
-            self._xlist = []
-            self._ylist = []
-            for x, y in keys:
-                x = self._wrap_if_needed(x)
-                y = self._wrap_if_needed(y)
-                self._xlist.append(x)
-                self._ylist.append(y)
-            self._key_count = len(keys)
-        except:
-            raise RuntimeError("error parsing keys, must be list of 2 Tuples")
-        if self._key_count == 0:
-            raise RuntimeError("keys must have at least one key!")
 
-    def _calculate_value(self):
-        # find keys where position between two x's, interpolate
-        position = self._first_operand.value
-        cycler_length = self._second_operand.value
-        left_x_count = 0 # number of keys to the left of current position
-        # assumes x values are sorted low to high
-        for v in self._xlist:
-            if v.value <= position:
-                left_x_count += 1
-
-        # a little repetition here, but looking for performance
-        if 0 < left_x_count < self._key_count:
-            left_x_index = left_x_count - 1
-            right_x_index = left_x_count
-            left_x = self._xlist[left_x_index].value
-            right_x = self._xlist[right_x_index].value
-            left_y = self._ylist[left_x_index].value
-            right_y = self._ylist[right_x_index].value
-        elif left_x_count == self._key_count:
-            # pos is to right of all keys, flip first after last
-            left_x_index = -1
-            right_x_index = 0
-            left_x = self._xlist[left_x_index].value
-            right_x = self._xlist[right_x_index].value + cycler_length
-            left_y = self._ylist[left_x_index].value
-            right_y = self._ylist[right_x_index].value
-        else:  # left_x_count == 0:
-            # pos is to left of all keys, flip last before first
-            left_x_index = -1
-            right_x_index = 0
-            left_x = self._xlist[left_x_index].value - cycler_length
-            right_x = self._xlist[right_x_index].value
-            left_y = self._ylist[left_x_index].value
-            right_y = self._ylist[right_x_index].value
-
-        return _map(position, left_x, right_x, left_y, right_y)
-
-    def reset(self):
-            for v in self._xlist:
-                v.reset()
-            for v in self._ylist:
-                v.reset()
-            super().reset()
-
-
-class DictSourceOperator(SingleArgumentOperator):
-
-    # op is an Operator with a value that is a dictionary
-    def __init__(self, key, op, default_value=None):
-        super().__init__(op)
-        self._key = key
-        self._op = self._first_operand
-        self._default_value = default_value
-
-    def _calculate_value(self):
-        values = self._op.value
-        try:
-            value = values[self._key]
-        except KeyError:
-            values[self._key] = self._default_value
-            value = self._default_value
-        return value
+def _map(value, in_start, in_stop, out_start, out_stop):
+    return out_start + (out_stop - out_start) * ((value - in_start) / (in_stop - in_start))
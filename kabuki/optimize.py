@@ -0,0 +1,198 @@
+import math
+
+from kabuki import graph
+from kabuki.filters import Constrain, Lut, Map
+from kabuki.operators import Abs, Add, Div, Mul, Neg, Operand, Sub
+
+"""
+Rewrites a controller's graph into cheaper nodes that give the same values. Run after
+wiring, before the controller runs.
+"""
+
+
+def optimize(controller):
+    """
+    Apply every optimization.
+    :return: The number of nodes replaced.
+    """
+    return fold_maps(controller) + specialize(controller)
+
+
+def fold_maps(controller):
+    """
+    Replace each map() (a Map then a Constrain to the output range) with constant ranges by a
+    two value Lut, one node doing the same arithmetic.
+    :return: The number of nodes replaced.
+    """
+    replacements = {}
+    for node in graph.nodes(*controller.output_nodes()):
+        if type(node) is not Constrain or type(node._first_operand) is not Map:
+            continue
+        mapped = node._first_operand
+        ranges = mapped.operands()[1:] + node.operands()[1:]
+        if any([type(operand) is not Operand for operand in ranges]):
+            continue
+        in_start, in_stop, out_start, out_stop, bound_1, bound_2 = [operand.value for operand in ranges]
+        if in_start == in_stop or {bound_1, bound_2} != {out_start, out_stop}:
+            continue
+        lut = Lut(mapped._first_operand, (out_start, out_stop), in_start, in_stop)
+        name = getattr(node, "_name", None)
+        if name is not None:
+            lut.named(name)
+        replacements[id(node)] = lut
+    if replacements:
+        _replace(controller, replacements)
+        controller._event_outputs = None
+    return len(replacements)
+
+
+def specialize(controller):
+    """
+    Replace generic operators by variants that skip the type and bound checks the graph
+    doesn't need, going by the kinds of value (bool, int or float) known from Operands and
+    from inputs that declare a _kind:
+    a Neg of a bool is a not, a Neg of a number a plain negation, a Constrain with constant
+    bounds has them in order already and a Div by a constant skips the zero check, becoming
+    a multiply when the divisor is a power of two so the result is the same to the bit.
+    :return: The number of nodes replaced.
+    """
+    kinds = {}
+    replacements = {}
+    for node in graph.nodes(*controller.output_nodes()):
+        node_type = type(node)
+        replacement = None
+        if node_type is Neg:
+            kind = _kind(node._first_operand, kinds)
+            if kind is bool:
+                replacement = BoolNeg(node._first_operand)
+            elif kind is not None:
+                replacement = NumberNeg(node._first_operand)
+        elif node_type is Constrain:
+            bounds = node.operands()[1:]
+            if all([type(bound) is Operand and _kind(bound, kinds) is not None for bound in bounds]):
+                replacement = ConstantConstrain(*node.operands())
+        elif node_type is Div:
+            divisor = node._second_operand
+            if type(divisor) is Operand and _kind(divisor, kinds) in (int, float) and divisor.value != 0:
+                if _is_power_of_two(abs(divisor.value)):
+                    replacement = PowerOfTwoDiv(*node.operands())
+                else:
+                    replacement = ConstantDiv(*node.operands())
+        if replacement is not None:
+            name = getattr(node, "_name", None)
+            if name is not None:
+                replacement.named(name)
+            replacements[id(node)] = replacement
+    if replacements:
+        _replace(controller, replacements)
+        controller._event_outputs = None
+    return len(replacements)
+
+
+def _replace(controller, replacements):
+    # replacements are made from the old operands, so rewrite them too: when nodes are nested
+    # an outer replacement then uses the inner one rather than the node it replaces
+    graph.replace(controller._outputs + controller.output_nodes() + list(replacements.values()), replacements)
+
+
+def _kind(node, kinds):
+    # bool, int or float if every value of the node is of that type, otherwise None
+    key = id(node)
+    if key in kinds:
+        return kinds[key]
+    node_type = type(node)
+    kind = None
+    if node_type is Operand:
+        kind = type(node.value)
+    elif node_type is Neg:
+        kind = _kind(node._first_operand, kinds)
+    elif node_type is Abs:
+        kind = _kind(node._first_operand, kinds)
+        if kind is bool:
+            kind = int
+    elif node_type in (Add, Sub, Mul, Div):
+        first = _kind(node._first_operand, kinds)
+        second = _kind(node._second_operand, kinds)
+        if first in _NUMBERS and second in _NUMBERS:
+            if node_type is Div or float in (first, second):
+                kind = float
+            else:
+                kind = int
+    else:
+        kind = getattr(node, "_kind", None)
+    if kind not in _NUMBERS:
+        kind = None
+    kinds[key] = kind
+    return kind
+
+
+_NUMBERS = (bool, int, float)
+
+
+def _is_power_of_two(value):
+    return value > 0 and value != math.inf and math.frexp(value)[0] == 0.5
+
+
+class BoolNeg(Neg):
+    """ Neg of a node whose value is always a bool. """
+
+    def _calculate_value(self):
+        return not self._first_operand.value
+
+    def _spec(self):
+        return "Neg", list(self.operands())
+
+
+class NumberNeg(Neg):
+    """ Neg of a node whose value is always a number other than a bool. """
+
+    def _calculate_value(self):
+        return -self._first_operand.value
+
+    def _spec(self):
+        return "Neg", list(self.operands())
+
+
+class ConstantConstrain(Constrain):
+    """ Constrain with constant bounds, put in order once. """
+
+    def __init__(self, node, bound_1, bound_2):
+        super().__init__(node, bound_1, bound_2)
+        bound_1 = self._second_operand.value
+        bound_2 = self._third_operand.value
+        self._upper = bound_1 if bound_1 > bound_2 else bound_2
+        self._lower = bound_2 if bound_2 < bound_1 else bound_1
+
+    def _calculate_value(self):
+        return min(self._upper, max(self._lower, self._first_operand.value))
+
+    def _spec(self):
+        return "Constrain", list(self.operands())
+
+
+class ConstantDiv(Div):
+    """ Div by a constant that isn't zero. """
+
+    def __init__(self, node, divisor):
+        super().__init__(node, divisor)
+        self._divisor = self._second_operand.value
+
+    def _calculate_value(self):
+        return self._first_operand.value / self._divisor
+
+    def _spec(self):
+        return "Div", list(self.operands())
+
+
+class PowerOfTwoDiv(Div):
+    """ Div by a constant power of two, as a multiply by its exact reciprocal. """
+
+    def __init__(self, node, divisor):
+        super().__init__(node, divisor)
+        self._reciprocal = 1 / self._second_operand.value
+
+    def _calculate_value(self):
+        return self._first_operand.value * self._reciprocal
+
+    def _spec(self):
+        return "Div", list(self.operands())
@@ -1,74 +1,289 @@
 import json
+from array import array
 
 import pyb
-from kabuki.operators import Operator, DictSourceOperator
-from ppm_decoder import Decoder
+from kabuki import timing
+from kabuki.controller import EventInput
+from kabuki.operators import Operator
 
 
-class UserSwitchIn(Operator):
+class UserSwitchIn(EventInput):
+    """
+    The user switch. Works like any node, or pass to kabuki.wire_event() to have presses and
+    releases interrupt the loop. The switch line only supports one callback, so an event-wired
+    switch replaces the reload callback installed by the runner.
+    """
+
+    _kind = bool  # see kabuki.optimize.specialize()
 
     def __init__(self):
         super().__init__()
         self._sw = pyb.Switch()
+        self._ext_int = None
+
+    def set_handler(self, handler):
+        super().set_handler(handler)
+        if handler is None:
+            if self._ext_int is not None:
+                self._ext_int.disable()
+        elif self._ext_int is None:
+            self._sw.callback(None)  # Switch.callback() only fires on press, we want both edges
+            self._ext_int = pyb.ExtInt(pyb.Pin("SW"), pyb.ExtInt.IRQ_RISING_FALLING,
+                                       pyb.Pin.PULL_UP, self._on_interrupt)
+        else:
+            self._ext_int.enable()
+
+    def _on_interrupt(self, line):
+        self.signal()
+
+    def _spec(self):
+        return "UserSwitchIn", []
 
     def _calculate_value(self):
         return self._sw()
 
 
 class AccelIn:
-
-    def __init__(self):
-        self._accel = pyb.Accel()
+    """
+    The accelerometer. Poll it: each poll reads all three axes in one I2C burst, at most once
+    per sensor sample, into preallocated buffers. The axis values are the sum of the last
+    oversample readings (like filtered_xyz() with the default of 4), for less noise.
+    """
+
+    _ADDRESS = 0x4c
+    _RATES = {120: 0, 64: 1, 32: 2, 16: 3, 8: 4, 4: 5, 2: 6, 1: 7}  # samples/sec to register value
+
+    def __init__(self, rate: int = 120, oversample: int = 4):
+        """
+        :param rate: Sensor samples per second: 120, 64, 32, 16, 8, 4, 2 or 1.
+        :param oversample: The number of readings summed for each axis value.
+        """
+        if rate not in self._RATES:
+            raise RuntimeError("rate must be one of %s" % sorted(self._RATES))
+        self._rate = rate
+        self._oversample = oversample
+        self._accel = pyb.Accel()  # powers up the sensor
         self._accel.write(0x07, self._accel.read(0x07) & 0b11111110)  # place in stand by mode to write registers
-        self._accel.write(0x08, self._accel.read(0x08) & 0b11111000)  # 120 samples/sec
+        self._accel.write(0x08, (self._accel.read(0x08) & 0b11111000) | self._RATES[rate])
         self._accel.write(0x07, self._accel.read(0x07) | 0b00000001)  # return to active mode
-        self._values = {"x": 0, "y": 0, "z": 0}
+        self._i2c = pyb.I2C(1)  # as set up by Accel
+        self._buffer = bytearray(3)
+        self._readings = array("b", (0 for _ in range(3 * oversample)))  # the last readings, x y z
+        self._index = 0
+        self._values = array("i", (0, 0, 0))  # x, y and z
+        self._period = (1000000 + rate - 1) // rate  # microseconds, rounded up: 8334 at 120
+        self._last_read = None
+        self._axes = [None, None, None]
 
     def poll(self):
-        x, y, z = self._accel.filtered_xyz()
-        self._values["x"] = x
-        self._values["y"] = y
-        self._values["z"] = z
+        if self._last_read is not None and timing.elapsed_micros(self._last_read) < self._period:
+            return  # no new sample yet
+        now = timing.micros()
+        buffer = self._buffer
+        self._i2c.mem_read(buffer, self._ADDRESS, 0)
+        if (buffer[0] | buffer[1] | buffer[2]) & 0x40:
+            return  # read while the sensor was updating, try again next loop
+        self._last_read = now
+        readings = self._readings
+        values = self._values
+        index = self._index
+        for axis in range(3):
+            reading = buffer[axis] & 0x3f
+            if reading & 0x20:
+                reading -= 64  # 6 bit two's complement
+            values[axis] += reading - readings[index + axis]
+            readings[index + axis] = reading
+        index += 3
+        self._index = 0 if index == len(readings) else index
 
     def x(self):
-        return AxisOperator(self._values, "x")
+        return self._axis(0)
 
     def y(self):
-        return AxisOperator(self._values, "y")
+        return self._axis(1)
 
     def z(self):
-        return AxisOperator(self._values, "x")
+        return self._axis(2)
+
+    def _axis(self, index):
+        # one node per axis, however often it is asked for
+        if self._axes[index] is None:
+            self._axes[index] = AxisOperator(self, "xyz"[index])
+        return self._axes[index]
+
+    def _spec(self):
+        return "AccelIn", [self._rate, self._oversample]
 
 
 class AxisOperator(Operator):
 
-    def __init__(self, all_axes, axis):
+    _kind = int
+
+    def __init__(self, accel_in, axis):
         super().__init__()
-        self._all_axes = all_axes
+        self._accel_in = accel_in
+        self._values = accel_in._values
         self._axis = axis
+        self._index = "xyz".index(axis)
 
     def _calculate_value(self):
-        return self._all_axes[self._axis]
+        return self._values[self._index]
+
+    def _settings(self):
+        return (self._axis,)
+
+    def _spec(self):
+        return (self._accel_in, self._axis), []
 
 
 class PpmIn:
+    """
+    Channels of an RC receiver's PPM signal. Poll it: each poll copies every channel's pulse
+    width into one array with interrupts off, so all channel nodes see the same frame and
+    the decoder is read once per loop.
+    """
+
+    def __init__(self, pin: str, channels: int = 8, dropout: int = 100, decoder=None):
+        """
+        :param pin: The pin with the PPM signal.
+        :param channels: The number of channels to read.
+        :param dropout: Milliseconds without a new frame before dropout() becomes True.
+        :param decoder: An object with get_channel_value(channel), a ppm_decoder.Decoder on
+        the pin if None. Counting frames in a frames attribute makes frame_age() exact,
+        otherwise a frame is taken as new when any width changes (real widths jitter).
+        """
+        self._pin = pin
+        if decoder is None:
+            from ppm_decoder import Decoder
+            decoder = Decoder(pin)
+        self._decoder = decoder
+        self._widths = array("H", (0 for _ in range(channels)))
+        self._previous = array("H", (0 for _ in range(channels)))
+        self._dropout = dropout
+        self._frames = None
+        self._polled = True  # until the first poll
+        self._frame_time = None  # when the last new frame was seen
+        self.age = dropout  # milliseconds since the last new frame
+        self._channels = {}
+        self._frame_age = None
+        self._dropout_node = None
 
-    def __init__(self, pin: str):
-        self._decoder = Decoder(pin)
+    def poll(self):
+        decoder = self._decoder
+        widths = self._widths
+        state = pyb.disable_irq()
+        try:
+            for i in range(len(widths)):
+                width = decoder.get_channel_value(i)
+                # a channel without a reading yet is None (or negative): store it as 0
+                if width is None or width < 0:
+                    width = 0
+                elif width > 0xffff:
+                    width = 0xffff
+                widths[i] = width
+            frames = getattr(decoder, "frames", None)
+        finally:
+            pyb.enable_irq(state)
+        previous = self._previous
+        changed = False
+        for i in range(len(widths)):
+            if widths[i] != previous[i]:
+                changed = True
+                previous[i] = widths[i]
+        now = timing.millis()
+        if frames is not None:
+            new_frame = frames != self._frames
+            self._frames = frames
+        else:
+            new_frame = changed
+        if self._polled:
+            new_frame = False  # the first poll only sets what later frames are compared with
+            self._polled = False
+        if new_frame:
+            self._frame_time = now
+        self.age = self._dropout if self._frame_time is None else now - self._frame_time
 
     def channel(self, channel: int):
-        return ChannelOperator(channel, self._decoder)
+        """ A node with the pulse width of a channel in microseconds. """
+        op = self._channels.get(channel)
+        if op is None:
+            if not 0 <= channel < len(self._widths):
+                raise RuntimeError("no channel %d, PpmIn reads %d channels" % (channel, len(self._widths)))
+            op = ChannelOperator(channel, self)
+            self._channels[channel] = op
+        return op
+
+    def frame_age(self):
+        """ A node with the milliseconds since the last new frame. """
+        if self._frame_age is None:
+            self._frame_age = PpmStatus(self, False)
+        return self._frame_age
+
+    def dropout(self):
+        """ A node that is True while no new frame has arrived for the dropout time. """
+        if self._dropout_node is None:
+            self._dropout_node = PpmStatus(self, True)
+        return self._dropout_node
+
+    def _spec(self):
+        return "PpmIn", [self._pin, len(self._widths), self._dropout]
 
 
 class ChannelOperator(Operator):
 
+    _kind = int
+
     def __init__(self, channel: int, ppm_in):
         super().__init__()
         self._channel = channel
         self._ppm_in = ppm_in
+        self._widths = ppm_in._widths
 
     def _calculate_value(self):
-        return self._ppm_in.get_channel_value(self._channel)
+        return self._widths[self._channel]
+
+    def _settings(self):
+        return (self._channel,)
+
+    def _spec(self):
+        return (self._ppm_in, "channel"), [self._channel]
+
+
+class PpmStatus(Operator):
+
+    def __init__(self, ppm_in, dropout):
+        super().__init__()
+        self._ppm_in = ppm_in
+        self._is_dropout = dropout
+
+    def _calculate_value(self):
+        if self._is_dropout:
+            return self._ppm_in.age >= self._ppm_in._dropout
+        return self._ppm_in.age
+
+    def _settings(self):
+        return (self._is_dropout,)
+
+    def _spec(self):
+        return (self._ppm_in, "dropout" if self._is_dropout else "frame_age"), []
+
+
+class SimulatedDecoder:
+    """ Stands in for a PPM decoder, e.g. to try a graph without a transmitter. """
+
+    def __init__(self, channels=8, width=1500):
+        self.values = [width] * channels
+        self.frames = 0
+
+    def set(self, channel, width):
+        self.values[channel] = width
+
+    def frame(self):
+        """ Deliver a frame, call after setting widths. """
+        self.frames += 1
+
+    def get_channel_value(self, channel):
+        return self.values[channel]
 
 
 class ThrottledIn:
@@ -85,37 +300,151 @@ class ThrottledIn:
             self._delegate.poll()
             self._last_sample_time = current
 
+    def _spec(self):
+        return "ThrottledIn", [self._delegate, self._threshold]
 
-class SerialIn:
 
-    def __init__(self):
+class SerialIn:
+    """
+    Reads lines of JSON key value pairs from USB serial for the channel nodes, and answers "?"
+    with the channel definitions. Keys are channel numbers, in the order the channels were
+    made, e.g. {"0": 12, "3": 0.5}. Lines starting with "#" carry a new graph and are passed
+    to the graph receiver (see kabuki.graphfile.GraphReceiver), if one is set.
+    """
+
+    graph_receiver = None  # shared by all instances, set by the runner
+
+    def __init__(self, graph_receiver=None, channels=()):
+        """
+        :param channels: Channels to make at once, as label, default value, min and max, e.g.
+        when loading a graph file, so they keep their numbers.
+        """
+        if graph_receiver is not None:
+            self.graph_receiver = graph_receiver
         self._serial = pyb.USB_VCP()
-        self._dict = {}
-        self._channel_definitions = []
+        self._values = []  # by channel number
+        self._updated = bytearray()  # 1 for channels set by the last poll
+        self._any_updated = False
+        self._channels = []  # the channel nodes, by number
+        self._definitions = []  # each channel's definition as JSON, up to its value
+        self._definitions_text = None  # the last answer to "?", until a value changes
+        self._partial = b""  # the start of a line whose end hasn't arrived yet
+        for definition in channels:
+            self.channel(*definition)
 
     def poll(self):
+        if self._any_updated:
+            updated = self._updated
+            for i in range(len(updated)):
+                updated[i] = 0
+            self._any_updated = False
         if self._serial.isconnected():
             lines = self._serial.readlines()
+            if not lines:
+                return
+            if self._partial:
+                lines[0] = self._partial + lines[0]
+                self._partial = b""
+            if not lines[-1].endswith(b"\n"):
+                self._partial = lines.pop()  # the rest comes with a later poll
             for line in lines:
                 if len(line) > 1:  # need more than just a new line character
                     line = line.decode()
                     if line.startswith("?"):
                         self._send_definitions()
+                    elif line.startswith("#"):
+                        if self.graph_receiver is not None:
+                            # only the line ending: a graph chunk may end in a space
+                            self.graph_receiver.feed(line.rstrip("\r\n"))
                     else:
                         # each line assumed to be JSON of key value pairs
                         try:
-                            self._dict.update(json.loads(line))
+                            self._set(json.loads(line))
                         except:
                             print("ignoring bad JSON: %s" % line)
 
+    def _set(self, pairs):
+        if not isinstance(pairs, dict):
+            raise ValueError("expected key value pairs")
+        # check every key before setting any value, so a bad line changes nothing
+        numbers = [int(key) for key in pairs]
+        values = self._values
+        for key, channel in zip(pairs, numbers):
+            if 0 <= channel < len(values):
+                values[channel] = pairs[key]
+                self._updated[channel] = 1
+                self._any_updated = True
+                self._definitions_text = None
+
     def channel(self, label=None, default_value=None, min=None, max=None):
-        key = str(len(self._channel_definitions))
-        self._channel_definitions.append({"k": key, "l": label, "m": min, "M": max})
-        return DictSourceOperator(key, self._dict, default_value=default_value)
+        """ A node with the last value sent for a new channel, default_value until then. """
+        number = len(self._values)
+        self._values.append(default_value)
+        self._updated.append(0)
+        definition = json.dumps({"k": str(number), "l": label, "m": min, "M": max})
+        self._definitions.append(definition[:-1] + ", \"v\": ")
+        self._definitions_text = None
+        node = SerialChannel(self, number, label, default_value, min, max)
+        self._channels.append(node)
+        return node
+
+    def channel_number(self, number):
+        """ The node of a channel already made, by its number. """
+        if not 0 <= number < len(self._channels):
+            raise RuntimeError("no channel %d, %d channels made" % (number, len(self._channels)))
+        return self._channels[number]
 
     def _send_definitions(self):
-        # copy the current value to the definition
-        for definition in self._channel_definitions:
-            definition["v"] = self._dict[definition["k"]]
-        json_str = json.dumps(self._channel_definitions)
-        print(json_str)
+        if self._definitions_text is None:
+            definitions = self._definitions
+            values = self._values
+            self._definitions_text = "[" + ", ".join(
+                [definitions[i] + json.dumps(values[i]) + "}" for i in range(len(values))]) + "]"
+        print(self._definitions_text)
+
+    def _spec(self):
+        # every channel, wired or not, so they keep their numbers when loaded
+        return "SerialIn", [None, [channel._definition for channel in self._channels]]
+
+
+class SerialChannel(Operator):
+
+    def __init__(self, serial_in, number, label, default_value, min, max):
+        super().__init__()
+        self._serial_in = serial_in
+        self._values = serial_in._values
+        self._number = number
+        self._definition = [label, default_value, min, max]
+        self._updated_node = None
+
+    def _calculate_value(self):
+        return self._values[self._number]
+
+    def updated(self):
+        """ A node that is True when the last poll set this channel. """
+        if self._updated_node is None:
+            self._updated_node = SerialUpdated(self)
+        return self._updated_node
+
+    def _settings(self):
+        return (self._number,)
+
+    def _spec(self):
+        return (self._serial_in, "channel_number"), [self._number]
+
+
+class SerialUpdated(Operator):
+
+    _kind = bool
+
+    def __init__(self, channel):
+        super().__init__()
+        self._channel = channel
+        self._updated = channel._serial_in._updated
+        self._number = channel._number
+
+    def _calculate_value(self):
+        return self._updated[self._number] == 1
+
+    def _spec(self):
+        return (self._channel, "updated"), []
@@ -1,3 +1,5 @@
+from array import array
+
 import pyb
 
 
@@ -5,6 +7,7 @@ import pyb
 class LedOut:
 
     def __init__(self, led_number):
+        self._number = led_number
         self._led = pyb.LED(led_number)
 
     def consume(self, value):
@@ -13,13 +16,99 @@ class LedOut:
         else:
             self._led.on()
 
+    def _spec(self):
+        return "LedOut", [self._number]
+
 
 # Servo output
 class ServoOut:
 
-    def __init__(self, servo_number):
+    def __init__(self, servo_number, limits=None):
+        """
+        :param limits: The lowest and highest angle to move to, for a servo that would
+        otherwise strike something, or None for the servo's whole range.
+        """
+        self._number = servo_number
         self._servo = pyb.Servo(servo_number)
+        self._limits = None if limits is None else tuple(limits)
 
     def consume(self, value):
-        # todo: should we constrain angle for safety?
-        self._servo.angle(value)
\ No newline at end of file
+        if self._limits is not None:
+            value = _constrain(value, self._limits)
+        self._servo.angle(value)
+
+    def _spec(self):
+        return "ServoOut", [self._number, self._limits]
+
+
+# Several servos moved together
+class ServoBank:
+    """
+    Drives several servos from one node whose value is their angles in order, such as a
+    Gather (see Controller.wire_output). Angles are rounded to the 10 microsecond steps the
+    servo timer can make and only servos whose pulse width changes are written, all at
+    the same point in the tick. A None or NaN angle leaves its servo where it is.
+    """
+
+    _STEP = 10  # microseconds, the servo timer's resolution
+
+    def __init__(self, servo_numbers, limits=None):
+        """
+        :param servo_numbers: The servos, 1 to 4, in the order of the angles.
+        :param limits: For each servo, the lowest and highest angle or None, see ServoOut.
+        """
+        self._numbers = list(servo_numbers)
+        count = len(self._numbers)
+        if limits is not None and len(limits) != count:
+            raise RuntimeError("limits must be given for each servo")
+        self._limits = [None if limit is None else tuple(limit)
+                        for limit in (limits if limits is not None else [None] * count)]
+        self._servos = [pyb.Servo(number) for number in self._numbers]
+        # pulse width per degree of each servo, from its calibration
+        self._centres = array("f", (0 for _ in range(count)))
+        self._scales = array("f", (0 for _ in range(count)))
+        self._lowest = array("H", (0 for _ in range(count)))
+        self._highest = array("H", (0 for _ in range(count)))
+        for i in range(count):
+            low, high, centre, angle_90 = self._servos[i].calibration()[:4]
+            self._lowest[i] = low
+            self._highest[i] = high
+            self._centres[i] = centre
+            self._scales[i] = (angle_90 - centre) / 90
+        self._written = array("H", (0 for _ in range(count)))  # 0 for not written yet
+        self._pending = array("H", (0 for _ in range(count)))
+
+    def consume(self, angles):
+        if len(angles) != len(self._servos):
+            raise RuntimeError("expected %d angles, got %d" % (len(self._servos), len(angles)))
+        step = self._STEP
+        pending = self._pending
+        # work out every pulse width first so the writes land together
+        for i in range(len(pending)):
+            angle = angles[i]
+            if angle is None or angle != angle:
+                pending[i] = self._written[i]
+                continue
+            limits = self._limits[i]
+            if limits is not None:
+                angle = _constrain(angle, limits)
+            pulse = int((self._centres[i] + self._scales[i] * angle) / step + 0.5) * step
+            pending[i] = min(max(pulse, self._lowest[i]), self._highest[i])
+        written = self._written
+        servos = self._servos
+        for i in range(len(pending)):
+            if pending[i] != written[i]:
+                servos[i].pulse_width(pending[i])
+                written[i] = pending[i]
+
+    def _spec(self):
+        return "ServoBank", [self._numbers, self._limits]
+
+
+def _constrain(value, limits):
+    low, high = limits
+    if low is not None and value < low:
+        return low
+    if high is not None and value > high:
+        return high
+    return value
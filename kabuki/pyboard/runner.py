@@ -1,19 +1,46 @@
+import gc
+import os
 import kabuki, sys
 import pyb
-from kabuki.operators import Cycler
+from kabuki import graph, graphfile
+from kabuki.pyboard import inputs, outputs
+from kabuki.pyboard.inputs import SerialIn
 from kabuki.pyboard.outputs import LedOut
 
+GRAPH_FILE = "nodes.json"
+
 
 class Loader:
 
     def __init__(self):
         self._reload_queued = True
+        self._serial_in = None  # reads graphs pushed over serial when the graph has no SerialIn
+        self._check_serial = False
+        SerialIn.graph_receiver = graphfile.GraphReceiver(
+            kabuki._default_controller, (inputs, outputs), keep=(self,), on_swap=self._swapped)
         self.queue_reload()
 
     def poll(self):
         if self._reload_queued:
             self._reload_queued = False
             self._reload()
+        if self._check_serial:
+            self._check_serial = False
+            self._find_serial()
+        if self._serial_in is not None:
+            self._serial_in.poll()
+        SerialIn.graph_receiver.poll()
+
+    def _swapped(self, controller):
+        # the new graph is adopted before the next poll
+        self._check_serial = True
+        gc.collect()
+
+    def _find_serial(self):
+        if any([isinstance(pollable, SerialIn) for pollable in kabuki._default_controller._inputs]):
+            self._serial_in = None
+        elif self._serial_in is None:
+            self._serial_in = SerialIn()
 
     def queue_reload(self):
         self._reload_queued = True
@@ -23,19 +50,29 @@ class Loader:
             pyb.LED(i).off()
         green = pyb.LED(2)
         green.on()
-        pyb.delay(500)
-        green.off()
+        old_nodes = kabuki._default_controller.output_nodes()
         kabuki._default_controller.clear()
-        mod_name = "nodes"
-        if mod_name in sys.modules:
-            del sys.modules[mod_name]
-        import nodes  # executes module loading in node definitions
+        if GRAPH_FILE in os.listdir():
+            # a saved graph loads without compiling any Python
+            graphfile.load(GRAPH_FILE, kabuki._default_controller, (inputs, outputs))
+        else:
+            mod_name = "nodes"
+            if mod_name in sys.modules:
+                del sys.modules[mod_name]
+            import nodes  # executes module loading in node definitions
         kabuki.poll_input(self)
+        self._find_serial()
+        # unchanged stateful nodes carry on where they were, so animations don't jump
+        graph.transfer_state(old_nodes, kabuki._default_controller.output_nodes())
+        old_nodes = None
+        gc.collect()
+        green.off()
 
 
 def run():
     loader = Loader()
     kabuki.poll_input(loader)
+    loader._find_serial()  # so a fixed graph can still be pushed
     sw = pyb.Switch()
     sw.callback(loader.queue_reload)
     while True:
@@ -47,8 +84,10 @@ def run():
 
 
 def _install_police_lights(loader):
+    from kabuki.animation import Cycler
     kabuki._default_controller.clear()
     kabuki.poll_input(loader)
+    loader._find_serial()  # so a fixed graph can still be pushed
 
     cycler = Cycler(5, 0.02)
 
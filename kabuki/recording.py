@@ -0,0 +1,284 @@
+import struct
+
+from kabuki import timing
+from kabuki.operators import Operator
+
+"""
+Records node values to a compact binary stream and plays them back as nodes.
+
+The stream starts with b"KBR2", the channel count (1 byte), then per channel its scale
+(little endian float), a length prefixed label and a flags byte, 1 for a bool channel
+(b"KBR1" recordings have no flags byte). Each frame follows as varints: the
+milliseconds since the previous frame, then per channel the zigzag encoded change in
+round(value * scale) since the previous frame.
+"""
+
+_MAGIC = b"KBR2"
+_MAGIC_NO_FLAGS = b"KBR1"
+_BOOL = 1  # channel flag, played back as bool
+
+
+class Recorder:
+    """
+    Appends the values of nodes to a stream every loop. Frames are encoded into a fixed
+    buffer and at most max_write bytes reach the stream per loop. When the buffer is full
+    frames are dropped rather than waiting on the stream.
+    Poll the recorder after the inputs whose nodes it records, or pass the input as source.
+    """
+
+    def __init__(self, stream, nodes, scales=None, labels=None, source=None,
+                 buffer_size=512, max_write=128):
+        """
+        :param stream: A binary stream with a write function, e.g. a file opened with "wb".
+        :param nodes: The nodes to record, with numeric or boolean values. A node whose value
+        is a bool when the recorder is made is played back as bool.
+        :param scales: Per node, values are stored as round(value * scale). Defaults to 1000.
+        :param labels: A name for each node.
+        :param source: A pollable polled just before recording.
+        :param buffer_size: Bytes buffered between writes.
+        :param max_write: The most bytes written to the stream per loop.
+        """
+        count = len(nodes)
+        self._stream = stream
+        self._nodes = nodes
+        self._scales = scales if scales is not None else [1000] * count
+        self._labels = labels if labels is not None else ["n%d" % i for i in range(count)]
+        self._source = source
+        self._buffer = bytearray(buffer_size)
+        self._start = 0  # first byte not yet written
+        self._length = 0  # bytes in the buffer
+        self._max_write = max_write
+        self._previous = [0] * count
+        self._current = [0] * count
+        self._last_time = None
+        self.dropped = 0  # frames dropped because the buffer was full
+        flags = [_BOOL if isinstance(node.value, bool) else 0 for node in nodes]
+        stream.write(_encode_header(self._scales, self._labels, flags))
+
+    def poll(self):
+        if self._source is not None:
+            self._source.poll()
+        now = timing.millis()
+        if self._last_time is None:
+            self._last_time = now
+        if self._start > 0:
+            # move unwritten bytes to the front to make room
+            remaining = self._length - self._start
+            self._buffer[0:remaining] = self._buffer[self._start:self._length]
+            self._start = 0
+            self._length = remaining
+
+        buffer = self._buffer
+        current = self._current
+        position = _put_varint(buffer, self._length, now - self._last_time)
+        for i in range(len(self._nodes)):
+            if position < 0:
+                break
+            current[i] = int(round(self._nodes[i].value * self._scales[i]))
+            position = _put_varint(buffer, position, _zigzag(current[i] - self._previous[i]))
+        if position < 0:
+            self.dropped += 1
+        else:
+            self._length = position
+            self._last_time = now
+            self._previous, self._current = current, self._previous
+        self._drain(self._max_write)
+
+    def flush(self):
+        """ Write everything buffered, e.g. before closing the stream. """
+        self._drain(self._length)
+
+    def _drain(self, limit):
+        count = self._length - self._start
+        if count > limit:
+            count = limit
+        if count > 0:
+            written = self._stream.write(memoryview(self._buffer)[self._start:self._start + count])
+            self._start += count if written is None else written
+        if self._start == self._length:
+            self._start = 0
+            self._length = 0
+
+
+class Player:
+    """
+    Plays back a recording, a pollable that moves to the next frame each loop. With realtime
+    it instead follows the recorded timestamps. Use millis as the clock (timing.set_clock) to
+    replay time based nodes as recorded; a realtime player whose millis is the clock paces
+    itself with timing.real_millis, as it would otherwise wait on itself forever.
+    """
+
+    def __init__(self, stream, realtime=False):
+        """
+        :param stream: A binary stream with a readinto function, e.g. a file opened with "rb".
+        :param realtime: Follow the recorded timestamps instead of one frame per loop.
+        """
+        self._reader = _Reader(stream)
+        self._scales, self.labels, self._flags = _decode_header(self._reader)
+        count = len(self._scales)
+        self._raw = [0] * count
+        self._values = [False if flag & _BOOL else 0.0 for flag in self._flags]
+        self._realtime = realtime
+        self._start_time = None
+        self._next_delta = None  # milliseconds to the next frame, once read
+        self.time = None  # recorded milliseconds of the current frame
+        self.finished = False
+
+    def poll(self):
+        if not self._realtime:
+            self._advance()
+            return
+        now = self._clock()
+        if self._start_time is None:
+            self._start_time = now
+        elapsed = now - self._start_time
+        while not self.finished:
+            if self._next_delta is None:
+                self._next_delta = _get_varint(self._reader)
+                if self._next_delta is None:
+                    self.finished = True
+                    break
+            next_time = self._next_delta if self.time is None else self.time + self._next_delta
+            if next_time > elapsed:
+                break
+            self._advance()
+
+    def _clock(self):
+        clock = timing.get_clock()
+        if clock is not None and (clock == self.millis or getattr(clock, "__self__", None) is self):
+            return timing.real_millis()
+        return timing.millis()
+
+    def _advance(self):
+        delta = self._next_delta if self._next_delta is not None else _get_varint(self._reader)
+        self._next_delta = None
+        if delta is None:
+            self.finished = True
+            return
+        for i in range(len(self._raw)):
+            change = _get_varint(self._reader)
+            if change is None:
+                self.finished = True
+                return
+            self._raw[i] += _unzigzag(change)
+            if self._flags[i] & _BOOL:
+                self._values[i] = self._raw[i] != 0
+            else:
+                self._values[i] = self._raw[i] / self._scales[i]
+        self.time = delta if self.time is None else self.time + delta
+
+    def millis(self):
+        return 0 if self.time is None else self.time
+
+    def channel(self, key):
+        """
+        A node with the value of a recorded channel.
+        :param key: The channel index or label.
+        """
+        index = key if isinstance(key, int) else self.labels.index(key)
+        return ReplayIn(self._values, index)
+
+
+class ReplayIn(Operator):
+
+    def __init__(self, values, index):
+        super().__init__()
+        self._values = values
+        self._index = index
+
+    def _calculate_value(self):
+        return self._values[self._index]
+
+
+class _Reader:
+    """ Reads a stream a chunk at a time into a fixed buffer. """
+
+    def __init__(self, stream, size=256):
+        self._stream = stream
+        self._buffer = bytearray(size)
+        self._length = 0
+        self._position = 0
+
+    def byte(self):
+        """ The next byte, or -1 at the end of the stream. """
+        if self._position >= self._length:
+            self._length = self._stream.readinto(self._buffer) or 0
+            self._position = 0
+            if self._length == 0:
+                return -1
+        b = self._buffer[self._position]
+        self._position += 1
+        return b
+
+    def read(self, count):
+        data = bytearray(count)
+        for i in range(count):
+            b = self.byte()
+            if b < 0:
+                raise RuntimeError("recording ends unexpectedly")
+            data[i] = b
+        return bytes(data)
+
+
+def _encode_header(scales, labels, flags):
+    if len(scales) != len(labels) or len(scales) > 255:
+        raise RuntimeError("need one scale and label per node, at most 255 nodes")
+    header = bytearray(_MAGIC)
+    header.append(len(scales))
+    for scale, label, flag in zip(scales, labels, flags):
+        label = label.encode()
+        header.extend(struct.pack("<f", scale))
+        header.append(len(label))
+        header.extend(label)
+        header.append(flag)
+    return bytes(header)
+
+
+def _decode_header(reader):
+    magic = reader.read(4)
+    if magic != _MAGIC and magic != _MAGIC_NO_FLAGS:
+        raise RuntimeError("not a kabuki recording")
+    count = reader.read(1)[0]
+    scales = []
+    labels = []
+    flags = []
+    for _ in range(count):
+        scales.append(struct.unpack("<f", reader.read(4))[0])
+        labels.append(reader.read(reader.read(1)[0]).decode())
+        flags.append(reader.read(1)[0] if magic == _MAGIC else 0)
+    return scales, labels, flags
+
+
+def _zigzag(n):
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n):
+    return n // 2 if n % 2 == 0 else -(n + 1) // 2
+
+
+def _put_varint(buffer, position, value):
+    # returns the position after the varint, or -1 if it does not fit
+    size = len(buffer)
+    while True:
+        if position >= size:
+            return -1
+        if value < 0x80:
+            buffer[position] = value
+            return position + 1
+        buffer[position] = (value & 0x7f) | 0x80
+        value >>= 7
+        position += 1
+
+
+def _get_varint(reader):
+    result = 0
+    shift = 0
+    while True:
+        b = reader.byte()
+        if b < 0:
+            return None
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result
+        shift += 7
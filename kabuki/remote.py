@@ -0,0 +1,243 @@
+import struct
+from array import array
+
+from kabuki import timing
+from kabuki.operators import Operator
+
+"""
+Links the graphs of several boards over UARTs: a RemoteOut sends the values of some nodes
+once per tick and the RemoteIn on the other board makes them nodes again, so a graph too
+big for one board's loop can be split.
+
+Each frame is b"\\xa5K", a sequence number and the value count (one byte each), the values
+(little endian floats) and a CRC-16 (CCITT, starting at 0xffff) of the sequence number
+through the values (little endian unsigned 16 bit).
+"""
+
+_SYNC = b"\xa5K"
+_HEADER_SIZE = 4
+_CHECK_SIZE = 2
+
+
+def frame_size(count):
+    """ The bytes in a frame of count values. """
+    return _HEADER_SIZE + 4 * count + _CHECK_SIZE
+
+
+def _crc_table():
+    table = array("H", (0 for _ in range(256)))
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xffff
+        table[byte] = crc
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _checksum(data, start, end):
+    table = _CRC_TABLE
+    crc = 0xffff
+    for i in range(start, end):
+        crc = ((crc << 8) & 0xffff) ^ table[(crc >> 8) ^ data[i]]
+    return crc
+
+
+def _open_uart(uart, baudrate):
+    # a UART bus number on the Pyboard, otherwise an object with write() and readinto()
+    if isinstance(uart, int):
+        import pyb
+        return pyb.UART(uart, baudrate, timeout=0)
+    return uart
+
+
+class RemoteOut:
+    """
+    Sends values to a RemoteIn, one frame per tick. Wire it to a list of nodes (see
+    Controller.wire_output) or to a node whose value is a sequence. None and NaN values
+    are sent as NaN.
+    """
+
+    def __init__(self, uart, count, baudrate=115200):
+        """
+        :param uart: A UART bus number, or an open port with write().
+        :param count: The number of values in each frame, at most 255.
+        :param baudrate: The bit rate, when uart is a bus number.
+        """
+        if not 0 < count < 256:
+            raise RuntimeError("a frame carries 1 to 255 values")
+        self._uart_number = uart if isinstance(uart, int) else None
+        self._baudrate = baudrate
+        self._port = _open_uart(uart, baudrate)
+        self._count = count
+        self._frame = bytearray(frame_size(count))
+        self._frame[0:2] = _SYNC
+        self._frame[3] = count
+        self._sequence = 0
+
+    def consume(self, values):
+        if len(values) != self._count:
+            raise RuntimeError("expected %d values, got %d" % (self._count, len(values)))
+        frame = self._frame
+        frame[2] = self._sequence
+        offset = _HEADER_SIZE
+        for value in values:
+            struct.pack_into("<f", frame, offset, float("nan") if value is None else value)
+            offset += 4
+        struct.pack_into("<H", frame, offset, _checksum(frame, 2, offset))
+        self._port.write(frame)
+        self._sequence = (self._sequence + 1) & 0xff
+
+    def _spec(self):
+        if self._uart_number is None:
+            raise RuntimeError("only a RemoteOut made with a UART bus number can be saved")
+        return "RemoteOut", [self._uart_number, self._count, self._baudrate]
+
+
+class RemoteIn:
+    """
+    Receives the values sent by a RemoteOut. Poll it: each poll reads what has arrived
+    without waiting and keeps the values of the last good frame.
+    """
+
+    def __init__(self, uart, count, stale=100, baudrate=115200):
+        """
+        :param uart: A UART bus number, or an open port with readinto() that returns at
+        once, with None or 0 when nothing has arrived.
+        :param count: The number of values in each frame, as sent.
+        :param stale: Milliseconds without a good frame before stale() becomes True.
+        :param baudrate: The bit rate, when uart is a bus number.
+        """
+        self._uart_number = uart if isinstance(uart, int) else None
+        self._baudrate = baudrate
+        self._port = _open_uart(uart, baudrate)
+        self._count = count
+        self._size = frame_size(count)
+        self._buffer = bytearray(2 * self._size)
+        self._view = memoryview(self._buffer)
+        self._fill = 0  # bytes in the buffer
+        self._values = array("f", (float("nan") for _ in range(count)))
+        self._stale = stale
+        self.sequence = None  # of the last good frame
+        self.frames = 0  # good frames received
+        self.lost = 0  # frames missing from the sequence
+        self.errors = 0  # frames with a bad checksum or count
+        self._frame_time = None
+        self.age = stale  # milliseconds since the last good frame
+        self._channels = {}
+        self._stale_node = None
+        self._sequence_node = None
+
+    def poll(self):
+        view = self._view
+        while True:
+            read = self._port.readinto(view[self._fill:])
+            if not read:
+                break
+            self._fill += read
+            self._parse()
+        now = timing.millis()
+        self.age = self._stale if self._frame_time is None else now - self._frame_time
+
+    def _parse(self):
+        buffer = self._buffer
+        size = self._size
+        start = 0
+        fill = self._fill
+        while fill - start >= size:
+            if buffer[start] != 0xa5 or buffer[start + 1] != 0x4b:
+                start += 1  # not in step with the frames, look for the next sync
+                continue
+            end = start + size - _CHECK_SIZE
+            if (buffer[start + 3] != self._count
+                    or struct.unpack_from("<H", buffer, end)[0] != _checksum(buffer, start + 2, end)):
+                self.errors += 1
+                start += 1
+                continue
+            self._accept(start)
+            start += size
+        if start:
+            # keep the start of the next frame
+            self._view[0:fill - start] = self._view[start:fill]
+            self._fill = fill - start
+
+    def _accept(self, start):
+        buffer = self._buffer
+        sequence = buffer[start + 2]
+        if self.sequence is not None:
+            self.lost += (sequence - self.sequence - 1) & 0xff
+        self.sequence = sequence
+        self.frames += 1
+        values = self._values
+        offset = start + _HEADER_SIZE
+        for i in range(self._count):
+            values[i] = struct.unpack_from("<f", buffer, offset)[0]
+            offset += 4
+        self._frame_time = timing.millis()
+
+    def channel(self, index):
+        """ A node with a received value, NaN until the first frame. """
+        op = self._channels.get(index)
+        if op is None:
+            if not 0 <= index < self._count:
+                raise RuntimeError("no value %d, frames carry %d values" % (index, self._count))
+            op = RemoteValue(self, index)
+            self._channels[index] = op
+        return op
+
+    def stale(self):
+        """ A node that is True while no good frame has arrived for the stale time. """
+        if self._stale_node is None:
+            self._stale_node = RemoteStatus(self, "stale")
+        return self._stale_node
+
+    def sequence_number(self):
+        """ A node with the sequence number of the last good frame, None until the first. """
+        if self._sequence_node is None:
+            self._sequence_node = RemoteStatus(self, "sequence_number")
+        return self._sequence_node
+
+    def _spec(self):
+        if self._uart_number is None:
+            raise RuntimeError("only a RemoteIn made with a UART bus number can be saved")
+        return "RemoteIn", [self._uart_number, self._count, self._stale, self._baudrate]
+
+
+class RemoteValue(Operator):
+
+    def __init__(self, remote_in, index):
+        super().__init__()
+        self._remote_in = remote_in
+        self._values = remote_in._values
+        self._index = index
+
+    def _calculate_value(self):
+        return self._values[self._index]
+
+    def _settings(self):
+        return (self._index,)
+
+    def _spec(self):
+        return (self._remote_in, "channel"), [self._index]
+
+
+class RemoteStatus(Operator):
+
+    def __init__(self, remote_in, status):
+        super().__init__()
+        self._remote_in = remote_in
+        self._status = status
+
+    def _calculate_value(self):
+        remote_in = self._remote_in
+        if self._status == "stale":
+            return remote_in.age >= remote_in._stale
+        return remote_in.sequence
+
+    def _settings(self):
+        return (self._status,)
+
+    def _spec(self):
+        return (self._remote_in, self._status), []
@@ -0,0 +1,88 @@
+from array import array
+
+from kabuki import timing
+from kabuki.operators import Operand, Operator, TripleArgumentOperator
+
+""" Operators that choose between nodes. """
+
+
+# todo: needs a reset concept, after sustain_time reached, resets to "a" for some time (same as sustain?)
+class Swap(TripleArgumentOperator):
+
+    _state_attributes = ("_release_time", "_last_main")
+
+    def __init__(self, control, a, b, sustain_time = None):
+        super().__init__(control, a, b)
+        self._sustain_time = None if sustain_time is None else int(sustain_time * 1000)
+        self._release_time = None
+        self._last_main = True  # taking the main path, "a"
+
+    def _calculate_value(self):
+        control = self._first_operand
+        a = self._second_operand
+        b = self._third_operand
+        v = a.value
+
+        main = (control.value is None
+            or control.value == 0
+            or not control)
+
+        if self._sustain_time is not None:
+            # we've just switched to the alternate path, start timing
+            if self._last_main and not main:
+                self._release_time = timing.millis() + self._sustain_time
+            # check if time has expired
+            if (self._release_time is not None
+                    and timing.millis() >= self._release_time):
+                self._release_time = None
+
+        if self._release_time is not None or not main:
+            v = b.value
+
+        self._last_main = main
+        return v
+
+    def _settings(self):
+        return (self._sustain_time,)
+
+    def _spec(self):
+        sustain_time = None if self._sustain_time is None else self._sustain_time / 1000
+        return "Swap", list(self.operands()) + [sustain_time]
+
+
+class Gather(Operator):
+    """
+    The values of several nodes as one array, e.g. the angles for a ServoBank. The same
+    array is filled each tick, so a consumer should use it rather than keep it. A None value
+    keeps the last one, which for float arrays starts as NaN.
+    """
+
+    def __init__(self, nodes, typecode="f"):
+        super().__init__()
+        self._nodes = [node if hasattr(node, "value") else Operand(node) for node in nodes]
+        self._typecode = typecode
+        start = float("nan") if typecode in "fd" else 0
+        self._values = array(typecode, (start for _ in self._nodes))
+
+    def reset(self):
+        super().reset()
+        for node in self._nodes:
+            node.reset()
+
+    def operands(self):
+        return tuple(self._nodes)
+
+    def _calculate_value(self):
+        values = self._values
+        nodes = self._nodes
+        for i in range(len(nodes)):
+            value = nodes[i].value
+            if value is not None:
+                values[i] = value
+        return values
+
+    def _settings(self):
+        return (self._typecode,)
+
+    def _spec(self):
+        return "Gather", [list(self._nodes), self._typecode]
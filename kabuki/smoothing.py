@@ -0,0 +1,218 @@
+import math
+from array import array
+
+from kabuki import timing
+from kabuki.operators import SingleArgumentOperator, DoubleArgumentOperator
+
+"""
+Smoothing filters that keep their history in fixed size arrays, so they take constant time
+and allocate nothing per loop.
+"""
+
+
+class MovingAverage(SingleArgumentOperator):
+    """ The average of the last size values, from a running sum. """
+
+    _state_attributes = ("_samples", "_sum", "_index", "_count")
+
+    def __init__(self, node, size):
+        super().__init__(node)
+        if size < 1:
+            raise RuntimeError("size must be at least 1")
+        self._size = size
+        self._samples = array("f", (0 for _ in range(size)))
+        self._sum = 0.0
+        self._index = 0  # where the next sample goes
+        self._count = 0  # samples so far, up to size
+
+    def _calculate_value(self):
+        value = self._first_operand.value
+        samples = self._samples
+        index = self._index
+        old = samples[index]
+        samples[index] = value
+        self._sum += samples[index] - old  # as stored, so the sum matches the samples
+        index += 1
+        if index == self._size:
+            index = 0
+            # start the sum afresh once per cycle so rounding errors don't build up
+            self._sum = sum(samples)
+        self._index = index
+        if self._count < self._size:
+            self._count += 1
+        return self._sum / self._count
+
+    def _settings(self):
+        return (self._size,)
+
+    def _spec(self):
+        return "MovingAverage", [self._first_operand, self._size]
+
+
+class Ema(DoubleArgumentOperator):
+    """
+    Exponential moving average: moves the fraction alpha of the way to each new value,
+    starting at the first value.
+    """
+
+    _state_attributes = ("_average",)
+
+    def __init__(self, node, alpha_node):
+        super().__init__(node, alpha_node)
+        self._average = None
+
+    def _calculate_value(self):
+        value = self._first_operand.value
+        if self._average is None:
+            self._average = value
+        else:
+            self._average += self._second_operand.value * (value - self._average)
+        return self._average
+
+
+class Median(SingleArgumentOperator):
+    """
+    The median of the last size values, which ignores spikes that averages smear. Keeps the
+    values sorted as they arrive, so takes time in proportion to size: meant for small odd
+    sizes, 3 to 15. NaN, e.g. a RemoteIn channel before its first frame, sorts above every
+    number, so the median is a number once most of the window is.
+    """
+
+    _state_attributes = ("_ring", "_sorted", "_index", "_count")
+
+    def __init__(self, node, size):
+        super().__init__(node)
+        if size < 1:
+            raise RuntimeError("size must be at least 1")
+        self._size = size
+        self._ring = array("f", (0 for _ in range(size)))  # in arrival order
+        self._sorted = array("f", (0 for _ in range(size)))  # the first count sorted
+        self._index = 0
+        self._count = 0
+
+    def _calculate_value(self):
+        value = self._first_operand.value
+        ring = self._ring
+        ordered = self._sorted
+        count = self._count
+        if count == self._size:
+            # take out the oldest value, closing the gap
+            oldest = ring[self._index]
+            i = 0
+            if oldest != oldest:  # NaN, never equal to itself
+                while ordered[i] == ordered[i]:
+                    i += 1
+            else:
+                while ordered[i] != oldest:
+                    i += 1
+            while i < count - 1:
+                ordered[i] = ordered[i + 1]
+                i += 1
+            count -= 1
+        ring[self._index] = value
+        value = ring[self._index]  # rounded as stored, so it is found again when removed
+        self._index = (self._index + 1) % self._size
+        # insert, moving larger values up, NaN sorted above every number
+        i = count
+        while i > 0 and value == value and not ordered[i - 1] <= value:
+            ordered[i] = ordered[i - 1]
+            i -= 1
+        ordered[i] = value
+        count += 1
+        self._count = count
+        middle = count // 2
+        if count % 2:
+            return ordered[middle]
+        return (ordered[middle - 1] + ordered[middle]) / 2
+
+    def _settings(self):
+        return (self._size,)
+
+    def _spec(self):
+        return "Median", [self._first_operand, self._size]
+
+
+class Biquad(SingleArgumentOperator):
+    """
+    A second order IIR filter (transposed direct form II), e.g. a low pass with lowpass().
+    Starts settled at the first value so there is no start up transient.
+    """
+
+    _state_attributes = ("_z1", "_z2", "_started")
+
+    def __init__(self, node, coefficients):
+        """
+        :param coefficients: b0, b1, b2, a1, a2 normalized so a0 is 1.
+        """
+        super().__init__(node)
+        self._b0, self._b1, self._b2, self._a1, self._a2 = coefficients
+        self._z1 = 0.0
+        self._z2 = 0.0
+        self._started = False
+
+    def _calculate_value(self):
+        x = self._first_operand.value
+        if not self._started:
+            self._started = True
+            self._settle(x)
+        y = self._b0 * x + self._z1
+        self._z1 = self._b1 * x - self._a1 * y + self._z2
+        self._z2 = self._b2 * x - self._a2 * y
+        return y
+
+    def _settle(self, x):
+        # the state for a constant input x
+        denominator = 1 + self._a1 + self._a2
+        if denominator == 0:
+            return
+        y = x * (self._b0 + self._b1 + self._b2) / denominator
+        self._z1 = y - self._b0 * x
+        self._z2 = self._b2 * x - self._a2 * y
+
+    def _settings(self):
+        return (self._b0, self._b1, self._b2, self._a1, self._a2)
+
+    def _spec(self):
+        return "Biquad", [self._first_operand, list(self._settings())]
+
+
+def lowpass(cutoff, rate, q=0.7071):
+    """
+    Biquad coefficients of a low pass filter.
+    :param cutoff: The cutoff frequency in Hz.
+    :param rate: The loop rate in Hz.
+    :param q: The quality factor, 0.7071 for no peak (Butterworth).
+    """
+    w0 = 2 * math.pi * cutoff / rate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2 * q)
+    a0 = 1 + alpha
+    b1 = (1 - cos_w0) / a0
+    return b1 / 2, b1, b1 / 2, -2 * cos_w0 / a0, (1 - alpha) / a0
+
+
+class SlewLimit(DoubleArgumentOperator):
+    """ Follows a value, changing by at most rate per second, starting at the first value. """
+
+    _state_attributes = ("_output", "_last_time")
+
+    def __init__(self, node, rate_node):
+        super().__init__(node, rate_node)
+        self._output = None
+        self._last_time = None
+
+    def _calculate_value(self):
+        value = self._first_operand.value
+        now = timing.millis()
+        if self._output is None:
+            self._output = value
+        else:
+            step = self._second_operand.value * (now - self._last_time) / 1000
+            if value > self._output + step:
+                self._output += step
+            elif value < self._output - step:
+                self._output -= step
+            else:
+                self._output = value
+        self._last_time = now
+        return self._output
@@ -0,0 +1,103 @@
+from kabuki import timing
+
+"""
+Runs several controllers in one loop, each at its own period, e.g. servos every 5
+milliseconds and LEDs every 50. Values cross between controllers through Hold nodes, so a
+slow graph never recalculates the nodes of a fast one.
+"""
+
+
+class Stats:
+    """ Timing of one supervised controller. """
+
+    def __init__(self):
+        self.ticks = 0
+        self.late = 0  # ticks started a period or more after they were due
+        self.total_micros = 0
+        self.max_micros = 0
+
+    @property
+    def mean_micros(self):
+        return self.total_micros // self.ticks if self.ticks else 0
+
+    def __str__(self):
+        return "ticks %d late %d mean %dus max %dus" % (self.ticks, self.late, self.mean_micros, self.max_micros)
+
+
+class Supervisor:
+
+    def __init__(self):
+        self._entries = []  # [controller, period, due, stats], fastest first
+
+    def add(self, controller, period):
+        """
+        Run a controller every period.
+        :param controller: The controller, with its own inputs, outputs and budget.
+        :param period: Milliseconds between the starts of its ticks.
+        :return: The controller's Stats.
+        """
+        stats = Stats()
+        self._entries.append([controller, period, timing.millis(), stats])
+        self._entries.sort(key=lambda entry: entry[1])
+        return stats
+
+    def stats(self, controller):
+        for entry in self._entries:
+            if entry[0] is controller:
+                return entry[3]
+        raise RuntimeError("controller is not supervised")
+
+    def step(self):
+        """
+        Tick the fastest controller that is due, if any. Faster controllers are checked
+        again before each slower tick, so they keep their rate.
+        :return: True if a controller ticked.
+        """
+        entries = self._entries
+        for i in range(len(entries)):
+            entry = entries[i]
+            now = timing.millis()
+            due = entry[2]
+            if now - due < 0:
+                continue
+            controller, period, stats = entry[0], entry[1], entry[3]
+            if now - due >= period:
+                stats.late += 1
+                entry[2] = now + period  # start afresh rather than catch up
+            else:
+                entry[2] = due + period
+            # leave the work below CRITICAL no more time than remains until a faster
+            # controller is due, so a growing slow graph is deferred rather than late
+            own_budget = controller._budget
+            if i > 0:
+                slack = self._next_due(i) - now
+                slack = slack * 1000 if slack > 0 else 0
+                if own_budget is None or slack < own_budget:
+                    controller._budget = slack
+            start = timing.micros()
+            try:
+                controller.update()
+            finally:
+                controller._budget = own_budget
+            elapsed = timing.elapsed_micros(start)
+            stats.ticks += 1
+            stats.total_micros += elapsed
+            if elapsed > stats.max_micros:
+                stats.max_micros = elapsed
+            return True
+        return False
+
+    def _next_due(self, index):
+        # the soonest due time of the controllers faster than entry index
+        entries = self._entries
+        soonest = entries[0][2]
+        for i in range(1, index):
+            if entries[i][2] - soonest < 0:
+                soonest = entries[i][2]
+        return soonest
+
+    def run(self):
+        """ Loop forever, sleeping when no controller is due. """
+        while True:
+            if not self.step():
+                timing.idle()
@@ -0,0 +1,80 @@
+import io
+import itertools
+from multiprocessing import Pool
+
+from kabuki import timing
+from kabuki.controller import Controller
+from kabuki.recording import Player
+
+"""
+Tunes graph constants on a workstation: builds copies of a graph with different parameters,
+replays a recorded input trace through each, scores the outputs and spreads the runs over
+the CPU cores.
+"""
+
+
+def grid(**values):
+    """
+    Every combination of parameter values.
+    grid(band=[0.5, 1], delta=[0.01, 0.02]) gives four dictionaries of band and delta.
+    """
+    names = sorted(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*[values[n] for n in names])]
+
+
+def run(factory, params, trace, metric):
+    """
+    Replay a trace through one copy of a graph and score its outputs. Time based nodes see
+    the recorded time.
+    :param factory: A function taking a recording.Player and the parameters as keyword
+    arguments, returning the node or list of nodes to score. Use player.channel() for inputs.
+    :param params: A dictionary of parameters for the factory.
+    :param trace: The bytes of a recording, see kabuki.recording.
+    :param metric: A function taking the values of the node per tick (a list of such lists
+    for a list of nodes) and returning a score, lower is better.
+    :return: The score.
+    """
+    player = Player(io.BytesIO(trace))
+    nodes = factory(player, **params)
+    single = not isinstance(nodes, (list, tuple))
+    if single:
+        nodes = [nodes]
+    controller = Controller()
+    values = [[] for _ in nodes]
+    for node, node_values in zip(nodes, values):
+        controller.wire_output(node, node_values.append)
+    timing.set_clock(player.millis)
+    try:
+        while True:
+            # advance before the update so the whole tick sees the frame's time
+            player.poll()
+            if player.finished:
+                break
+            controller.update()
+    finally:
+        timing.set_clock(None)
+    return metric(values[0] if single else values)
+
+
+def sweep(factory, params_list, trace, metric, processes=None):
+    """
+    Run and score a graph for each set of parameters, in a pool of processes. The factory
+    and metric must be defined at module level so they can be sent to other processes.
+    :param params_list: A list of parameter dictionaries, see grid().
+    :param trace: The bytes or file path of a recording.
+    :param processes: The number of processes, defaults to the number of CPU cores.
+    Use 1 to run in this process.
+    :return: A list of (score, params), best (lowest) score first.
+    See run() for the other parameters.
+    """
+    if isinstance(trace, str):
+        with open(trace, "rb") as f:
+            trace = f.read()
+    jobs = [(factory, params, trace, metric) for params in params_list]
+    if processes == 1:
+        scores = [run(*job) for job in jobs]
+    else:
+        with Pool(processes) as pool:
+            scores = pool.starmap(run, jobs)
+    order = sorted(range(len(scores)), key=lambda i: scores[i])
+    return [(scores[i], params_list[i]) for i in order]
@@ -0,0 +1,73 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from kabuki import timing
+
+"""
+Runs a controller as an asyncio task (uasyncio on MicroPython) alongside other tasks, such as
+networking or logging, instead of owning the loop:
+
+    asyncio.run(kabuki.run_async(period=10))
+
+Inputs registered with poll_when_ready() get a task each that awaits their wait() and then
+polls them, so an input with nothing new costs nothing. Their new values are used from the
+next update.
+"""
+
+
+def sleep_ms(milliseconds):
+    """ An awaitable for the delay, under asyncio or uasyncio. """
+    if hasattr(asyncio, "sleep_ms"):
+        return asyncio.sleep_ms(milliseconds)
+    return asyncio.sleep(milliseconds / 1000)
+
+
+class Every:
+    """
+    Polls an input every period milliseconds rather than every update, for poll_when_ready().
+    """
+
+    def __init__(self, pollable, period):
+        self._pollable = pollable
+        self._period = period
+
+    async def wait(self):
+        await sleep_ms(self._period)
+
+    def poll(self):
+        self._pollable.poll()
+
+
+async def run(controller, period):
+    """ Update a controller every period milliseconds, forever. """
+    watchers = []
+    watched = None
+    due = timing.millis()
+    try:
+        while True:
+            if watched != controller._async_changes:
+                # inputs were registered or the graph swapped, watch the current ones
+                for watcher in watchers:
+                    watcher.cancel()
+                watchers = [asyncio.create_task(_watch(pollable)) for pollable in controller._async_inputs]
+                watched = controller._async_changes
+            controller.update()
+            if controller._profiler:
+                controller._profiler.update()
+            due += period
+            wait = due - timing.millis()
+            if wait < 0:
+                due -= wait  # running late, start afresh rather than catch up
+                wait = 0
+            await sleep_ms(wait)
+    finally:
+        for watcher in watchers:
+            watcher.cancel()
+
+
+async def _watch(pollable):
+    while True:
+        await pollable.wait()
+        pollable.poll()
@@ -1,13 +1,78 @@
-import pyb
+try:
+    import pyb
+except ImportError:
+    pyb = None
+    import time
 
 """
 This module exists merely to encapsulate the dependency on pyb.
 Could inject other hardware platforms here.
+Without pyb (e.g. CPython on a workstation) the standard time module is used.
 """
 
+_clock = None
 
-def millis():
-    return pyb.millis()
+
+def set_clock(millis_function):
+    """
+    Take milliseconds from another source, such as a recording being replayed.
+    :param millis_function: A function returning milliseconds, or None for the real clock.
+    """
+    global _clock
+    _clock = millis_function
+
+
+def get_clock():
+    """ The function set with set_clock, None while the real clock is used. """
+    return _clock
+
+
+if pyb is not None:
+
+    def millis():
+        if _clock is not None:
+            return _clock()
+        return pyb.millis()
+
+    def real_millis():
+        """ Milliseconds from the hardware, whatever set_clock was given. """
+        return pyb.millis()
+
+    def micros():
+        return pyb.micros()
+
+    def elapsed_micros(start):
+        """ Microseconds since start, a value returned by micros(). Handles wrap around. """
+        return pyb.elapsed_micros(start)
+
+    def idle():
+        """ Sleep until the next interrupt. """
+        pyb.wfi()
+
+    def sleep(milliseconds):
+        pyb.delay(milliseconds)
+
+else:
+
+    def millis():
+        if _clock is not None:
+            return _clock()
+        return real_millis()
+
+    def real_millis():
+        return int(time.monotonic() * 1000)
+
+    def micros():
+        return time.perf_counter_ns() // 1000
+
+    def elapsed_micros(start):
+        return micros() - start
+
+    def idle():
+        time.sleep(0.001)
+
+    def sleep(milliseconds):
+        time.sleep(milliseconds / 1000)
 
 
 class Profiler:
@@ -17,7 +82,7 @@ class Profiler:
         self._count = 0
 
     def update(self):
-        current = pyb.millis()
+        current = millis()
         if current - self._last_time >= 1000:
             print(self._count)
             self._last_time = current
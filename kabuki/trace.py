@@ -0,0 +1,59 @@
+""" Collects Debug values during a tick and writes them out as one line. """
+
+# used by Debug nodes that were not given a sink, see kabuki.enable_trace()
+default_sink = None
+
+
+class TraceSink:
+    """
+    A preallocated ring of label/value pairs. Debug nodes write to it as they are evaluated,
+    and each sampled tick is written out as a single line when its controller finishes the
+    tick (see Controller.trace_to()).
+    """
+
+    def __init__(self, size=32, every=1, stream=None):
+        """
+        :param size: The number of label/value pairs kept per flush, older pairs are overwritten.
+        :param every: Sample one tick in this many, Debug nodes write nothing on the others.
+        :param stream: An object with a write function, print() is used if None.
+        """
+        self._labels = [None] * size
+        self._values = [None] * size
+        self._size = size
+        self._count = 0  # pairs written since the last flush
+        self._every = every
+        self._tick = 0
+        self._stream = stream
+        self.active = True  # False on ticks that are not sampled
+        self.dropped = 0  # pairs overwritten before they were flushed
+
+    def write(self, label, value):
+        if self.active:
+            index = self._count % self._size
+            self._labels[index] = label
+            self._values[index] = value
+            self._count += 1
+
+    def end_tick(self):
+        # called once every output of the tick is updated
+        if self._count > 0:
+            self.flush()
+        self._tick += 1
+        self.active = self._tick % self._every == 0
+
+    def flush(self):
+        """ Write out the buffered pairs as one line. """
+        count = self._count if self._count < self._size else self._size
+        self.dropped += self._count - count
+        first = self._count - count
+        parts = []
+        for i in range(first, self._count):
+            index = i % self._size
+            parts.append("%s:%s" % (self._labels[index], self._values[index]))
+        self._count = 0
+        line = " ".join(parts)
+        if self._stream is None:
+            print(line)
+        else:
+            self._stream.write(line)
+            self._stream.write("\n")
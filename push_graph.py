@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import argparse
+import runpy
+import sys
+import time
+
+import kabuki
+from kabuki import graphfile
+
+cmd_parser = argparse.ArgumentParser(description="Push a graph to a running pyboard over USB serial.")
+cmd_parser.add_argument("graph", help="a graph file saved with kabuki.save_graph(), or a Python file that builds "
+                                      "a graph with kabuki.graphfile.Stub in place of pyboard hardware")
+cmd_parser.add_argument("-p", "--port", default="/dev/tty.usbmodem1412", help="the serial port of the pyboard")
+cmd_parser.add_argument("-t", "--timeout", type=float, default=5, help="seconds to wait for the pyboard to reply")
+args = cmd_parser.parse_args()
+
+try:
+    import serial
+except ImportError:
+    print("pyserial is needed: pip install pyserial")
+    sys.exit(1)
+
+if args.graph.endswith(".py"):
+    runpy.run_path(args.graph)
+    text = graphfile.dumps(kabuki._default_controller)
+else:
+    with open(args.graph) as f:
+        text = f.read()
+
+with serial.Serial(args.port, 115200, timeout=0.1) as port:
+    for line in graphfile.push_lines(text):
+        port.write((line + "\n").encode())
+    deadline = time.time() + args.timeout
+    while time.time() < deadline:
+        reply = port.readline().decode(errors="replace").strip()
+        if reply.startswith("#ok"):
+            print("graph running, %s objects" % reply[4:])
+            sys.exit(0)
+        if reply.startswith("#error"):
+            print("graph rejected:%s" % reply[6:])
+            sys.exit(1)
+        if reply:
+            print("> %s" % reply)
+    print("no reply from the pyboard")
+    sys.exit(1)
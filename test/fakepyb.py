@@ -0,0 +1,128 @@
+import sys
+import types
+
+import kabuki.timing  # noqa: F401, imported first so it keeps using the host clock
+
+
+class FakeAccel:
+
+    def __init__(self):
+        self.registers = {0x07: 0b01, 0x08: 0b11100000}
+
+    def read(self, register):
+        return self.registers.get(register, 0)
+
+    def write(self, register, value):
+        self.registers[register] = value
+
+
+class FakeI2C:
+    """ Returns the queued register bursts, one per mem_read. """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.bursts = []
+        self.reads = 0
+
+    def mem_read(self, buffer, address, register):
+        self.reads += 1
+        burst = self.bursts.pop(0) if self.bursts else bytes(len(buffer))
+        buffer[:] = burst
+        return buffer
+
+
+class FakeServo:
+    """ Records pulse widths, with pyb's default calibration. """
+
+    def __init__(self, number):
+        self.number = number
+        self.pulse = 1500
+        self.writes = []
+
+    def calibration(self):
+        return 640, 2420, 1500, 2470, 2200
+
+    def angle(self, angle=None):
+        if angle is None:
+            return (self.pulse - 1500) * 90 / 970
+        self.pulse_width(int(1500 + 970 * angle / 90))
+
+    def pulse_width(self, width=None):
+        if width is None:
+            return self.pulse
+        self.pulse = width
+        self.writes.append(width)
+
+
+class FakeVCP:
+    """ Returns the queued text on the next readlines, split after each new line. """
+
+    def __init__(self):
+        self.lines = []
+
+    def isconnected(self):
+        return True
+
+    def readlines(self):
+        lines = [line.encode() for line in "".join(self.lines).splitlines(True)]
+        self.lines = []
+        return lines
+
+
+class FakePyb(types.ModuleType):
+    """ Enough of the pyb module to run kabuki.pyboard modules on a workstation. """
+
+    def __init__(self):
+        super().__init__("pyb")
+        self.irq_enabled = True
+        self.irq_disables = 0
+        self.millis_value = 0
+        self.accel = FakeAccel()
+        self.i2c = FakeI2C(1)
+        self.servos = {}
+        self.vcp = FakeVCP()
+
+    def Accel(self):
+        return self.accel
+
+    def I2C(self, bus):
+        return self.i2c
+
+    def Servo(self, number):
+        if number not in self.servos:
+            self.servos[number] = FakeServo(number)
+        return self.servos[number]
+
+    def USB_VCP(self):
+        return self.vcp
+
+    def disable_irq(self):
+        state = self.irq_enabled
+        self.irq_enabled = False
+        self.irq_disables += 1
+        return state
+
+    def enable_irq(self, state=True):
+        self.irq_enabled = state
+
+    def millis(self):
+        return self.millis_value
+
+
+def import_with_fake_pyb(name):
+    """
+    Import a kabuki.pyboard module with a FakePyb in place of pyb.
+    :return: The module and the FakePyb it uses.
+    """
+    fake = FakePyb()
+    saved = sys.modules.get("pyb")
+    sys.modules["pyb"] = fake
+    sys.modules.pop(name, None)
+    try:
+        module = __import__(name, None, None, ["_"])
+    finally:
+        if saved is None:
+            del sys.modules["pyb"]
+        else:
+            sys.modules["pyb"] = saved
+    return module, fake
@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+
+from kabuki import timing
+from kabuki.background import Acquirer
+from kabuki.controller import Controller
+
+
+class SlowSensor:
+    """ Takes readings only when let, like a device that is slow to answer. """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.reading = 0
+
+    def read(self):
+        self.release.wait(5)
+        self.release.clear()
+        self.reading += 1
+        return self.reading
+
+
+class TestAcquirer(unittest.TestCase):
+
+    def setUp(self):
+        self.acquirer = Acquirer()
+        self.addCleanup(self.acquirer.stop)
+
+    def wait_for(self, condition):
+        give_up = time.monotonic() + 5
+        while not condition():
+            if time.monotonic() > give_up:
+                self.fail("timed out")
+            time.sleep(0.001)
+
+    def test_ticks_never_wait(self):
+        sensor = SlowSensor()
+        node = self.acquirer.input(sensor.read, period=0, initial=0)
+        controller = Controller()
+        controller.poll_input(node)
+        seen = []
+        controller.wire_output(node.add(node), seen.append)
+        controller.wire_output(node.reading_age(), lambda age: None)
+        self.acquirer.start()
+        start = time.monotonic()
+        for _ in range(5):
+            controller.update()
+        self.assertLess(time.monotonic() - start, 1, "no tick waited for the sensor")
+        self.assertEqual([0] * 5, seen)
+        sensor.release.set()
+        self.wait_for(lambda: node._fresh)
+        controller.update()
+        self.assertEqual(2, seen[-1], "one reading for the whole tick")
+        self.assertEqual(1, node.readings)
+        self.assertGreaterEqual(node.reading_age().value, 0)
+
+    def test_object_source_and_errors(self):
+        class Supplier:
+            def __init__(self):
+                self.count = 0
+
+            @property
+            def value(self):
+                self.count += 1
+                if self.count == 1:
+                    raise OSError("device busy")
+                return self.count
+
+        node = self.acquirer.input(Supplier(), period=1, initial=0)
+        self.acquirer.start()
+        self.wait_for(lambda: node._fresh)
+        node.poll()
+        self.assertGreaterEqual(node.value, 2)
+        self.assertEqual(1, node.errors)
+        self.assertIsInstance(node.error, OSError)
+
+    def test_first_reading_taken_at_once(self):
+        node = self.acquirer.input(lambda: 21, period=1000)
+        controller = Controller()
+        controller.poll_input(node)
+        seen = []
+        controller.wire_output(node.mul(2), seen.append)
+        self.acquirer.start()
+        controller.update()
+        self.assertEqual([42], seen, "a number from the first tick")
+        self.assertEqual(1, node.readings)
+
+    def test_without_threads(self):
+        clock = [0]
+        timing.set_clock(lambda: clock[0])
+        self.addCleanup(timing.set_clock, None)
+        self.acquirer.threaded = False
+        calls = []
+        node = self.acquirer.input(lambda: calls.append(clock[0]) or len(calls), period=10)
+        self.acquirer.start()
+        self.assertFalse(self.acquirer._running)
+        for _ in range(4):
+            node.poll()
+            node.reset()
+            clock[0] += 5
+        self.assertEqual([0, 10], calls, "taken in the poll, once per period")
+        self.assertEqual(2, node.value)
+        self.assertEqual(5, node.age)
@@ -0,0 +1,81 @@
+import io
+import unittest
+
+from kabuki.capturing import Capture
+from kabuki.controller import Controller
+from kabuki.operators import Operand
+
+
+class TestCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        self.trigger = Operand(False)
+        self.position = Operand(0)
+        self.stream = io.StringIO()
+
+    def tick(self, count):
+        for _ in range(count):
+            self.controller.update()
+            self.position._value += 1
+
+    def test_records_after_trigger(self):
+        c = Capture(self.trigger, [self.position, self.position.mul(2)], 3, stream=self.stream)
+        self.controller.wire_output(c, c)
+        self.tick(2)
+        self.assertFalse(c.complete)
+        self.trigger._value = True
+        self.tick(5)
+        self.assertTrue(c.complete)
+        self.assertEqual([[2, 4], [3, 6], [4, 8]], c.rows())
+        self.assertEqual("!capture 3 n0,n1\n2,4\n3,6\n4,8\n!end\n", self.stream.getvalue(), "dumped once")
+
+    def test_pre_trigger(self):
+        c = Capture(self.trigger, [self.position], 2, pre_ticks=2, labels=["pos"], stream=self.stream)
+        self.controller.wire_output(c, c)
+        self.tick(5)
+        self.trigger._value = True
+        self.tick(3)
+        self.assertEqual([[3], [4], [5], [6]], c.rows())
+
+    def test_needs_rising_edge(self):
+        self.trigger._value = True
+        c = Capture(self.trigger, [self.position], 1, stream=self.stream)
+        self.controller.wire_output(c, c)
+        self.tick(2)
+        self.assertFalse(c.complete, "trigger already true when armed")
+        self.trigger._value = False
+        self.tick(1)
+        self.trigger._value = True
+        self.tick(1)
+        self.assertEqual([[3]], c.rows())
+
+    def test_rearm(self):
+        c = Capture(self.trigger, [self.position], 1, stream=self.stream)
+        self.controller.wire_output(c, c)
+        self.tick(1)
+        self.trigger._value = True
+        self.tick(1)
+        self.assertTrue(c.complete)
+        c.rearm()
+        self.trigger._value = False
+        self.tick(1)
+        self.assertFalse(c.complete)
+        self.assertEqual([], c.rows())
+
+    def test_bad_sizes(self):
+        for ticks, pre_ticks in [(0, 0), (0, 3), (2, -1)]:
+            try:
+                Capture(Operand(False), [Operand(1)], ticks, pre_ticks)
+                self.fail("expected exception")
+            except RuntimeError:
+                pass
+
+    def test_facade_wires_critical(self):
+        import kabuki
+        from kabuki.controller import CRITICAL
+        c = kabuki.capture(Operand(False), [Operand(1)], 2)
+        try:
+            self.assertIn(c, [output._operand for output in kabuki._default_controller._output_classes[CRITICAL].items])
+        finally:
+            kabuki._default_controller.clear()
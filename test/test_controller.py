@@ -1,8 +1,10 @@
 import unittest
+from unittest import mock
 
 import kabuki
-from kabuki.controller import FunctionInput, ValueInput, Controller, ValueOutput, FunctionOutput
-from kabuki.operators import Operand
+from kabuki.controller import FunctionInput, ValueInput, Controller, ValueOutput, FunctionOutput, EventInput, \
+    CRITICAL, NORMAL, LOW
+from kabuki.operators import Operand, Operator, Cycler
 
 
 class TestController(unittest.TestCase):
@@ -219,3 +221,280 @@ class TestCalcCaching(unittest.TestCase):
         self.assertEqual(6, out.value)
         controller.update()
         self.assertEqual(7, out.value)
+
+
+class SimulatedInterrupt:
+    """ Stands in for a hardware interrupt source, calls the installed handler when fired. """
+
+    def __init__(self, event_input):
+        self._event_input = event_input
+
+    def fire(self, value):
+        self._event_input.set(value)
+
+
+class TestEvents(unittest.TestCase):
+
+    def test_only_downstream_outputs_update(self):
+        controller = Controller()
+        button = EventInput(False)
+        other = EventInput(1)
+        polled = CustomPollableSupplier()
+        controller.poll_input(polled)
+        controller.wire_event(button)
+        controller.wire_event(other)
+        button_out = CustomValueConsumer()
+        other_out = CustomValueConsumer()
+        controller.wire_output(button.neg(), button_out)
+        controller.wire_output(other.mul(2), other_out)
+
+        self.assertFalse(controller.update_events(), "nothing has signaled yet")
+        SimulatedInterrupt(button).fire(True)
+        self.assertTrue(controller.update_events())
+        self.assertEqual(False, button_out.value)
+        self.assertEqual(None, other_out.value, "not downstream of the button")
+        self.assertFalse(polled.called, "event updates do not poll")
+        self.assertFalse(controller.update_events(), "signal was consumed")
+
+        SimulatedInterrupt(other).fire(4)
+        controller.update_events()
+        self.assertEqual(8, other_out.value)
+
+    def test_shared_output_updates_once(self):
+        controller = Controller()
+        a = EventInput(1)
+        b = EventInput(2)
+        controller.wire_event(a)
+        controller.wire_event(b)
+        calls = []
+        controller.wire_output(a.add(b), calls.append)
+        a.set(3)
+        b.set(4)
+        controller.update_events()
+        self.assertEqual([7], calls)
+
+    def test_full_update_includes_event_inputs(self):
+        controller = Controller()
+        a = EventInput(5)
+        controller.wire_event(a)
+        out = CustomValueConsumer()
+        controller.wire_output(a, out)
+        controller.update()
+        self.assertEqual(5, out.value)
+
+    def test_wiring_after_events_remaps(self):
+        controller = Controller()
+        a = EventInput(1)
+        controller.wire_event(a)
+        first = CustomValueConsumer()
+        controller.wire_output(a, first)
+        a.set(2)
+        controller.update_events()
+        second = CustomValueConsumer()
+        controller.wire_output(a.add(1), second)
+        a.set(3)
+        controller.update_events()
+        self.assertEqual(3, first.value)
+        self.assertEqual(4, second.value)
+
+    def test_clear_detaches_handler(self):
+        controller = Controller()
+        a = EventInput(1)
+        controller.wire_event(a)
+        controller.clear()
+        a.set(2)
+        self.assertFalse(controller.update_events())
+
+
+class TestSwap(unittest.TestCase):
+
+    def test_swap_between_ticks(self):
+        controller = Controller()
+        old_out = CustomValueConsumer()
+        controller.wire_output(Operand(1), old_out)
+        controller.update()
+
+        staged = Controller()
+        polled = CustomPollableSupplier()
+        staged.poll_input(polled, LOW)
+        button = EventInput(False)
+        staged.wire_event(button)
+        new_out = CustomValueConsumer()
+        staged.wire_output(button.neg(), new_out)
+        controller.swap(staged)
+        self.assertEqual(None, new_out.value, "nothing changes until the next update")
+
+        controller.update()
+        self.assertTrue(polled.called)
+        self.assertEqual(True, new_out.value)
+        old_out.value = None
+        button.set(True)
+        self.assertTrue(controller.update_events(), "event inputs signal the new controller")
+        self.assertEqual(False, new_out.value)
+        self.assertEqual(None, old_out.value, "old outputs are gone")
+        self.assertEqual(1, len(controller.output_nodes()))
+
+    def test_swap_keeps_state(self):
+        controller = Controller()
+        controller.wire_output(Cycler(10, 1), CustomValueConsumer())
+        for _ in range(3):
+            controller.update()
+        staged = Controller()
+        out = CustomValueConsumer()
+        staged.wire_output(Cycler(10, 1), out)
+        controller.swap(staged)
+        controller.update()
+        self.assertEqual(controller.output_nodes()[0]._position, out.value)
+        self.assertGreater(out.value, 3)
+
+
+class CountingInput(Operator):
+    """ A polled node whose value is its poll count. """
+
+    def __init__(self):
+        super().__init__()
+        self.polls = 0
+
+    def poll(self):
+        self.polls += 1
+
+    def _calculate_value(self):
+        return self.polls
+
+
+class HeldBy(Operator):
+    """ A node reading a pollable it holds as an attribute, like AccelIn's axis nodes. """
+
+    def __init__(self, pollable):
+        super().__init__()
+        self._pollable = pollable
+
+    def _calculate_value(self):
+        return self._pollable.polls
+
+
+class SlowConsumer:
+    """ A consumer that takes a fixed number of (simulated) microseconds. """
+
+    def __init__(self, clock, cost):
+        self._clock = clock
+        self._cost = cost
+        self.values = []
+
+    def consume(self, value):
+        self._clock.now += self._cost
+        self.values.append(value)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0
+
+    def micros(self):
+        return self.now
+
+    def elapsed_micros(self, start):
+        return self.now - start
+
+
+class TestPriorities(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.multiple("kabuki.timing", micros=self.clock.micros,
+                                      elapsed_micros=self.clock.elapsed_micros)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_budget_updates_everything(self):
+        controller = Controller()
+        low = SlowConsumer(self.clock, 5000)
+        controller.wire_output(Operand(1), low, priority=LOW)
+        controller.update()
+        controller.update()
+        self.assertEqual([1, 1], low.values)
+        self.assertEqual(0, controller.overruns)
+
+    def test_critical_first_and_never_deferred(self):
+        controller = Controller()
+        order = []
+        debug = SlowConsumer(self.clock, 3000)
+        controller.wire_output(Operand("debug"), debug, priority=LOW)
+        controller.wire_output(Operand("led"), order.append)
+        servo = SlowConsumer(self.clock, 3000)
+        controller.wire_output(Operand("servo"), servo, priority=CRITICAL)
+        controller.wire_output(Operand("status"), order.append)
+        controller.wire_output(Operand("trace"), SlowConsumer(self.clock, 0), priority=LOW)
+        controller.set_budget(2)
+
+        controller.update()
+        self.assertEqual(["servo"], servo.values, "critical runs even over budget")
+        self.assertEqual(["led"], order, "one item per class even with the budget spent")
+        self.assertEqual(["debug"], debug.values)
+        self.assertEqual(1, controller.deferred_outputs(NORMAL))
+        self.assertEqual(1, controller.deferred_outputs(LOW))
+        self.assertEqual(0, controller.deferred_outputs(CRITICAL))
+        self.assertEqual(1, controller.overruns)
+
+    def test_progress_when_critical_work_overruns(self):
+        controller = Controller()
+        controller.wire_output(Operand(1), SlowConsumer(self.clock, 5000), priority=CRITICAL)
+        normal = [SlowConsumer(self.clock, 0) for _ in range(2)]
+        low = [SlowConsumer(self.clock, 0) for _ in range(2)]
+        for consumer in normal:
+            controller.wire_output(Operand(1), consumer, priority=NORMAL)
+        for consumer in low:
+            controller.wire_output(Operand(1), consumer, priority=LOW)
+        controller.set_budget(1)
+        for _ in range(4):
+            controller.update()
+        self.assertEqual([2, 2, 2, 2], [len(c.values) for c in normal + low], "every item served in turn")
+
+    def test_deferred_work_is_not_starved(self):
+        controller = Controller()
+        consumers = [SlowConsumer(self.clock, 1000) for _ in range(3)]
+        for i, consumer in enumerate(consumers):
+            controller.wire_output(Operand(i), consumer, priority=LOW)
+        controller.set_budget(0.5)
+
+        for _ in range(3):
+            controller.update()
+        self.assertEqual([[0], [1], [2]], [c.values for c in consumers], "round robin within the class")
+        self.assertEqual(6, controller.deferred_outputs(LOW))
+
+    def test_low_priority_input_deferred(self):
+        controller = Controller()
+        critical_in = CustomPollableSupplier()
+        low_ins = [CustomPollableSupplier(), CustomPollableSupplier()]
+        controller.poll_input(critical_in)
+        for low_in in low_ins:
+            controller.poll_input(low_in, priority=LOW)
+        controller.wire_output(Operand(1), SlowConsumer(self.clock, 5000), priority=CRITICAL)
+        controller.set_budget(1)
+        controller.update()
+        self.assertTrue(critical_in.called)
+        self.assertEqual([True, False], [low_in.called for low_in in low_ins])
+        self.assertEqual(1, controller.deferred_polls(LOW))
+
+    def test_inputs_read_by_critical_outputs_polled_first(self):
+        controller = Controller()
+        sensor = CountingInput()
+        holder = CountingInput()
+        controller.poll_input(sensor, priority=NORMAL)
+        controller.poll_input(holder, priority=LOW)
+        seen = []
+        controller.wire_output(sensor.add(HeldBy(holder)), seen.append, priority=CRITICAL)
+        controller.update()
+        controller.update()
+        self.assertEqual([2, 4], seen, "this tick's values, not the last tick's")
+        self.assertEqual(2, sensor.polls, "polled once per tick")
+        self.assertEqual(2, holder.polls)
+
+    def test_bad_priority(self):
+        controller = Controller()
+        try:
+            controller.wire_output(Operand(1), CustomValueConsumer(), priority=7)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
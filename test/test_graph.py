@@ -0,0 +1,108 @@
+import unittest
+
+from kabuki import graph
+from kabuki.controller import FunctionInput
+from kabuki.operators import Operand, Cycler
+
+
+def build(delta=0.5, band=2):
+    """ A graph like a nodes.py definition, rebuilt from scratch each call. """
+    speed = Operand(delta)
+    cycler = Cycler(10, speed)
+    lights = cycler.channel([(0, 0), (5, 1)])
+    smoothed = Operand(3).reduce_noise(band)
+    return cycler, smoothed, [lights, smoothed.add(1)]
+
+
+class TestNodes(unittest.TestCase):
+
+    def test_each_node_once(self):
+        a = Operand(1)
+        b = a.add(a)
+        c = b.mul(b)
+        found = graph.nodes(c, b)
+        self.assertEqual(3, len(found))
+        for node in (a, b, c):
+            self.assertTrue(any(n is node for n in found))
+
+
+class TestKey(unittest.TestCase):
+
+    def setUp(self):
+        self.keys = {}
+        self.keyed = []
+
+    def key(self, node):
+        self.keyed.append(node)  # keys remember nodes by id, so keep them alive
+        return graph.key(node, self.keys)
+
+    def test_same_structure_same_key(self):
+        self.assertEqual(self.key(build()[2][0]), self.key(build()[2][0]))
+
+    def test_settings_change_key(self):
+        self.assertNotEqual(self.key(Operand(1).throttle(10)), self.key(Operand(1).throttle(20)))
+        self.assertNotEqual(self.key(Operand(1).add(2)), self.key(Operand(1).add(3)))
+
+    def test_name(self):
+        self.assertEqual(self.key(Operand(1).named("x")), self.key(Operand(2).add(1).named("x")))
+
+    def test_lambdas_differ(self):
+        first = FunctionInput(lambda: 1)
+        second = FunctionInput(lambda: 2)
+        self.assertNotEqual(self.key(first), self.key(second))
+
+    def test_same_lambda_rebuilt_same_key(self):
+        def build_input():
+            return FunctionInput(lambda: 1)
+        self.assertEqual(self.key(build_input()), self.key(build_input()))
+
+    def test_long_chain(self):
+        def build_chain(step):
+            node = Operand(0)
+            for _ in range(5000):
+                node = node.add(step)
+            return node
+        self.assertEqual(self.key(build_chain(1)), self.key(build_chain(1)))
+        self.assertNotEqual(self.key(build_chain(1)), self.key(build_chain(2)))
+
+
+class TestTransferState(unittest.TestCase):
+
+    def test_unchanged_nodes_keep_state(self):
+        old_cycler, old_smoothed, old_roots = build()
+        for _ in range(5):
+            old_cycler.reset()
+            old_cycler.value
+        old_smoothed._last_trend_value = 7
+        old_smoothed._last_trend_direction = False
+
+        new_cycler, new_smoothed, new_roots = build()
+        self.assertEqual(2, graph.transfer_state(old_roots, new_roots))
+        self.assertEqual(old_cycler._position, new_cycler._position)
+        self.assertEqual(7, new_smoothed._last_trend_value)
+        self.assertFalse(new_smoothed._last_trend_direction)
+
+    def test_changed_nodes_start_fresh(self):
+        old_cycler, _, old_roots = build()
+        old_cycler._position = 4
+        new_cycler, _, new_roots = build(delta=0.25, band=1)
+        self.assertEqual(0, graph.transfer_state(old_roots, new_roots))
+        self.assertNotEqual(4, new_cycler._position)
+
+    def test_lambda_inputs_match_their_own_nodes(self):
+        def build_cyclers():
+            return Cycler(10, FunctionInput(lambda: 1)), Cycler(10, FunctionInput(lambda: 2))
+        old_first, old_second = build_cyclers()
+        old_first._position = 3
+        old_second._position = 7
+        new_first, new_second = build_cyclers()
+        self.assertEqual(2, graph.transfer_state([old_second, old_first], [new_first, new_second]))
+        self.assertEqual(3, new_first._position)
+        self.assertEqual(7, new_second._position)
+
+    def test_named_nodes_match_after_changes_upstream(self):
+        old = Cycler(10, Operand(1)).named("spin")
+        old._position = 6
+        new = Cycler(10, Operand(2)).named("spin")
+        self.assertEqual(1, graph.transfer_state([old], [new]))
+        self.assertEqual(6, new._position)
@@ -0,0 +1,207 @@
+import json
+import sys
+import unittest
+
+from kabuki import graphfile
+from kabuki.capturing import Capture
+from kabuki.controller import Controller, EventInput, FunctionInput, LOW
+from kabuki.graphfile import Stub
+from kabuki.operators import Operand, Cycler
+
+
+class Consumer:
+    """ An output that can be saved, registered for loading with this module. """
+
+    def __init__(self, label):
+        self.label = label
+        self.values = []
+
+    def consume(self, value):
+        self.values.append(value)
+
+    def _spec(self):
+        return "Consumer", [self.label]
+
+
+class Source:
+
+    def __init__(self):
+        self.values = {"a": 0}
+
+    def poll(self):
+        self.values["a"] += 1
+
+    def a(self):
+        return SourceNode(self)
+
+    def _spec(self):
+        return "Source", []
+
+
+class SourceNode(EventInput):
+
+    def __init__(self, source):
+        super().__init__()
+        self._source = source
+
+    def _calculate_value(self):
+        return self._source.values["a"]
+
+    def _spec(self):
+        return (self._source, "a"), []
+
+
+def build(controller):
+    source = Source()
+    controller.poll_input(source)
+    a = source.a()
+    button = EventInput(False)
+    controller.wire_event(button)
+    cycler = Cycler(4, a.mul(0.5), initial_position=1)
+    lights = cycler.channel([(0, 0), (2, 1)])
+    mapped = a.map(0, 10, 100, 200).reduce_noise(2).named("mapped")
+    swapped = button.swap(lights, mapped, sustain_time=0.5)
+    controller.wire_output(swapped.throttle(0).debug("out", sink=None).abs().neg().neg(), Consumer("swapped"))
+    controller.wire_output(mapped.filter_between(0, 1).retain_between(-5, 500).div(2).sub(1), Consumer("m"), LOW)
+    capture = Capture(button, [a, mapped], 3, pre_ticks=1, labels=["a", "m"])
+    controller.wire_output(capture, capture)
+    return source, button
+
+
+class TestGraphFile(unittest.TestCase):
+
+    def run_graph(self, controller, button, ticks=12):
+        for i in range(ticks):
+            if i == 6:
+                button.set(True)
+            controller.update()
+
+    def consumers(self, controller):
+        return [output._value_consumer for output in controller._outputs
+                if isinstance(output._value_consumer, Consumer)]
+
+    def test_round_trip(self):
+        original = Controller()
+        _, button = build(original)
+        text = graphfile.dumps(original)
+
+        loaded = Controller()
+        objects = graphfile.loads(text, loaded, [sys.modules[__name__]])
+        loaded_button = [o for o in objects if type(o) is EventInput][0]
+        self.assertEqual(text, graphfile.dumps(loaded), "saving what was loaded gives the same file")
+
+        self.run_graph(original, button)
+        self.run_graph(loaded, loaded_button)
+        self.assertEqual([c.values for c in self.consumers(original)],
+                         [c.values for c in self.consumers(loaded)])
+
+    def test_names_and_shared_nodes(self):
+        controller = Controller()
+        build(controller)
+        data = json.loads(graphfile.dumps(controller))
+        self.assertEqual(1, len([entry for entry in data["o"] if entry[0] == "Source"]), "shared once")
+        self.assertTrue(any(len(entry) > 2 and entry[2] == "mapped" for entry in data["o"]))
+
+    def test_stub(self):
+        controller = Controller()
+        accel = Stub("AccelIn")
+        controller.poll_input(accel)
+        controller.wire_output(accel.y().filter_above(-30), Stub("LedOut", 1))
+        data = json.loads(graphfile.dumps(controller))
+        self.assertEqual([["AccelIn", []], [[0, "y"], []], ["Operand", [-30]], ["FilterAbove", [{"@": 1}, {"@": 2}]],
+                          ["LedOut", [1]]], data["o"])
+        self.assertEqual([[0, 0]], data["p"])
+        self.assertEqual([[3, 4, 1]], data["w"])
+
+    def test_stub_chain(self):
+        controller = Controller()
+        accel = Stub("AccelIn")
+        controller.poll_input(accel)
+        controller.wire_output(accel.y().mul(2).add(1), Stub("LedOut", 1))
+        controller.wire_output(accel.x().map(-30, 30, 0, 180), Stub("ServoOut", 1))
+        data = json.loads(graphfile.dumps(controller))
+        names = [entry[0] for entry in data["o"]]
+        for name in ("AccelIn", "Mul", "Add", "Map", "LedOut", "ServoOut"):
+            self.assertIn(name, names)
+        self.assertEqual(2, len(data["w"]))
+
+    def test_unsaveable(self):
+        controller = Controller()
+        controller.wire_output(FunctionInput(lambda: 1), Consumer("x"))
+        try:
+            graphfile.dumps(controller)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_unknown_class(self):
+        text = json.dumps({"v": 1, "o": [["Nope", []]], "p": [], "e": [], "w": []})
+        try:
+            graphfile.loads(text, Controller())
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_build_in_steps(self):
+        controller = Controller()
+        build(controller)
+        builder = graphfile.GraphBuilder(json.loads(graphfile.dumps(controller)), [sys.modules[__name__]])
+        steps = 1
+        while not builder.build(5):
+            steps += 1
+        self.assertGreater(steps, 2)
+
+
+class TestGraphReceiver(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        self.old = Consumer("old")
+        self.controller.wire_output(Operand(1), self.old)
+        self.replies = []
+        self.keep = Source()
+        self.receiver = graphfile.GraphReceiver(self.controller, [sys.modules[__name__]], keep=[self.keep], per_poll=2,
+                                                reply=self.replies.append)
+
+    def push(self, text, size=20):
+        for line in graphfile.push_lines(text, size):
+            self.receiver.feed(line)
+
+    def tick(self):
+        self.receiver.poll()
+        self.controller.update()
+
+    def test_push(self):
+        sender = Controller()
+        sender.wire_output(Operand(3).mul(2).add(1), Consumer("led"))
+        sender.wire_output(Operand(5).neg(), Consumer("new"))
+        text = graphfile.dumps(sender)
+        self.push(text)
+        ticks = 0
+        while not self.replies:
+            self.tick()
+            ticks += 1
+        self.assertGreater(ticks, 2, "built across ticks")
+        self.assertEqual(["#ok 9"], self.replies)
+        # the update following the poll that finished building runs the new graph
+        self.assertEqual(ticks - 1, len(self.old.values), "old graph ran until the swap")
+        self.tick()
+        self.assertEqual(ticks - 1, len(self.old.values))
+        self.assertIs(self.keep, self.controller._inputs[0])
+        self.assertEqual(graphfile.dumps(sender), graphfile.dumps(self.controller, exclude=[self.keep]))
+
+    def test_incomplete(self):
+        lines = graphfile.push_lines(json.dumps({"v": 1, "o": [], "p": [], "e": [], "w": []}), 5)
+        del lines[2]
+        for line in lines:
+            self.receiver.feed(line)
+        self.tick()
+        self.assertTrue(self.replies[0].startswith("#error"))
+        self.assertEqual(1, len(self.old.values), "old graph keeps running")
+
+    def test_bad_graph(self):
+        self.push(json.dumps({"v": 1, "o": [["Nope", []]], "p": [], "e": [], "w": []}))
+        self.tick()
+        self.tick()
+        self.assertEqual(["#error unknown class in graph file: Nope"], self.replies)
+        self.assertEqual(2, len(self.old.values))
@@ -0,0 +1,111 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+import install_to_pyboard as installer
+
+
+class TestInstall(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.board = tempfile.mkdtemp()
+        self.write(self.root, "kabuki/__init__.py", "")
+        self.write(self.root, "kabuki/operators.py", "x = 1\n")
+        self.write(self.root, "kabuki/offline.py", "import numpy\n")
+        self.write(self.root, "kabuki/pyboard/inputs.py", "y = 2\n")
+        self.write(self.root, "lib/pyb.py", "")
+        self.write(self.root, "kabuki/pyboard/pyb.py", "")
+        self.log = []
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        shutil.rmtree(self.board)
+
+    def write(self, directory, path, text):
+        path = os.path.join(directory, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(text)
+
+    def install(self, mpy_cross=None, force=False):
+        sources = installer.source_files(self.root)
+        files = installer.build(self.root, sources, mpy_cross)
+        return installer.install(self.board, files, force, log=self.log.append)
+
+    def fake_mpy_cross(self):
+        # writes "M", a format version and the source, like bytecode for the purposes of the test
+        path = os.path.join(self.root, "mpy-cross")
+        self.write(self.root, "mpy-cross",
+                   "#!{}\nimport sys\nargs = sys.argv[1:]\nout = args[args.index('-o') + 1]\n"
+                   "open(out, 'wb').write(b'M\\x06\\x00\\x1f' + open(args[-1], 'rb').read())\n".format(sys.executable))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def test_sources(self):
+        self.assertEqual(["kabuki/__init__.py", "kabuki/operators.py", "kabuki/pyboard/inputs.py"],
+                         installer.source_files(self.root))
+
+    def test_lib_modules(self):
+        self.write(self.root, "lib/ppm_decoder.py", "z = 3\n")
+        self.assertIn("lib/ppm_decoder.py", installer.source_files(self.root))
+        self.install()
+        self.assertTrue(os.path.isfile(os.path.join(self.board, "lib", "ppm_decoder.py")))
+        self.assertFalse(os.path.exists(os.path.join(self.board, "lib", "lib")))
+        self.install(self.fake_mpy_cross())
+        self.assertTrue(os.path.isfile(os.path.join(self.board, "lib", "ppm_decoder.mpy")))
+        self.assertFalse(os.path.exists(os.path.join(self.board, "lib", "ppm_decoder.py")))
+        text = installer.frozen_manifest(self.root, installer.source_files(self.root))
+        self.assertIn('module("ppm_decoder.py", base_path="{}")'.format(os.path.join(os.path.abspath(self.root), "lib")),
+                      text)
+
+    def test_skips_unchanged(self):
+        self.assertEqual(3, self.install())
+        self.assertTrue(os.path.isfile(os.path.join(self.board, "lib", "kabuki", "pyboard", "inputs.py")))
+        self.assertTrue(os.path.isfile(os.path.join(self.board, "main.py")))
+        self.assertEqual(0, self.install())
+        self.write(self.root, "kabuki/operators.py", "x = 3\n")
+        self.assertEqual(1, self.install())
+        self.assertEqual(3, self.install(force=True))
+
+    def test_replaced_file_copied(self):
+        self.install()
+        os.remove(os.path.join(self.board, "lib", "kabuki", "operators.py"))
+        self.assertEqual(1, self.install())
+
+    def test_bytecode_replaces_sources(self):
+        self.install()
+        self.assertEqual(3, self.install(self.fake_mpy_cross()))
+        kabuki_dir = os.path.join(self.board, "lib", "kabuki")
+        self.assertEqual(["__init__.mpy", "operators.mpy", "pyboard"], sorted(os.listdir(kabuki_dir)))
+        self.assertIn("removed kabuki/operators.py", self.log)
+
+    def test_bytecode_replaces_unlisted_sources(self):
+        self.write(self.board, "lib/kabuki/operators.py", "old = True\n")
+        self.install(self.fake_mpy_cross())
+        self.assertFalse(os.path.exists(os.path.join(self.board, "lib", "kabuki", "operators.py")))
+
+    def test_bad_bytecode(self):
+        path = os.path.join(self.root, "cp")
+        self.write(self.root, "cp", "#!/bin/sh\ncp \"$5\" \"$4\"\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        try:
+            self.install(path)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_unreadable_manifest(self):
+        self.install()
+        self.write(self.board, installer.MANIFEST_NAME, "{")
+        self.assertEqual({}, installer.read_manifest(self.board))
+        self.assertEqual(3, self.install())
+
+    def test_frozen_manifest(self):
+        text = installer.frozen_manifest(self.root, installer.source_files(self.root))
+        self.assertIn('module("kabuki/operators.py", base_path="{}")'.format(os.path.abspath(self.root)), text)
+        self.assertNotIn("offline", text)
@@ -0,0 +1,66 @@
+import io
+import math
+import os
+import tempfile
+import unittest
+
+from kabuki import keycompiler, timing
+from kabuki.animation import Channel
+from kabuki.controller import Controller
+from kabuki.operators import Operand
+from kabuki.recording import Recorder
+
+
+class TestSimplify(unittest.TestCase):
+
+    def test_within_tolerance(self):
+        samples = [(i / 100, math.sin(i / 100) + 0.3 * math.sin(i / 30)) for i in range(2000)]
+        keys = keycompiler.simplify(samples, 0.01)
+        self.assertLess(len(keys), len(samples) / 5)
+        self.assertLessEqual(keycompiler.max_error(samples, keys), 0.01)
+        self.assertEqual(samples[0], keys[0])
+        self.assertEqual(samples[-1], keys[-1])
+
+    def test_channel_follows_samples(self):
+        samples = [(i, abs(i % 40 - 20)) for i in range(100)]
+        keys = keycompiler.simplify(samples, 0)
+        self.assertEqual([(0, 20), (20, 0), (40, 20), (60, 0), (80, 20), (99, 1)], keys)
+        for x, y in samples:
+            self.assertAlmostEqual(y, Channel(x, 200, keys).value)
+
+    def test_short_and_unsorted(self):
+        self.assertEqual([(0, 1), (1, 5)], keycompiler.simplify([(0, 1), (1, 5)], 0.1))
+        try:
+            keycompiler.simplify([(0, 1), (0, 2), (1, 2)], 0.1)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_read_csv(self):
+        path = os.path.join(tempfile.mkdtemp(), "samples.csv")
+        with open(path, "w") as f:
+            f.write("time,angle,speed\n0,1,9\n1,2,8\n2,x,7\n3,4,6\n")
+        self.assertEqual([(0, 1), (1, 2), (3, 4)], keycompiler.read_csv(path, "time", "angle"))
+        self.assertEqual([(1, 9), (2, 8), (4, 6)], keycompiler.read_csv(path, 1, 2))
+        os.remove(path)
+
+    def test_read_recording(self):
+        stream = io.BytesIO()
+        controller = Controller()
+        node = Operand(0)
+        recorder = Recorder(stream, [node], labels=["angle"])
+        controller.poll_input(recorder)
+        controller.wire_output(node, lambda value: None)
+        clock = [0]
+        timing.set_clock(lambda: clock[0])
+        try:
+            for i in range(5):
+                node._value = i * 2
+                clock[0] = i * 10 if i != 2 else 10
+                controller.update()
+        finally:
+            timing.set_clock(None)
+        recorder.flush()
+        stream.seek(0)
+        self.assertEqual([(0, 0), (10, 4), (30, 6), (40, 8)],
+                         keycompiler.read_recording(stream, "angle"))
@@ -0,0 +1,99 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+from kabuki import graphfile
+from kabuki.controller import Controller
+from kabuki.keyframes import KeyTable, TableChannel, pack_table, write_table
+from kabuki.operators import Cycler
+
+class Consumer:
+
+    def __init__(self):
+        self.values = []
+
+    def consume(self, value):
+        self.values.append(value)
+
+    def _spec(self):
+        return "Consumer", []
+
+
+KEYS = [(0.5, 0), (1, 1), (1.25, -2), (2, 0.5), (3, 3), (3.5, 0), (4.75, 1.5), (6, 2)]
+
+
+class TestKeyTable(unittest.TestCase):
+
+    def compare_with_channel(self, table, delta=0.125, ticks=200):
+        cycler = Cycler(7, delta)
+        channel = cycler.channel(KEYS)
+        table_channel = cycler.table_channel(table)
+        for _ in range(ticks):
+            cycler.reset()
+            channel.reset()
+            table_channel.reset()
+            self.assertAlmostEqual(channel.value, table_channel.value)
+
+    def test_bytes(self):
+        self.compare_with_channel(KeyTable(pack_table(KEYS)))
+
+    def test_stream_window(self):
+        table = KeyTable(io.BytesIO(pack_table(KEYS)), window=3)
+        self.compare_with_channel(table)
+        self.compare_with_channel(table, delta=-0.375)
+        self.compare_with_channel(table, delta=2.5)
+
+    def test_find(self):
+        table = KeyTable(pack_table(KEYS))
+        for hint in range(len(KEYS) + 1):
+            self.assertEqual(0, table.find(0, hint))
+            self.assertEqual(2, table.find(1, hint))
+            self.assertEqual(3, table.find(1.5, hint))
+            self.assertEqual(8, table.find(6, hint))
+
+    def test_single_key(self):
+        table = KeyTable(pack_table([(1, 5)]))
+        self.assertEqual((1, 5), table.first)
+        self.assertEqual(5, TableChannel(3, 4, table).value)
+
+    def test_bad_tables(self):
+        for data in [b"", b"KBR1" + bytes(12), pack_table([])]:
+            try:
+                KeyTable(data)
+                self.fail("expected exception")
+            except RuntimeError:
+                pass
+        try:
+            pack_table([(1, 0), (0, 0)])
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_truncated_file(self):
+        data = pack_table(KEYS)
+        try:
+            KeyTable(io.BytesIO(data[:-8]), window=2)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_graph_file(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "keys.kbk")
+        write_table(path, KEYS)
+        controller = Controller()
+        consumer = Consumer()
+        table = KeyTable(path)
+        controller.wire_output(Cycler(7, 0.25).table_channel(table), consumer)
+        loaded = Controller()
+        objects = graphfile.loads(graphfile.dumps(controller), loaded, [sys.modules[__name__]])
+        for _ in range(20):
+            controller.update()
+            loaded.update()
+        self.assertEqual(consumer.values, objects[-1].values)
+        table.close()
+        [o for o in objects if isinstance(o, KeyTable)][0].close()
+        os.remove(path)
+        os.rmdir(directory)
@@ -0,0 +1,110 @@
+import math
+import time
+import unittest
+
+from kabuki import timing
+from kabuki.controller import Controller, FunctionInput
+from kabuki.operators import Cycler, Operand
+
+try:
+    import numpy
+    from kabuki import offline
+except ImportError:
+    numpy = None
+
+
+def build():
+    """ A graph mixing stateless and stateful operators, returns its inputs and outputs. """
+    samples = {"tilt": 0.0, "pressed": False}
+    tilt = FunctionInput(lambda: samples["tilt"])
+    pressed = FunctionInput(lambda: samples["pressed"])
+    smoothed = tilt.reduce_noise(0.3)
+    servo = smoothed.map(-10, 10, 0, 180).add(tilt.div(tilt.sub(2)))
+    bands = tilt.filter_above(5).mul(2).add(tilt.retain_between(-3, 3)).abs().neg()
+    cycler = Cycler(4, tilt.abs().mul(0.01))
+    blink = cycler.channel([(0, 0), (1, 1), (3, 0.5)])
+    swapped = pressed.swap(blink, servo, sustain_time=0.05)
+    throttled = smoothed.throttle(30).add(cycler.channel([(0, 2), (2, -2)]))
+    lit = pressed.neg()
+    curve = tilt.lut([0, 1, 4, 9, 16, 15], -10, 10)
+    return samples, tilt, pressed, [servo, bands, blink, swapped, throttled, lit, curve]
+
+
+@unittest.skipIf(numpy is None, "needs numpy")
+class TestOffline(unittest.TestCase):
+
+    def tick_by_tick(self, tilts, presses, period):
+        samples, _, _, outputs = build()
+        controller = Controller()
+        results = [[] for _ in outputs]
+        for node, values in zip(outputs, results):
+            controller.wire_output(node, values.append)
+        clock = [0]
+        timing.set_clock(lambda: clock[0])
+        try:
+            for i in range(len(tilts)):
+                clock[0] = i * period
+                samples["tilt"] = tilts[i]
+                samples["pressed"] = presses[i]
+                controller.update()
+        finally:
+            timing.set_clock(None)
+        return results
+
+    def test_matches_controller(self):
+        ticks = 2000
+        tilts = [12 * math.sin(i / 37.0) + (i % 7) * 0.1 for i in range(ticks)]
+        presses = [(i // 150) % 3 == 0 for i in range(ticks)]
+        expected = self.tick_by_tick(tilts, presses, 10)
+
+        _, tilt, pressed, outputs = build()
+        actual = offline.evaluate(outputs, {tilt: tilts, pressed: presses}, period=10)
+        for e, a in zip(expected, actual):
+            self.assertEqual(e, a.tolist())
+
+    def test_single_node(self):
+        n = FunctionInput(lambda: 0)
+        result = offline.evaluate(n.mul(2).add(Operand(1)), {n: [1, 2, 3]})
+        self.assertEqual([3, 5, 7], result.tolist())
+
+    def test_bool_inputs(self):
+        samples = {"a": False, "b": False}
+        a = FunctionInput(lambda: samples["a"])
+        b = FunctionInput(lambda: samples["b"])
+        nodes = [a.add(b), a.sub(b), a.mul(b), a.neg(), a.abs(), a.add(b).neg()]
+        controller = Controller()
+        expected = [[] for _ in nodes]
+        for node, values in zip(nodes, expected):
+            controller.wire_output(node, values.append)
+        a_samples = [True, True, False, False]
+        b_samples = [True, False, True, False]
+        for i in range(len(a_samples)):
+            samples["a"] = a_samples[i]
+            samples["b"] = b_samples[i]
+            controller.update()
+        actual = offline.evaluate(nodes, {a: a_samples, b: b_samples})
+        for e, a in zip(expected, actual):
+            # bools must stay bools and sums must be numbers, as in the controller
+            self.assertEqual([(type(v), v) for v in e], [(type(v), v) for v in a.tolist()])
+
+    def test_specialized_operators_vectorized(self):
+        from kabuki import optimize
+        self.assertIs(offline._VECTORIZED[offline.Neg], offline._vectorized(optimize.BoolNeg))
+        self.assertIs(offline._VECTORIZED[offline.Div], offline._vectorized(optimize.PowerOfTwoDiv))
+        self.assertIsNone(offline._vectorized(offline.Channel))
+
+    def test_missing_input(self):
+        n = FunctionInput(lambda: 0)
+        try:
+            offline.evaluate(n.add(1), {}, ticks=3)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_fast(self):
+        ticks = 200000
+        n = FunctionInput(lambda: 0.0)
+        node = n.map(-1, 1, 0, 180).sub(90).abs().filter_below(10)
+        start = time.time()
+        offline.evaluate(node, {n: numpy.linspace(-1, 1, ticks)})
+        self.assertLess(time.time() - start, 1.0)
@@ -360,6 +360,37 @@ class TestRetainBetween(unittest.TestCase):
         self.assertEqual(0, n1.retain_between(0, 2).value)
 
 
+class TestLut(unittest.TestCase):
+
+    def test_interpolates(self):
+        n = Operand(0)
+        op = n.lut([0, 10, 40], 0, 4)
+        for value, expected in [(-1, 0), (0, 0), (1, 5), (2, 10), (3, 25), (4, 40), (5, 40)]:
+            n._value = value
+            op.reset()
+            self.assertEqual(expected, op.value)
+
+    def test_reverse_range(self):
+        self.assertEqual(25, Operand(2.5).lut([100, 50, 0], 10, 0).value)
+        self.assertEqual(100, Operand(12).lut([100, 50, 0], 10, 0).value)
+        self.assertEqual(0, Operand(-1).lut([100, 50, 0], 10, 0).value)
+
+    def test_make_table(self):
+        from kabuki.filters import make_table
+        table = make_table(lambda x: 255 * (x / 255) ** 2, 0, 255, size=4, typecode="H")
+        self.assertEqual([0, 28, 113, 255], list(table))
+        gamma = Operand(170).lut(table, 0, 255)
+        self.assertEqual(113, gamma.value)
+
+    def test_bad_table(self):
+        for table, start, stop in [([1], 0, 1), ([1, 2], 3, 3)]:
+            try:
+                Operand(0).lut(table, start, stop)
+                self.fail("expected exception")
+            except RuntimeError:
+                pass
+
+
 class TestConstrain(unittest.TestCase):
 
     def test_between(self):
@@ -865,3 +896,34 @@ class TestDictSource(unittest.TestCase):
         data["c"] = 3
         n1.reset()
         self.assertEqual(3, n1.value)
+
+
+class TestPacks(unittest.TestCase):
+
+    def run_fresh(self, code):
+        # a new interpreter, so nothing is imported yet
+        import subprocess
+        import sys
+        root = __file__.rsplit("/test/", 1)[0]
+        return subprocess.check_output([sys.executable, "-c", code], cwd=root).decode().split()
+
+    def test_packs_imported_on_demand(self):
+        loaded = self.run_fresh(
+            "import sys, kabuki\n"
+            "from kabuki.operators import Operand\n"
+            "kabuki.wire_output(Operand(True).neg().mul(2), print)\n"
+            "packs = ['filters', 'animation', 'selection', 'sources']\n"
+            "print(' '.join([p for p in packs if 'kabuki.' + p in sys.modules]) or '-')\n"
+            "Operand(1).map(0, 1, 0, 10)\n"
+            "print(' '.join([p for p in packs if 'kabuki.' + p in sys.modules]))\n")
+        self.assertEqual(["-", "filters"], loaded)
+
+    def test_import_from_operators(self):
+        from kabuki import animation
+        self.assertIs(animation.Cycler, Cycler)
+        self.assertIn("Swap", dir(__import__("kabuki.selection", None, None, ["Swap"])))
+        try:
+            from kabuki.operators import Nope
+            self.fail("expected exception")
+        except ImportError:
+            pass
@@ -0,0 +1,128 @@
+import unittest
+
+from kabuki import graph, optimize
+from kabuki.controller import Controller, EventInput
+from kabuki.filters import Lut, Map
+from kabuki.operators import Operand
+
+
+class TestFoldMaps(unittest.TestCase):
+
+    def wire(self, *nodes):
+        controller = Controller()
+        results = []
+        for node in nodes:
+            values = []
+            controller.wire_output(node, values.append)
+            results.append(values)
+        return controller, results
+
+    def test_same_values(self):
+        ranges = [(0, 10, 0, 180), (-1.5, 2.25, 180, 0), (10, -10, 0.1, 0.7), (0, 3, 5, 5)]
+        inputs = [i * 0.37 - 12 for i in range(70)] + [0, 10, -1.5, 2.25, True, False]
+        source = Operand(0)
+        mapped = [source.map(*r) for r in ranges]
+        controller, results = self.wire(*mapped)
+        folded_controller, folded_results = self.wire(*[source.map(*r) for r in ranges])
+        self.assertEqual(len(ranges), optimize.optimize(folded_controller))
+        self.assertTrue(all([type(node) is Lut for node in folded_controller.output_nodes()]))
+        for value in inputs:
+            source._value = value
+            controller.update()
+            folded_controller.update()
+        self.assertEqual(results, folded_results)
+
+    def test_inner_nodes_and_names(self):
+        source = Operand(3)
+        shared = source.map(0, 10, 0, 100).named("level")
+        controller, results = self.wire(shared.add(1), shared.mul(2), source.map(0, 10, 0, 1, constrain=False))
+        self.assertEqual(1, optimize.fold_maps(controller))
+        nodes = graph.nodes(*controller.output_nodes())
+        luts = [node for node in nodes if type(node) is Lut]
+        self.assertEqual(1, len(luts), "shared node replaced once")
+        self.assertEqual("level", luts[0]._name)
+        self.assertEqual(1, len([node for node in nodes if type(node) is Map]), "unconstrained map kept")
+        controller.update()
+        self.assertEqual([[31], [60], [0.3]], results)
+
+    def test_chained_maps(self):
+        source = Operand(0.5)
+        controller, results = self.wire(source.map(0, 1, 0, 10).map(0, 10, 0, 180))
+        self.assertEqual(2, optimize.optimize(controller))
+        self.assertEqual([Lut, Lut, Operand], [type(node) for node in graph.nodes(*controller.output_nodes())])
+        controller.update()
+        self.assertEqual([[90]], results)
+
+    def test_variable_ranges_kept(self):
+        source = Operand(3)
+        top = EventInput(10)
+        controller, _ = self.wire(source.map(0, top, 0, 100), source.map(0, 10, 0, 100, constrain=False).constrain(0, 50))
+        self.assertEqual(0, optimize.fold_maps(controller))
+
+    def test_event_outputs_remapped(self):
+        button = EventInput(0)
+        controller, results = self.wire(button.map(0, 1, 0, 255))
+        controller.wire_event(button)
+        button.set(1)
+        controller.update_events()
+        optimize.optimize(controller)
+        button.set(0.5)
+        controller.update_events()
+        self.assertEqual([[255, 127.5]], results)
+
+
+class TestSpecialize(unittest.TestCase):
+
+    def test_same_values(self):
+        flag = Operand(True)
+        number = Operand(3)
+        source = Operand(0.0)
+        nodes = [flag.neg(), flag.neg().neg(), number.neg(), number.add(flag).neg(), source.add(number).neg(),
+                 source.constrain(10, -2.5), source.div(4), source.div(0.25), source.div(3), source.div(0),
+                 number.div(2).neg(), flag.div(-8)]
+        controller = Controller()
+        results = []
+        specialized_results = []
+        for node in nodes:
+            controller.wire_output(node, results.append)
+        specialized = Controller()
+        for node in nodes:
+            specialized.wire_output(node, specialized_results.append)
+        self.assertEqual(13, optimize.specialize(specialized), "inner nodes too")
+        kinds = [type(node).__name__ for node in specialized.output_nodes()]
+        self.assertEqual(["BoolNeg", "BoolNeg", "NumberNeg", "NumberNeg", "NumberNeg", "ConstantConstrain",
+                          "PowerOfTwoDiv", "PowerOfTwoDiv", "ConstantDiv", "Div", "NumberNeg", "PowerOfTwoDiv"],
+                         kinds)
+        for value in [i * 0.37 - 12 for i in range(70)] + [1e-310, -0.0, float("inf")]:
+            source._value = value
+            controller.update()
+            specialized.update()
+        self.assertEqual(results, specialized_results)
+
+    def test_nested(self):
+        flag = Operand(True)
+        controller = Controller()
+        results = []
+        controller.wire_output(flag.neg().neg(), results.append)
+        self.assertEqual(2, optimize.specialize(controller))
+        self.assertEqual([optimize.BoolNeg, optimize.BoolNeg, Operand],
+                         [type(node) for node in graph.nodes(*controller.output_nodes())])
+        controller.update()
+        self.assertEqual([True], results)
+
+    def test_unknown_kinds_kept(self):
+        event = EventInput(True)
+        top = EventInput(10)
+        controller = Controller()
+        controller.wire_output(event.neg(), print)
+        controller.wire_output(Operand(1).constrain(0, top), print)
+        controller.wire_output(Operand(1).div(top), print)
+        self.assertEqual(0, optimize.specialize(controller))
+
+    def test_saved_as_generic(self):
+        from kabuki import graphfile
+        controller = Controller()
+        controller.wire_output(Operand(5).div(2).named("half"), graphfile.Stub("LedOut", 1))
+        optimize.specialize(controller)
+        self.assertEqual("half", controller.output_nodes()[0]._name)
+        self.assertIn('["Div",[{"@":0},{"@":1}],"half"]', graphfile.dumps(controller))
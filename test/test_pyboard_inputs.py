@@ -0,0 +1,257 @@
+import contextlib
+import io
+import json
+import types
+import unittest
+from unittest import mock
+
+from kabuki import graphfile, timing
+from kabuki.controller import Controller
+from test.fakepyb import import_with_fake_pyb
+
+inputs, pyb = import_with_fake_pyb("kabuki.pyboard.inputs")
+
+
+class InterruptCheckingDecoder(inputs.SimulatedDecoder):
+
+    def __init__(self):
+        super().__init__(channels=4)
+        self.reads_with_irq = 0
+
+    def get_channel_value(self, channel):
+        if pyb.irq_enabled:
+            self.reads_with_irq += 1
+        return super().get_channel_value(channel)
+
+
+class TestPpmIn(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = [0]
+        timing.set_clock(lambda: self.clock[0])
+        self.decoder = InterruptCheckingDecoder()
+        self.ppm = inputs.PpmIn("X1", channels=4, dropout=50, decoder=self.decoder)
+        self.controller = Controller()
+        self.controller.poll_input(self.ppm)
+
+    def tearDown(self):
+        timing.set_clock(None)
+
+    def tick(self, milliseconds=10):
+        self.clock[0] += milliseconds
+        self.controller.update()
+
+    def test_snapshot(self):
+        values = []
+        self.controller.wire_output(self.ppm.channel(1).sub(self.ppm.channel(3)), values.append)
+        self.assertIs(self.ppm.channel(1), self.ppm.channel(1), "channel nodes are shared")
+        self.decoder.set(1, 2000)
+        self.decoder.set(3, 1000)
+        self.decoder.frame()
+        disables = pyb.irq_disables
+        self.tick()
+        self.assertEqual([1000], values)
+        self.assertEqual(disables + 1, pyb.irq_disables, "interrupts off once per poll")
+        self.assertEqual(0, self.decoder.reads_with_irq)
+        self.assertTrue(pyb.irq_enabled)
+
+    def test_frame_age_and_dropout(self):
+        ages = []
+        dropouts = []
+        self.controller.wire_output(self.ppm.frame_age(), ages.append)
+        self.controller.wire_output(self.ppm.dropout(), dropouts.append)
+        self.tick()
+        self.decoder.frame()
+        self.tick()
+        for _ in range(6):
+            self.tick()
+        self.decoder.frame()
+        self.tick()
+        self.assertEqual([50, 0, 10, 20, 30, 40, 50, 60, 0], ages, "no frame yet counts as dropped out")
+        self.assertEqual([True, False, False, False, False, False, True, True, False], dropouts)
+
+    def test_changes_without_frame_count(self):
+        decoder = inputs.SimulatedDecoder(channels=2)
+        del decoder.frames
+        ppm = inputs.PpmIn("X1", channels=2, dropout=20, decoder=decoder)
+        dropout = ppm.dropout()
+        results = []
+        for width in [1500, 1501, 1501, 1501, 1501, 1502]:
+            self.clock[0] += 10
+            decoder.set(0, width)
+            ppm.poll()
+            dropout.reset()
+            results.append(dropout.value)
+        self.assertEqual([True, False, False, True, True, False], results)
+
+    def test_missing_readings(self):
+        values = []
+        for channel in range(4):
+            self.controller.wire_output(self.ppm.channel(channel), values.append)
+        self.decoder.set(0, None)
+        self.decoder.set(1, -1)
+        self.decoder.set(2, 70000)
+        self.decoder.frame()
+        self.tick()
+        self.assertEqual([0, 0, 0xffff, 1500], values)
+        self.assertTrue(pyb.irq_enabled)
+
+    def test_bad_channel(self):
+        try:
+            self.ppm.channel(4)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_graph_file(self):
+        self.controller.wire_output(self.ppm.dropout().swap(self.ppm.channel(0), 1500),
+                                    graphfile.Stub("ServoOut", 1))
+        text = graphfile.dumps(self.controller)
+        self.assertIn('[[0,"channel"],[0]]', text)
+        self.assertIn('[[0,"dropout"],[]]', text)
+
+
+def burst(x, y, z, alert=False):
+    # 6 bit two's complement readings as the sensor reports them
+    return bytes([(v & 0x3f) | (0x40 if alert else 0) for v in (x, y, z)])
+
+
+class TestAccelIn(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = [0]  # microseconds
+        patcher = mock.patch.multiple("kabuki.timing", micros=lambda: self.clock[0],
+                                      elapsed_micros=lambda start: self.clock[0] - start)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pyb.i2c.bursts = []
+        pyb.i2c.reads = 0
+
+    def test_oversampled_axes(self):
+        accel = inputs.AccelIn(rate=64, oversample=2)
+        self.assertEqual(0b11100001, pyb.accel.registers[0x08])
+        self.assertEqual(0b01, pyb.accel.registers[0x07] & 1, "back in active mode")
+        x, y, z = accel.x(), accel.y(), accel.z()
+        self.assertIs(x, accel.x(), "axis nodes are shared")
+        pyb.i2c.bursts = [burst(1, -2, 21), burst(3, -4, 20, alert=True), burst(3, -4, 20), burst(5, 31, -32)]
+        results = []
+        for _ in range(4):
+            self.clock[0] += 20000
+            accel.poll()
+            for node in (x, y, z):
+                node.reset()
+            results.append((x.value, y.value, z.value))
+        self.assertEqual([(1, -2, 21), (1, -2, 21), (4, -6, 41), (8, 27, -12)], results)
+
+    def test_reads_once_per_sample(self):
+        accel = inputs.AccelIn(rate=32)
+        for _ in range(10):
+            self.clock[0] += 5000
+            accel.poll()
+        self.assertEqual(2, pyb.i2c.reads, "two sensor samples in 50 milliseconds")
+
+    def test_fast_rate_not_truncated(self):
+        accel = inputs.AccelIn(rate=120)
+        accel.poll()
+        self.clock[0] += 8333
+        accel.poll()
+        self.assertEqual(1, pyb.i2c.reads, "8.33 milliseconds per sample, not 8")
+        self.clock[0] += 1
+        accel.poll()
+        self.assertEqual(2, pyb.i2c.reads)
+
+    def test_bad_rate(self):
+        try:
+            inputs.AccelIn(rate=100)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+
+class TestSerialIn(unittest.TestCase):
+
+    def setUp(self):
+        self.serial_in = inputs.SerialIn()
+        pyb.vcp.lines = []
+
+    def poll(self, *lines):
+        pyb.vcp.lines = list(lines)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.serial_in.poll()
+        return output.getvalue()
+
+    def read(self, *nodes):
+        for node in nodes:
+            node.reset()
+        return [node.value for node in nodes]
+
+    def test_channels(self):
+        speed = self.serial_in.channel("speed", 5, 0, 10)
+        gain = self.serial_in.channel("gain")
+        self.assertEqual([5, None], self.read(speed, gain))
+        self.poll('{"1": 0.5, "7": 3}\n')
+        self.assertEqual([5, 0.5], self.read(speed, gain))
+        self.assertEqual([False, True], self.read(speed.updated(), gain.updated()))
+        self.assertIs(gain.updated(), gain.updated())
+        self.poll()
+        self.assertEqual([5, 0.5], self.read(speed, gain))
+        self.assertEqual([False, False], self.read(speed.updated(), gain.updated()))
+
+    def test_definitions(self):
+        self.serial_in.channel("speed", 5, 0, 10)
+        self.serial_in.channel()
+        self.assertEqual([{"k": "0", "l": "speed", "m": 0, "M": 10, "v": 5},
+                          {"k": "1", "l": None, "m": None, "M": None, "v": None}], json.loads(self.poll("?\n")))
+        self.assertEqual(7, json.loads(self.poll('{"0": 7}\n', "?\n"))[0]["v"], "answers with current values")
+
+    def test_bad_json(self):
+        self.assertIn("ignoring", self.poll("{\n"))
+
+    def test_graph_file(self):
+        controller = Controller()
+        controller.poll_input(self.serial_in)
+        channel = self.serial_in.channel("speed", 5)
+        controller.wire_output(channel.updated().swap(0, channel), graphfile.Stub("ServoOut", 1))
+        text = graphfile.dumps(controller)
+        self.assertIn('["SerialIn",[null,[["speed",5,null,null]]]]', text)
+        self.assertIn('[[0,"channel_number"],[0]]', text)
+        self.assertIn('[[1,"updated"],[]]', text)
+
+    def test_graph_file_keeps_numbers(self):
+        controller = Controller()
+        controller.poll_input(self.serial_in)
+        a, b, c = [self.serial_in.channel(label, i) for i, label in enumerate("abc")]
+        controller.wire_output(c, graphfile.Stub("Consumer"))
+        controller.wire_output(a, graphfile.Stub("Consumer"))
+        loaded = Controller()
+        graphfile.loads(graphfile.dumps(controller), loaded, modules=[inputs, SerialConsumers])
+        serial_in = loaded._inputs[0]
+        self.assertEqual([("c", 2), ("a", 0)], [(node._definition[0], node._number) for node in loaded.output_nodes()])
+        self.assertEqual("b", serial_in.channel_number(1)._definition[0], "unwired channels are kept")
+        self.assertEqual(3, len(serial_in._values))
+
+    def test_graph_lines(self):
+        received = []
+        self.serial_in.graph_receiver = types.SimpleNamespace(feed=received.append)
+        text = json.dumps({"o": [["Operand", [1]]] * 20})  # with spaces that end chunks
+        lines = [line + "\r\n" for line in graphfile.push_lines(text, 11)]
+        self.assertTrue(any(line.endswith(" \r\n") for line in lines))
+        stream = "".join(lines)
+        for start in range(0, len(stream), 64):  # a line may be split between reads
+            self.poll(stream[start:start + 64])
+        self.assertEqual(graphfile.push_lines(text, 11), received)
+
+    def test_bad_key_changes_nothing(self):
+        speed = self.serial_in.channel("speed", 5)
+        self.assertIn("ignoring", self.poll('{"0": 7, "x": 1}\n'))
+        self.assertEqual([5], self.read(speed))
+        self.assertIn("ignoring", self.poll('[1]\n'))
+
+
+class SerialConsumers:
+
+    class Consumer:
+
+        def consume(self, value):
+            pass
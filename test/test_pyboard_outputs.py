@@ -0,0 +1,69 @@
+import json
+import unittest
+
+from kabuki import graphfile
+from kabuki.controller import Controller
+from kabuki.operators import Operand
+from test.fakepyb import import_with_fake_pyb
+
+outputs, pyb = import_with_fake_pyb("kabuki.pyboard.outputs")
+
+
+class TestServoOut(unittest.TestCase):
+
+    def test_limits(self):
+        servo = outputs.ServoOut(4, limits=(-30, None))
+        servo.consume(-60)
+        servo.consume(60)
+        self.assertEqual([int(1500 - 970 * 30 / 90), int(1500 + 970 * 60 / 90)], pyb.servos[4].writes)
+
+
+class TestServoBank(unittest.TestCase):
+
+    def setUp(self):
+        pyb.servos.clear()
+
+    def test_writes_changes_only(self):
+        bank = outputs.ServoBank([1, 2])
+        bank.consume([0, 20])
+        bank.consume([0.4, 20.3])  # within a timer step of the last
+        bank.consume([0, 60])
+        self.assertEqual([1500], pyb.servos[1].writes)
+        self.assertEqual([1720, 2150], pyb.servos[2].writes)
+
+    def test_limits(self):
+        bank = outputs.ServoBank([1, 2, 3], limits=[(-10, 10), None, (None, 0)])
+        bank.consume([90, 200, 45])
+        self.assertEqual([1610], pyb.servos[1].writes)
+        self.assertEqual([2420], pyb.servos[2].writes, "held to the calibrated range")
+        self.assertEqual([1500], pyb.servos[3].writes)
+
+    def test_gathered_nodes(self):
+        controller = Controller()
+        angle = Operand(10)
+        unset = Operand(None)
+        bank = outputs.ServoBank([1, 2])
+        controller.wire_output([angle, unset], bank)
+        controller.update()
+        angle._value = 20
+        controller.update()
+        self.assertEqual([1610, 1720], pyb.servos[1].writes)
+        self.assertEqual([], pyb.servos[2].writes, "a None angle leaves the servo alone")
+
+    def test_wrong_count(self):
+        bank = outputs.ServoBank([1, 2])
+        try:
+            bank.consume([0])
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_graph_file(self):
+        controller = Controller()
+        controller.wire_output([Operand(1), Operand(20)], outputs.ServoBank([1, 2], limits=[None, (-5, 5)]))
+        text = graphfile.dumps(controller)
+        self.assertEqual(["ServoBank", [[1, 2], [None, [-5, 5]]]], json.loads(text)["o"][-1])
+        loaded = Controller()
+        graphfile.loads(text, loaded, modules=[outputs])
+        loaded.update()
+        self.assertEqual([1550], pyb.servos[2].writes[-1:])
@@ -0,0 +1,138 @@
+import io
+import struct
+import unittest
+
+from kabuki import timing
+from kabuki.controller import Controller
+from kabuki.operators import Operand
+from kabuki.recording import Recorder, Player
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000
+
+    def millis(self):
+        return self.now
+
+
+class TestRecording(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        timing.set_clock(self.clock.millis)
+        self.addCleanup(timing.set_clock, None)
+
+    def record(self, samples, step=20, **kwargs):
+        stream = io.BytesIO()
+        x = Operand(0)
+        pressed = Operand(False)
+        recorder = Recorder(stream, [x, pressed], labels=["x", "pressed"], **kwargs)
+        for value, state in samples:
+            x._value = value
+            pressed._value = state
+            x.reset()
+            pressed.reset()
+            recorder.poll()
+            self.clock.now += step
+        recorder.flush()
+        return recorder, stream.getvalue()
+
+    def test_round_trip(self):
+        samples = [(1.5, False), (1.5, False), (-3.25, True), (100, True), (0.001, False)]
+        recorder, data = self.record(samples)
+        player = Player(io.BytesIO(data))
+        x = player.channel("x")
+        pressed = player.channel(1)
+        controller = Controller()
+        controller.poll_input(player)
+        xs = []
+        states = []
+        controller.wire_output(x, xs.append)
+        controller.wire_output(pressed, states.append)
+        for _ in samples:
+            controller.update()
+        self.assertEqual(samples, list(zip(xs, states)))
+        self.assertEqual(80, player.millis())
+        self.assertFalse(player.finished)
+        controller.update()
+        self.assertTrue(player.finished)
+
+    def test_bool_kept(self):
+        _, data = self.record([(1, True), (2, False)])
+        player = Player(io.BytesIO(data))
+        x = player.channel("x")
+        inverted = player.channel("pressed").neg()
+        self.assertIs(True, inverted.value, "False before the first frame")
+        player.poll()
+        inverted.reset()
+        self.assertIs(False, inverted.value, "a replayed True negates to False, not -1.0")
+        self.assertIsInstance(x.value, float)
+        player.poll()
+        inverted.reset()
+        self.assertIs(True, inverted.value)
+
+    def test_version_1(self):
+        # b"KBR1" recordings have no flags byte and play back as numbers
+        data = b"KBR1" + bytes([1]) + struct.pack("<f", 1000) + bytes([1]) + b"x" + bytes([0, 0x80 | (2000 & 0x7f), 2000 >> 7])
+        player = Player(io.BytesIO(data))
+        player.poll()
+        self.assertEqual(["x"], player.labels)
+        self.assertEqual(1.0, player.channel(0).value)
+
+    def test_compact(self):
+        _, data = self.record([(1.0, False)] * 100)
+        header = 4 + 1 + 2 * (4 + 1 + 1) + len("x") + len("pressed")
+        first_frame = 1 + 2 + 1  # x moves from 0 to 1000
+        self.assertEqual(header + first_frame + 99 * 3, len(data), "one byte per varint once values settle")
+
+    def test_bounded_writes(self):
+        stream = io.BytesIO()
+        x = Operand(123456)
+        recorder = Recorder(stream, [x], buffer_size=16, max_write=4)
+        header_size = len(stream.getvalue())
+        for i in range(20):
+            x._value = -x._value  # large changes, 5 byte frames
+            x.reset()
+            recorder.poll()
+            self.assertLessEqual(len(stream.getvalue()) - header_size, 4 * (i + 1), "at most max_write per poll")
+        self.assertGreater(recorder.dropped, 0, "frames dropped once the buffer filled")
+
+    def test_realtime(self):
+        _, data = self.record([(1, False), (2, False), (3, False)], step=100)
+        self.clock.now = 0
+        player = Player(io.BytesIO(data), realtime=True)
+        x = player.channel("x")
+        player.poll()
+        self.assertEqual(1, x.value)
+        self.clock.now = 150
+        player.poll()
+        x.reset()
+        self.assertEqual(2, x.value)
+        self.clock.now = 500
+        player.poll()
+        x.reset()
+        self.assertEqual(3, x.value)
+        self.assertTrue(player.finished)
+
+    def test_realtime_player_as_clock(self):
+        _, data = self.record([(1, False), (2, False), (3, False)], step=100)
+        player = Player(io.BytesIO(data), realtime=True)
+        timing.set_clock(player.millis)
+        real_millis = timing.real_millis
+        self.addCleanup(setattr, timing, "real_millis", real_millis)
+        timing.real_millis = self.clock.millis
+        x = player.channel("x")
+        for now in (0, 150, 250):
+            self.clock.now = now
+            player.poll()
+        self.assertEqual(3, x.value)
+        self.assertEqual(200, timing.millis(), "time based nodes see the recorded time")
+
+    def test_bad_stream(self):
+        try:
+            Player(io.BytesIO(b"nope"))
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
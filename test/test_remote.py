@@ -0,0 +1,106 @@
+import math
+import os
+import tty
+import unittest
+from unittest import mock
+
+from kabuki import graphfile
+from kabuki.controller import Controller
+from kabuki.operators import Operand
+from kabuki.remote import RemoteIn, RemoteOut, frame_size
+
+
+class TestRemote(unittest.TestCase):
+    """ Sends frames over a pseudo-terminal pair, much as between two boards' UARTs. """
+
+    def setUp(self):
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        for fd in (master, slave):
+            os.set_blocking(fd, False)
+        self.sending = open(master, "r+b", buffering=0)
+        self.receiving = open(slave, "r+b", buffering=0)
+        self.addCleanup(self.sending.close)
+        self.addCleanup(self.receiving.close)
+        self.millis = 0
+        patcher = mock.patch("kabuki.timing.millis", lambda: self.millis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.remote_in = RemoteIn(self.receiving, 3, stale=50)
+        self.nodes = [self.remote_in.channel(i) for i in range(3)]
+
+    def receive(self):
+        self.remote_in.poll()
+        for node in self.nodes + [self.remote_in.stale(), self.remote_in.sequence_number()]:
+            node.reset()
+        return [node.value for node in self.nodes]
+
+    def test_values(self):
+        self.assertTrue(all([math.isnan(value) for value in self.receive()]))
+        self.assertTrue(self.remote_in.stale().value)
+        sender = Controller()
+        a = Operand(1.5)
+        sender.wire_output([a, Operand(-2), Operand(None)], RemoteOut(self.sending, 3))
+        sender.update()
+        values = self.receive()
+        self.assertEqual([1.5, -2], values[:2])
+        self.assertTrue(math.isnan(values[2]))
+        self.assertFalse(self.remote_in.stale().value)
+        self.assertEqual(0, self.remote_in.sequence_number().value)
+        a._value = 3
+        sender.update()
+        sender.update()
+        self.assertEqual([3, -2], self.receive()[:2])
+        self.assertEqual(2, self.remote_in.sequence)
+        self.assertEqual(0, self.remote_in.lost)
+
+    def test_stale(self):
+        out = RemoteOut(self.sending, 3)
+        out.consume([1, 2, 3])
+        self.receive()
+        self.millis = 50
+        self.assertEqual([1, 2, 3], self.receive(), "the last values are held")
+        self.assertTrue(self.remote_in.stale().value)
+
+    def test_noise_and_split_frames(self):
+        data = bytearray()
+        port = mock.Mock()
+        port.write = data.extend
+        out = RemoteOut(port, 3)
+        for i in range(4):
+            out.consume([i, i, i])
+        corrupt = bytearray(data[frame_size(3):2 * frame_size(3)])
+        corrupt[5] ^= 0xff
+        stream = b"\x00\xa5" + data[:frame_size(3)] + corrupt + data[3 * frame_size(3):]
+        # arrives in pieces, one frame dropped and one damaged
+        self.sending.write(stream[:7])
+        self.receive()
+        self.assertEqual(0, self.remote_in.frames)
+        self.sending.write(stream[7:])
+        self.assertEqual([3, 3, 3], self.receive())
+        self.assertEqual(2, self.remote_in.frames)
+        self.assertEqual(2, self.remote_in.lost)
+        self.assertEqual(1, self.remote_in.errors)
+
+    def test_wrong_count(self):
+        try:
+            RemoteOut(self.sending, 2).consume([1, 2, 3])
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+    def test_graph_file(self):
+        controller = Controller()
+        remote_in = RemoteIn(self.receiving, 2)
+        controller.poll_input(remote_in)
+        try:
+            graphfile.dumps(controller)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+        remote_in._uart_number = 2
+        controller.wire_output(remote_in.stale().swap(remote_in.channel(1), 0), graphfile.Stub("ServoOut", 1))
+        text = graphfile.dumps(controller)
+        self.assertIn('["RemoteIn",[2,2,100,115200]]', text)
+        self.assertIn('[[0,"channel"],[1]]', text)
+        self.assertIn('[[0,"stale"],[]]', text)
@@ -0,0 +1,104 @@
+import math
+import statistics
+import unittest
+
+from kabuki import timing
+from kabuki.operators import Operand
+from kabuki.smoothing import lowpass
+
+
+def feed(op, source, values):
+    results = []
+    for value in values:
+        source._value = value
+        op.reset()
+        results.append(op.value)
+    return results
+
+
+VALUES = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9, 3, 2, 3, 8, 4, 6, 2, 6, 4, 3]
+
+
+class TestMovingAverage(unittest.TestCase):
+
+    def test_average(self):
+        source = Operand(0)
+        results = feed(source.moving_average(4), source, VALUES * 3)
+        values = VALUES * 3
+        for i, result in enumerate(results):
+            window = values[max(0, i - 3):i + 1]
+            self.assertAlmostEqual(sum(window) / len(window), result, places=5)
+
+    def test_bad_size(self):
+        try:
+            Operand(0).moving_average(0)
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
+
+
+class TestEma(unittest.TestCase):
+
+    def test_ema(self):
+        source = Operand(0)
+        self.assertEqual([10, 10, 5, 2.5], feed(source.ema(0.5), source, [10, 10, 0, 0]))
+
+
+class TestMedian(unittest.TestCase):
+
+    def test_median(self):
+        for size in [1, 3, 4, 5]:
+            source = Operand(0)
+            results = feed(source.median(size), source, VALUES)
+            for i, result in enumerate(results):
+                self.assertEqual(statistics.median(VALUES[max(0, i - size + 1):i + 1]), result)
+
+    def test_repeated_and_fractional_values(self):
+        source = Operand(0)
+        values = [0.1, 0.1, 0.3, 0.1, -0.7, 0.3, 0.3, 0.1]
+        results = feed(source.median(3), source, values)
+        for i, result in enumerate(results):
+            self.assertAlmostEqual(statistics.median(values[max(0, i - 2):i + 1]), result, places=6)
+
+    def test_nan(self):
+        nan = float("nan")
+        source = Operand(nan)
+        values = [nan] * 4 + [1, 2, nan, 3, 4, 5]
+        results = feed(source.median(3), source, values)
+        self.assertTrue(all([math.isnan(result) for result in results[:5]]), "NaN sorted above numbers")
+        self.assertEqual([2, 2, 3, 4, 4], results[5:])
+
+
+class TestBiquad(unittest.TestCase):
+
+    def test_settled_start_and_step(self):
+        source = Operand(0)
+        results = feed(source.biquad(lowpass(5, 100)), source, [2] * 10 + [4] * 200)
+        for result in results[:10]:
+            self.assertAlmostEqual(2, result)
+        self.assertLess(results[11], 3, "smoothed")
+        self.assertAlmostEqual(4, results[-1], places=3)
+
+    def test_blocks_high_frequency(self):
+        source = Operand(0)
+        results = feed(source.biquad(lowpass(2, 100)), source, [1, -1] * 200)
+        self.assertLess(max([abs(r) for r in results[100:]]), 0.01)
+
+
+class TestSlewLimit(unittest.TestCase):
+
+    def test_slew(self):
+        clock = [0]
+        timing.set_clock(lambda: clock[0])
+        try:
+            source = Operand(0)
+            op = source.slew_limit(100)  # per second
+            results = []
+            for i, value in enumerate([0, 10, 10, 10, -10, 2]):
+                clock[0] = i * 50
+                source._value = value
+                op.reset()
+                results.append(op.value)
+        finally:
+            timing.set_clock(None)
+        self.assertEqual([0, 5, 10, 10, 5, 2], results)
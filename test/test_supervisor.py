@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+
+from kabuki.controller import Controller, Hold, ValueInput, NORMAL
+from kabuki.operators import Operand
+from kabuki.supervisor import Supervisor
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0  # microseconds
+
+    def millis(self):
+        return self.now // 1000
+
+    def micros(self):
+        return self.now
+
+    def elapsed_micros(self, start):
+        return self.now - start
+
+
+class Counter:
+    """ A polled input counting its polls, taking a fixed time per poll. """
+
+    def __init__(self, clock, cost=0):
+        self._clock = clock
+        self._cost = cost
+        self.count = 0
+
+    def poll(self):
+        self._clock.now += self._cost
+        self.count += 1
+
+    @property
+    def value(self):
+        return self.count
+
+
+class SlowConsumer:
+
+    def __init__(self, clock, cost):
+        self._clock = clock
+        self._cost = cost
+        self.values = []
+
+    def consume(self, value):
+        self._clock.now += self._cost
+        self.values.append(value)
+
+
+class TestSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.multiple("kabuki.timing", millis=self.clock.millis, micros=self.clock.micros,
+                                      elapsed_micros=self.clock.elapsed_micros)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.supervisor = Supervisor()
+
+    def run_until(self, millis):
+        while self.clock.now <= millis * 1000:
+            if not self.supervisor.step():
+                self.clock.now += 1000
+
+    def test_rates(self):
+        fast = Controller()
+        fast_input = Counter(self.clock)
+        fast.poll_input(fast_input)
+        slow = Controller()
+        slow_input = Counter(self.clock)
+        slow.poll_input(slow_input)
+        slow_stats = self.supervisor.add(slow, 20)
+        fast_stats = self.supervisor.add(fast, 5)
+        self.run_until(40)
+        self.assertEqual(9, fast_input.count)
+        self.assertEqual(3, slow_input.count)
+        self.assertEqual(9, fast_stats.ticks)
+        self.assertIs(slow_stats, self.supervisor.stats(slow))
+        self.assertEqual(0, fast_stats.late)
+
+    def test_hold(self):
+        fast = Controller()
+        sensor = Counter(self.clock)
+        fast.poll_input(sensor)
+        hold = Hold(0)
+        fast.wire_output(ValueInput(sensor).add(0), hold)
+        slow = Controller()
+        seen = SlowConsumer(self.clock, 0)
+        slow.wire_output(hold.mul(10), seen)
+        self.supervisor.add(fast, 5)
+        self.supervisor.add(slow, 20)
+        self.run_until(40)
+        self.assertEqual([10, 50, 90], seen.values, "the slow graph sees the fast samples")
+        self.assertEqual(9, sensor.count, "without polling the fast input itself")
+
+    def test_slow_work_deferred_for_fast(self):
+        fast = Controller()
+        fast_input = Counter(self.clock, 500)
+        fast.poll_input(fast_input)
+        slow = Controller()
+        outputs = [SlowConsumer(self.clock, 2000) for _ in range(6)]
+        for output in outputs:
+            slow.wire_output(Operand(1), output, NORMAL)
+        self.supervisor.add(fast, 5)
+        slow_stats = self.supervisor.add(slow, 50)
+        self.run_until(100)
+        self.assertEqual(0, self.supervisor.stats(fast).late)
+        self.assertEqual(21, fast_input.count)
+        self.assertGreater(slow.deferred_outputs(NORMAL), 0)
+        self.assertLess(slow_stats.max_micros, 6 * 2000, "stopped short of all six outputs")
+        self.assertEqual(None, slow._budget, "the slow controller's own budget is restored")
+
+    def test_late(self):
+        controller = Controller()
+        controller.poll_input(Counter(self.clock, 12000))
+        stats = self.supervisor.add(controller, 5)
+        self.run_until(30)
+        self.assertGreater(stats.late, 0)
+        self.assertIn("late", str(stats))
+
+    def test_unknown_controller(self):
+        try:
+            self.supervisor.stats(Controller())
+            self.fail("expected exception")
+        except RuntimeError:
+            pass
@@ -0,0 +1,72 @@
+import io
+import math
+import unittest
+
+from kabuki import timing
+from kabuki.operators import Operand
+from kabuki.recording import Recorder
+from kabuki.sweep import grid, run, sweep
+
+
+def make_trace():
+    """ A noisy ramp recorded at 10 ms per tick. """
+    stream = io.BytesIO()
+    clock = [0]
+    timing.set_clock(lambda: clock[0])
+    try:
+        x = Operand(0)
+        recorder = Recorder(stream, [x], labels=["x"])
+        for i in range(200):
+            x._value = i * 0.1 + 0.4 * math.sin(i * 1.7)
+            x.reset()
+            recorder.poll()
+            clock[0] += 10
+        recorder.flush()
+    finally:
+        timing.set_clock(None)
+    return stream.getvalue()
+
+
+def smoothed(player, band):
+    return player.channel("x").reduce_noise(band)
+
+
+def reversals(values):
+    """ Count direction changes, a smooth ramp has none. """
+    count = 0
+    for a, b, c in zip(values, values[1:], values[2:]):
+        if (b - a) * (c - b) < 0:
+            count += 1
+    return count
+
+
+def throttled(player, period):
+    return player.channel("x").throttle(period)
+
+
+def changes(values):
+    return sum([1 for a, b in zip(values, values[1:]) if a != b])
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_grid(self):
+        self.assertEqual([{"a": 1, "b": 3}, {"a": 1, "b": 4}, {"a": 2, "b": 3}, {"a": 2, "b": 4}],
+                         grid(b=[3, 4], a=[1, 2]))
+
+    def test_run_replays_trace(self):
+        values = run(smoothed, {"band": 0}, make_trace(), lambda values: values)
+        self.assertEqual(200, len(values), "one value per recorded tick")
+
+    def test_recorded_time(self):
+        # 10 ms per tick, so a 50 ms throttle changes every 5 ticks
+        self.assertEqual(39, run(throttled, {"period": 50}, make_trace(), changes))
+
+    def test_sweep(self):
+        trace = make_trace()
+        params = grid(band=[0, 0.5, 1.0, 2.0])
+        inline = sweep(smoothed, params, trace, reversals, processes=1)
+        pooled = sweep(smoothed, params, trace, reversals, processes=2)
+        self.assertEqual(inline, pooled)
+        self.assertGreater(inline[-1][0], inline[0][0])
+        self.assertEqual({"band": 0}, inline[-1][1], "no noise reduction is worst")
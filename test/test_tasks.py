@@ -0,0 +1,129 @@
+import asyncio
+import selectors
+import unittest
+
+import kabuki
+from kabuki import timing
+from kabuki.controller import Controller
+from kabuki.tasks import Every
+
+
+class SimulatedSelector(selectors.DefaultSelector):
+    """ Moves the loop's clock on by the time it would wait instead of waiting. """
+
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events and timeout:
+            self.loop.now += timeout
+        return events
+
+
+class SimulatedLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self):
+        selector = SimulatedSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+
+class Counter:
+
+    def __init__(self, loop):
+        self._loop = loop
+        self.polls = []
+
+    def poll(self):
+        self.polls.append(round(self._loop.now * 1000))
+
+
+class Doorbell(Counter):
+    """ Ready when rung. """
+
+    def __init__(self, loop):
+        super().__init__(loop)
+        self.rung = asyncio.Event()
+
+    async def wait(self):
+        await self.rung.wait()
+        self.rung.clear()
+
+
+class TestRunAsync(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = SimulatedLoop()
+        self.addCleanup(self.loop.close)
+        timing.set_clock(lambda: round(self.loop.now * 1000))
+        self.addCleanup(timing.set_clock, None)
+
+    def run_for(self, coroutine, milliseconds):
+        async def limited():
+            try:
+                await asyncio.wait_for(coroutine, milliseconds / 1000)
+            except asyncio.TimeoutError:
+                pass
+        self.loop.run_until_complete(limited())
+
+    def test_rate_and_other_tasks(self):
+        controller = Controller()
+        ticks = Counter(self.loop)
+        controller.poll_input(ticks)
+        other = []
+
+        async def logger():
+            while True:
+                other.append(round(self.loop.now * 1000))
+                await asyncio.sleep(0.025)
+
+        async def both():
+            task = asyncio.ensure_future(logger())
+            try:
+                await controller.run_async(period=10)
+            finally:
+                task.cancel()
+
+        self.run_for(both(), 95)
+        self.assertEqual(list(range(0, 100, 10)), ticks.polls)
+        self.assertEqual([0, 25, 50, 75], other)
+
+    def test_poll_when_ready(self):
+        controller = Controller()
+        doorbell = Doorbell(self.loop)
+        slow = Counter(self.loop)
+        controller.poll_when_ready(doorbell)
+        controller.poll_when_ready(Every(slow, 30))
+        values = []
+        controller.wire_output(kabuki.node_from_function(lambda: len(doorbell.polls)), values.append)
+
+        async def ring():
+            await asyncio.sleep(0.034)
+            doorbell.rung.set()
+
+        async def both():
+            asyncio.ensure_future(ring())
+            await controller.run_async(period=10)
+
+        self.run_for(both(), 65)
+        self.assertEqual([34], doorbell.polls, "only polled once ready")
+        self.assertEqual([30, 60], slow.polls)
+        self.assertEqual([0, 0, 0, 0, 1, 1, 1], values, "used from the next update")
+
+    def test_late_updates_do_not_catch_up(self):
+        controller = Controller()
+        ticks = Counter(self.loop)
+        controller.poll_input(ticks)
+
+        def slow_output(value):
+            self.loop.now += 0.025
+
+        controller.wire_output(kabuki.node_from_value(1), slow_output)
+        self.run_for(controller.run_async(period=10), 60)
+        self.assertEqual([0, 25, 50], ticks.polls[:3], "one update as soon as the last finishes")
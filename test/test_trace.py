@@ -0,0 +1,68 @@
+import io
+import unittest
+
+from kabuki import trace
+from kabuki.controller import Controller, LOW
+from kabuki.operators import Operand, Debug
+from kabuki.trace import TraceSink
+
+
+class TestTraceSink(unittest.TestCase):
+
+    def test_one_line_per_tick(self):
+        stream = io.StringIO()
+        sink = TraceSink(stream=stream)
+        controller = Controller()
+        controller.trace_to(sink)
+        n = Operand(1.5)
+        controller.wire_output(n.debug("a", sink=sink).add(1).debug("b", sink=sink), lambda value: None)
+        controller.wire_output(n.debug("c", sink=sink), lambda value: None, priority=LOW)
+        # building the graph evaluates "a" once, leave that out
+        sink.end_tick()
+        stream.seek(0)
+        stream.truncate()
+        controller.update()
+        self.assertEqual("a:1.5 b:2.5 c:1.5\n", stream.getvalue(), "the whole tick on one line")
+        controller.update()
+        self.assertEqual("a:1.5 b:2.5 c:1.5\n" * 2, stream.getvalue())
+
+    def test_kept_through_reload(self):
+        stream = io.StringIO()
+        controller = Controller()
+        kabuki_sink = TraceSink(stream=stream)
+        controller.trace_to(kabuki_sink)
+        controller.wire_output(Operand(1).debug("old", sink=kabuki_sink), lambda value: None)
+        controller.update()
+        controller.clear()
+        controller.wire_output(Operand(2).debug("new", sink=kabuki_sink), lambda value: None)
+        controller.update()
+        self.assertEqual("old:1\nnew:2\n", stream.getvalue())
+
+    def test_sampling(self):
+        stream = io.StringIO()
+        sink = TraceSink(every=3, stream=stream)
+        for i in range(7):
+            sink.write("i", i)
+            sink.end_tick()
+        self.assertEqual("i:0\ni:3\ni:6\n", stream.getvalue())
+
+    def test_overwrites_oldest(self):
+        stream = io.StringIO()
+        sink = TraceSink(size=2, stream=stream)
+        sink.write("a", 1)
+        sink.write("b", 2)
+        sink.write("c", 3)
+        sink.flush()
+        self.assertEqual("b:2 c:3\n", stream.getvalue())
+        self.assertEqual(1, sink.dropped)
+
+    def test_default_sink(self):
+        stream = io.StringIO()
+        trace.default_sink = TraceSink(stream=stream)
+        try:
+            op = Debug(Operand(4), "x")
+            self.assertEqual(4, op.value, "value passes through")
+            trace.default_sink.flush()
+            self.assertEqual("x:4\n", stream.getvalue())
+        finally:
+            trace.default_sink = None